@@ -0,0 +1,319 @@
+# project/backtest.py
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Sequence
+import numpy as np
+from config import BetType, MatchCondition, QuantumState, QuantumBet, BET_TYPES
+from quantum.optimizer import QuantumOptimizer, PORTFOLIO_MARKETS, PORTFOLIO_DEFAULT_ODDS
+from quantum.calibration import DEFAULT_PARAMETERS_PATH
+from quantum.simulator import settle_market, NEXT_GOAL_NONE, NEXT_GOAL_HOME, NEXT_GOAL_AWAY
+from modules.initial_odds import optimize_initial_allocations, build_initial_bets
+from modules.multi_bets import available_combinations, combo_weights, multi_bets_capital
+from recommendations import detect_scenarios, price_recommendations, in_play_capital
+
+# Histórico: o mesmo formato da calibração (uma linha por gol e uma 'full_time' por partida)
+# e, opcionalmente, linhas 'pressure' (home_pressure, away_pressure, volatility),
+# linhas 'red_card' (team), colunas 'season'/'kickoff' e odds pré-jogo em odd_<mercado>
+# (ex.: odd_under_25); mercados sem odd usam PORTFOLIO_DEFAULT_ODDS. O favorito
+# pré-jogo vem da coluna 'favourite' (como na calibração) ou, sem ela, das odds
+# odd_home_win/odd_away_win; sem nenhuma das duas, a casa é a favorita. A coluna
+# opcional 'half' decide os gols do 1º tempo (acréscimos), como na calibração.
+
+PHASE_NAMES = ('initial', 'multi', 'in_play')
+
+# Apostas obrigatórias da Fase 2 (criadas com valor zero, como no MultiBetsModule)
+MANDATORY_COMBO_BETS = {
+    BetType.DOUBLE_CHANCE_UNDERDOG: 2.30,
+    BetType.OVER_15_MATCH: 1.70
+}
+
+
+def read_fixtures(path: str) -> List[Dict]:
+    """Lê o histórico de eventos e agrupa cada partida num registro compacto (ordenado por kickoff)"""
+    import pandas as pd  # Importado só no backtest
+
+    events = pd.read_parquet(path) if path.endswith(('.parquet', '.pq')) else pd.read_csv(path)
+    missing = [c for c in ('match_id', 'event', 'minute') if c not in events.columns]
+    if missing:
+        raise ValueError(f"Colunas ausentes no histórico: {', '.join(missing)}")
+
+    odds_columns = {
+        bt: f"odd_{bt.name.lower()}" for bt in BET_TYPES if f"odd_{bt.name.lower()}" in events.columns
+    }
+    events['event'] = events['event'].astype(str).str.lower()
+    fixtures = []
+    for match_id, rows in events.groupby('match_id', sort=False):
+        first = rows.iloc[0]
+        kind = rows['event'].to_numpy()
+        minute = rows['minute'].to_numpy(dtype=np.float64)
+        team = rows['team'].astype(str).str.lower().to_numpy() if 'team' in rows.columns else np.full(len(rows), '')
+
+        goals = sorted((float(m), t == 'home') for m, t in zip(minute[kind == 'goal'], team[kind == 'goal']))
+        # Gols do 1º tempo pela coluna 'half', quando existe (acréscimos: 45+2 gravado como 47, half=1),
+        # como na calibração; sem ela, pelo minuto
+        is_goal = kind == 'goal'
+        first_half = rows['half'].to_numpy()[is_goal] == 1 if 'half' in rows.columns else minute[is_goal] <= 45
+        goal_home = team[is_goal] == 'home'
+        pressures = []
+        if 'home_pressure' in rows.columns:
+            pressure_rows = rows[kind == 'pressure']
+            for _, row in pressure_rows.iterrows():
+                volatility = row['volatility'] if 'volatility' in rows.columns and isinstance(row['volatility'], str) \
+                    else QuantumState.ESTAVEL.value
+                pressures.append((float(row['minute']), float(row['home_pressure']),
+                                  float(row['away_pressure']), volatility))
+            pressures.sort(key=lambda p: p[0])
+        red_cards = [(float(m), 'HOME' if t == 'home' else 'AWAY')
+                     for m, t in zip(minute[kind == 'red_card'], team[kind == 'red_card'])]
+        odds = {bt: float(first[col]) for bt, col in odds_columns.items() if not pd.isna(first[col])}
+
+        fixtures.append({
+            'match_id': match_id,
+            'season': str(first['season']) if 'season' in rows.columns else 'all',
+            'league': str(first['league']) if 'league' in rows.columns else None,
+            'kickoff': first['kickoff'] if 'kickoff' in rows.columns else None,
+            'odds': odds,
+            'home_favourite': _home_favourite(rows, odds),
+            'goals': goals,
+            'first_half_goals': (int((first_half & goal_home).sum()), int((first_half & ~goal_home).sum())),
+            'pressures': pressures,
+            'red_card': min(red_cards) if red_cards else None
+        })
+
+    if any(f['kickoff'] is not None for f in fixtures):
+        fixtures.sort(key=lambda f: (f['kickoff'] is None, str(f['kickoff'])))
+    for order, fixture in enumerate(fixtures):
+        fixture['order'] = order
+    return fixtures
+
+
+def _home_favourite(rows, odds: Dict[BetType, float]) -> bool:
+    """Favorito pré-jogo da partida: coluna 'favourite', odds de vitória ou, por padrão, a casa"""
+    if 'favourite' in rows.columns:
+        favourite = rows['favourite'].dropna()
+        if len(favourite):
+            return str(favourite.iloc[0]).lower() != 'away'
+    if BetType.HOME_WIN in odds and BetType.AWAY_WIN in odds:
+        return odds[BetType.HOME_WIN] <= odds[BetType.AWAY_WIN]
+    return True
+
+
+def _match_state(fixture: Dict, minute: float):
+    """Placar, pressões e volatilidade vigentes no minuto"""
+    home = sum(1 for m, is_home in fixture['goals'] if m <= minute and is_home)
+    away = sum(1 for m, is_home in fixture['goals'] if m <= minute and not is_home)
+    home_p, away_p, volatility = 0.5, 0.5, QuantumState.ESTAVEL.value
+    for m, hp, ap, vol in fixture['pressures']:
+        if m > minute:
+            break
+        home_p, away_p, volatility = hp, ap, vol
+    return home, away, home_p, away_p, volatility
+
+
+def _settle(fixture: Dict, legs: Sequence[BetType], placed_minute: float, home_favourite: bool) -> bool:
+    """Liquida uma posição (simples ou múltipla) a partir do estado no momento da aposta"""
+    goals = fixture['goals']
+    start_home = sum(1 for m, is_home in goals if m <= placed_minute and is_home)
+    start_away = sum(1 for m, is_home in goals if m <= placed_minute and not is_home)
+    later = [(m, is_home) for m, is_home in goals if m > placed_minute]
+    next_goal = NEXT_GOAL_NONE if not later else (NEXT_GOAL_HOME if later[0][1] else NEXT_GOAL_AWAY)
+
+    home_fh, away_fh = fixture.get('first_half_goals') or (
+        sum(1 for m, h in goals if m <= 45 and h), sum(1 for m, h in goals if m <= 45 and not h)
+    )
+
+    outcome = {
+        'start_home': np.array([start_home]),
+        'start_away': np.array([start_away]),
+        'home_fh': np.array([home_fh]),
+        'away_fh': np.array([away_fh]),
+        'home_ft': np.array([sum(1 for _, h in goals if h)]),
+        'away_ft': np.array([sum(1 for _, h in goals if not h)]),
+        'next_goal': np.array([next_goal]),
+        'goal_next_5': np.array([any(m <= placed_minute + 5 for m, _ in later)]),
+        'home_favourite': np.array([home_favourite])
+    }
+    return all(bool(settle_market(bt, outcome)[0]) for bt in legs)
+
+
+def replay_fixture(optimizer: QuantumOptimizer, fixture: Dict, capital: float = 100.0,
+                   minute_step: int = 1) -> Dict:
+    """
+    Reproduz o fluxo 60/31/9 numa partida histórica e liquida as posições.
+    Fase 1: alocação do InitialOddsModule; Fase 2: todas as combinações com os pesos
+    do MultiBetsModule; Fase 3: recomendações do InPlayModule minuto a minuto, cada
+    mercado apostado uma única vez e limitado ao capital ainda livre da fase.
+    """
+    odds = {bt: fixture['odds'].get(bt, default) for bt, default in zip(PORTFOLIO_MARKETS, PORTFOLIO_DEFAULT_ODDS)}
+    positions = []  # (fase, pernas, stake, odd, minuto, casa favorita)
+    home_favourite = fixture.get('home_favourite', True)
+
+    # Fase 1 (60%)
+    allocations = optimize_initial_allocations(optimizer, odds)
+    initial_bets = build_initial_bets(optimizer, allocations, odds, capital * 0.60)
+    for bet_type, bet in initial_bets.items():
+        if bet.amount > 0:
+            positions.append(('initial', (bet_type,), bet.amount, bet.odd, 0.0, home_favourite))
+    total_initial = sum(bet.amount for bet in initial_bets.values())
+
+    # Fase 2 (31%)
+    for bet_type, odd in MANDATORY_COMBO_BETS.items():
+        initial_bets.setdefault(bet_type, QuantumBet(bet_type, 0, odd, 0, 0))
+    combos = available_combinations(initial_bets)
+    phase_capital = multi_bets_capital(capital, total_initial)
+    if phase_capital > 0:
+        weights = combo_weights(combos, {bt: bet.odd for bt, bet in initial_bets.items()}, initial_bets)
+        for combo, weight in zip(combos, weights):
+            positions.append(('multi', tuple(combo['bets']), phase_capital * weight,
+                              float(np.prod(combo['odds'])), 0.0, home_favourite))
+    else:
+        combos = []
+
+    # Fase 3 (9%): minuto a minuto
+    placed = set()
+    spent = 0.0
+    last_volatility = None
+    for minute in range(minute_step, 91, minute_step):
+        home, away, home_p, away_p, volatility = _match_state(fixture, minute)
+        condition = MatchCondition(home_goals=home, away_goals=away, minute=minute,
+                                   home_pressure=home_p, away_pressure=away_p)
+        red_card = fixture['red_card']
+        recommendations = detect_scenarios(
+            optimizer, condition, QuantumState(volatility), multi_bets=combos,
+            red_card_event={'minute': red_card[0], 'team': red_card[1]} if red_card and red_card[0] <= minute else None,
+            last_volatility=last_volatility
+        )
+        last_volatility = volatility
+
+        available = in_play_capital(capital, total_initial, len(combos), minute) - spent
+        new = [rec for rec in recommendations if rec['bet_type'] not in placed]
+        if not new or available <= 0:
+            continue
+        for rec in price_recommendations(optimizer, new, condition, available, initial_bets):
+            stake = min(rec['stake'], available)
+            if stake <= 0.01:
+                continue
+            placed.add(rec['bet_type'])
+            spent += stake
+            available -= stake
+            positions.append(('in_play', (rec['bet_type'],), stake, rec['odd'], float(minute), home_p >= away_p))
+
+    # Liquidação
+    result = {
+        'match_id': fixture['match_id'],
+        'season': fixture['season'],
+        'order': fixture['order'],
+        'positions': len(positions),
+        'won': 0
+    }
+    for phase in PHASE_NAMES:
+        result[f'{phase}_staked'] = 0.0
+        result[f'{phase}_pnl'] = 0.0
+    for phase, legs, stake, odd, minute, home_favourite in positions:
+        won = _settle(fixture, legs, minute, home_favourite)
+        result['won'] += int(won)
+        result[f'{phase}_staked'] += stake
+        result[f'{phase}_pnl'] += stake * (odd - 1) if won else -stake
+    result['staked'] = sum(result[f'{phase}_staked'] for phase in PHASE_NAMES)
+    result['pnl'] = sum(result[f'{phase}_pnl'] for phase in PHASE_NAMES)
+    return result
+
+
+# Otimizadores do processo (um por liga, criados sob demanda em cada worker)
+_WORKER_OPTIMIZERS = {}
+
+
+def _run_chunk(fixtures: List[Dict], capital: float, minute_step: int, parameters_path: str) -> List[Dict]:
+    results = []
+    for fixture in fixtures:
+        league = fixture.get('league')
+        if league not in _WORKER_OPTIMIZERS:
+            _WORKER_OPTIMIZERS[league] = QuantumOptimizer(parameters_path=parameters_path, league=league)
+        results.append(replay_fixture(_WORKER_OPTIMIZERS[league], fixture, capital, minute_step))
+    return results
+
+
+def _max_drawdown(pnl: np.ndarray) -> float:
+    """Maior queda do P&L acumulado em relação ao pico anterior"""
+    if pnl.size == 0:
+        return 0.0
+    equity = np.concatenate(([0.0], np.cumsum(pnl)))
+    return float((np.maximum.accumulate(equity) - equity).max())
+
+
+def summarize_results(results: List[Dict]) -> Dict[str, Dict]:
+    """ROI, drawdown máximo e taxa de acerto por temporada (e no total), por ordem de kickoff"""
+    def metrics(rows):
+        rows = sorted(rows, key=lambda r: r['order'])
+        staked = sum(r['staked'] for r in rows)
+        pnl = sum(r['pnl'] for r in rows)
+        positions = sum(r['positions'] for r in rows)
+        summary = {
+            'matches': len(rows),
+            'positions': positions,
+            'staked': staked,
+            'pnl': pnl,
+            'roi': pnl / staked if staked else 0.0,
+            'hit_rate': sum(r['won'] for r in rows) / positions if positions else 0.0,
+            'max_drawdown': _max_drawdown(np.array([r['pnl'] for r in rows]))
+        }
+        for phase in PHASE_NAMES:
+            phase_staked = sum(r[f'{phase}_staked'] for r in rows)
+            summary[f'{phase}_roi'] = sum(r[f'{phase}_pnl'] for r in rows) / phase_staked if phase_staked else 0.0
+        return summary
+
+    seasons = {}
+    for row in results:
+        seasons.setdefault(row['season'], []).append(row)
+    return {
+        'seasons': {season: metrics(rows) for season, rows in sorted(seasons.items())},
+        'total': metrics(results)
+    }
+
+
+def run_backtest(fixtures: List[Dict], capital: float = 100.0, workers: int = None,
+                 chunk_size: int = 250, minute_step: int = 1,
+                 parameters_path: str = DEFAULT_PARAMETERS_PATH) -> Dict:
+    """
+    Executa o backtest distribuindo blocos de partidas entre processos.
+    Cada partida usa o mesmo capital; o resultado não depende do número de workers.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = [fixtures[i:i + chunk_size] for i in range(0, len(fixtures), chunk_size)]
+    if workers <= 1 or len(chunks) <= 1:
+        results = [r for chunk in chunks for r in _run_chunk(chunk, capital, minute_step, parameters_path)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = executor.map(
+                _run_chunk, chunks,
+                [capital] * len(chunks), [minute_step] * len(chunks), [parameters_path] * len(chunks)
+            )
+            results = [r for part in parts for r in part]
+
+    report = summarize_results(results)
+    report['fixtures'] = results
+    return report
+
+
+if __name__ == "__main__":
+    # Uso: python -m backtest eventos.parquet --workers 8 --capital 100 --output relatorio.json
+    parser = argparse.ArgumentParser(description="Backtest histórico do fluxo 60/31/9")
+    parser.add_argument("events", help="Histórico de eventos (.csv ou .parquet)")
+    parser.add_argument("--capital", type=float, default=100.0, help="Capital por partida")
+    parser.add_argument("--workers", type=int, default=None, help="Processos (padrão: núcleos da CPU)")
+    parser.add_argument("--minute-step", type=int, default=1, help="Intervalo (min) entre avaliações ao vivo")
+    parser.add_argument("--parameters", default=DEFAULT_PARAMETERS_PATH, help="Arquivo de parâmetros calibrados")
+    parser.add_argument("--output", default=None, help="Salva o relatório completo em JSON")
+    args = parser.parse_args()
+
+    report = run_backtest(read_fixtures(args.events), capital=args.capital, workers=args.workers,
+                          minute_step=args.minute_step, parameters_path=args.parameters)
+
+    print(f"{'Temporada':<12}{'Partidas':>10}{'ROI':>9}{'Acerto':>9}{'Drawdown':>11}")
+    for season, m in list(report['seasons'].items()) + [('TOTAL', report['total'])]:
+        print(f"{season:<12}{m['matches']:>10}{m['roi']:>9.2%}{m['hit_rate']:>9.2%}{m['max_drawdown']:>11.2f}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, default=str)
@@ -0,0 +1,285 @@
+# project/benchmark.py
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Sequence
+import numpy as np
+from config import MatchCondition, QuantumState, QuantumBet, BET_TYPES
+from quantum.cache import ProbabilityCache
+from quantum.optimizer import QuantumOptimizer, PORTFOLIO_MARKETS, PORTFOLIO_DEFAULT_ODDS
+from modules.multi_bets import available_combinations, combo_weights
+from recommendations import PortfolioSnapshot, RecommendationEngine
+from scenarios import ScenarioIndex, SCENARIO_RULES
+
+BENCHMARK_FORMAT_VERSION = 1
+DEFAULT_SCALES = (1, 10, 100, 1_000, 10_000, 100_000)
+
+# Regressão sinalizada no modo de comparação (p50 pior que a referência por este fator)
+DEFAULT_REGRESSION_THRESHOLD = 1.25
+
+
+def synthetic_conditions(n: int, rng: np.random.Generator) -> List[MatchCondition]:
+    """Estados ao vivo realistas: gols Poisson proporcionais ao minuto e pressões em torno de 0.5"""
+    minutes = rng.integers(0, 96, n)
+    home = rng.poisson(1.4 * np.minimum(minutes, 90) / 90)
+    away = rng.poisson(1.1 * np.minimum(minutes, 90) / 90)
+    home_p = np.round(rng.beta(2, 2, n), 2)
+    away_p = np.round(rng.beta(2, 2, n), 2)
+    return [
+        MatchCondition(home_goals=int(h), away_goals=int(a), minute=int(m),
+                       home_pressure=float(hp), away_pressure=float(ap))
+        for h, a, m, hp, ap in zip(home, away, minutes, home_p, away_p)
+    ]
+
+
+def synthetic_odds(n: int, rng: np.random.Generator) -> np.ndarray:
+    """Odds pré-jogo (partidas x PORTFOLIO_MARKETS) com ±25% em torno das odds padrão"""
+    return np.round(np.array(PORTFOLIO_DEFAULT_ODDS) * rng.uniform(0.75, 1.25, (n, len(PORTFOLIO_MARKETS))), 2)
+
+
+def latency_stats(samples_ns: np.ndarray, total_s: float) -> Dict[str, float]:
+    """Percentis de latência (µs) e vazão (chamadas/s)"""
+    micros = samples_ns / 1e3
+    p50, p90, p99 = np.percentile(micros, [50, 90, 99])
+    return {
+        'calls': int(samples_ns.size),
+        'p50_us': float(p50),
+        'p90_us': float(p90),
+        'p99_us': float(p99),
+        'max_us': float(micros.max()),
+        'mean_us': float(micros.mean()),
+        'throughput': samples_ns.size / total_s if total_s > 0 else float('inf')
+    }
+
+
+def time_calls(func: Callable, args: Sequence) -> Dict[str, float]:
+    """Executa func(*arg) para cada item de args medindo cada chamada individualmente"""
+    samples = np.empty(len(args), dtype=np.int64)
+    clock = time.perf_counter_ns
+    start = clock()
+    for i, arg in enumerate(args):
+        t0 = clock()
+        func(*arg)
+        samples[i] = clock() - t0
+    return latency_stats(samples, (clock() - start) / 1e9)
+
+
+def time_batch(func: Callable, n: int) -> Dict[str, float]:
+    """Mede uma chamada vetorizada que processa n itens (latência reportada por item)"""
+    t0 = time.perf_counter_ns()
+    func()
+    elapsed = time.perf_counter_ns() - t0
+    return {
+        'calls': n,
+        'batch_ms': elapsed / 1e6,
+        'per_item_us': elapsed / 1e3 / n,
+        'throughput': n / (elapsed / 1e9) if elapsed else float('inf')
+    }
+
+
+def fresh_engine() -> RecommendationEngine:
+    """
+    Motor com otimizador, cache de probabilidades e índice de cenários próprios
+    (vazios): o PROBABILITY_CACHE e o SCENARIO_INDEX do processo ficariam
+    aquecidos entre repetições e escalas e o benchmark mediria acertos de cache.
+    """
+    optimizer = QuantumOptimizer(probability_cache=ProbabilityCache())
+    optimizer.historical_data  # parâmetros carregados fora da medição
+    return RecommendationEngine(optimizer, ScenarioIndex(SCENARIO_RULES))
+
+
+def _warm(run: Callable, func: Callable, args: Sequence) -> Dict[str, float]:
+    """Mede `func` depois de uma passada completa sobre os mesmos argumentos (caches aquecidos)"""
+    for arg in args:
+        func(*arg)
+    return run(func, args)
+
+
+def _benchmark_cases(n: int, rng: np.random.Generator) -> Dict[str, Callable]:
+    """
+    Casos de benchmark para uma escala: cada entrada recebe um motor novo
+    (fresh_engine) e retorna as estatísticas de n chamadas. Os casos com cache
+    têm a variante '_warm', medida depois de uma passada de aquecimento.
+    """
+    conditions = synthetic_conditions(n, rng)
+    markets = [BET_TYPES[i] for i in rng.integers(0, len(BET_TYPES), n)]
+    odds_matrix = synthetic_odds(n, rng)
+    odds_dicts = [dict(zip(PORTFOLIO_MARKETS, row)) for row in odds_matrix]
+    states = [list(QuantumState)[i] for i in rng.integers(0, len(QuantumState), n)]
+    probs = rng.uniform(0.05, 0.95, n)
+    kelly_odds = rng.uniform(1.2, 5.0, n)
+
+    initial_bets = [
+        {bt: QuantumBet(bt, float(a), float(o), 0.5, 0.0) for bt, a, o in zip(PORTFOLIO_MARKETS, rng.uniform(0, 15, 6), row)}
+        for row in odds_matrix
+    ]
+    combos = [available_combinations(bets) for bets in initial_bets]
+    initial_odds = [{bt: bet.odd for bt, bet in bets.items()} for bets in initial_bets]
+    volatility = [list(QuantumState)[i] for i in rng.integers(0, len(QuantumState), n)]
+
+    snapshots = [PortfolioSnapshot(100.0, bets, tuple(multi)) for bets, multi in zip(initial_bets, combos)]
+
+    packed = MatchCondition.pack(conditions)
+    codes = np.array([BET_TYPES.index(bt) for bt in markets])
+
+    recommend_args = [(s, c, v, 9.0) for s, c, v in zip(snapshots, conditions, volatility)]
+
+    return {
+        'estimate_contextual_probability': lambda engine: time_calls(
+            engine.optimizer.estimate_contextual_probability, list(zip(markets, conditions))),
+        'estimate_contextual_probability_batch': lambda engine: time_batch(
+            lambda: engine.optimizer.estimate_contextual_probability_packed(codes, packed), n),
+        'cached_probability': lambda engine: time_calls(
+            engine.optimizer.cached_probability, list(zip(markets, conditions))),
+        'cached_probability_warm': lambda engine: _warm(
+            time_calls, engine.optimizer.cached_probability, list(zip(markets, conditions))),
+        'probability_trajectory': lambda engine: time_calls(
+            lambda condition: engine.optimizer.probability_trajectory(BET_TYPES, condition),
+            [(c,) for c in conditions]),
+        'optimize_portfolio': lambda engine: time_calls(
+            lambda odds, condition, state: engine.optimizer.optimize_portfolio(odds, condition, state),
+            list(zip(odds_dicts, conditions, states))),
+        'optimize_portfolio_batch': lambda engine: time_batch(
+            lambda: engine.optimizer.optimize_portfolio_batch(odds_matrix, conditions, QuantumState.ESTAVEL), n),
+        'calculate_kelly_stake': lambda engine: time_calls(
+            engine.optimizer.calculate_kelly_stake,
+            [(float(p), float(o), 100.0, s) for p, o, s in zip(probs, kelly_odds, states)]),
+        'combo_weights': lambda engine: time_calls(
+            combo_weights, list(zip(combos, initial_odds, initial_bets))),
+        'in_play_recommendations': lambda engine: time_calls(engine.recommend, recommend_args),
+        'in_play_recommendations_warm': lambda engine: _warm(time_calls, engine.recommend, recommend_args)
+    }
+
+
+def check_batch_consistency(optimizer: QuantumOptimizer, n: int = 10_000, seed: int = 0) -> Dict[str, bool]:
+    """Verifica se os caminhos vetorizados reproduzem exatamente os escalares"""
+    rng = np.random.default_rng(seed)
+    conditions = synthetic_conditions(n, rng)
+    codes = rng.integers(0, len(BET_TYPES), n)
+
+    batch = optimizer.estimate_contextual_probability_packed(codes, MatchCondition.pack(conditions))
+    scalar = np.array([
+        optimizer.estimate_contextual_probability(BET_TYPES[c], cond) for c, cond in zip(codes, conditions)
+    ])
+
+    n_portfolio = min(n, 2_000)
+    odds_matrix = synthetic_odds(n_portfolio, rng)
+    weights = optimizer.optimize_portfolio_batch(odds_matrix, conditions[:n_portfolio], QuantumState.ESTAVEL)
+    scalar_weights = np.zeros_like(weights)
+    for i, row in enumerate(odds_matrix):
+        allocation = optimizer.optimize_portfolio(dict(zip(PORTFOLIO_MARKETS, row)), conditions[i], QuantumState.ESTAVEL)
+        for j, bt in enumerate(PORTFOLIO_MARKETS):
+            scalar_weights[i, j] = allocation.get(bt, 0.0)
+
+    return {
+        'estimate_contextual_probability': bool(np.array_equal(batch, scalar)),
+        'optimize_portfolio': bool(np.array_equal(weights, scalar_weights))
+    }
+
+
+def run_benchmarks(scales: Sequence[int] = DEFAULT_SCALES, names: Sequence[str] = None,
+                   seed: int = 0, check: bool = True) -> Dict:
+    """Executa todos os casos em cada escala e retorna o relatório (serializável em JSON)"""
+    results = {}
+    for n in scales:
+        cases = _benchmark_cases(n, np.random.default_rng(seed))
+        for name, case in cases.items():
+            if names and name not in names:
+                continue
+            # Caches vazios em cada caso e escala (os casos '_warm' aquecem os próprios)
+            results.setdefault(name, {})[str(n)] = case(fresh_engine())
+
+    return {
+        'format_version': BENCHMARK_FORMAT_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform()
+        },
+        'results': results,
+        'checks': check_batch_consistency(QuantumOptimizer(), seed=seed) if check else {}
+    }
+
+
+def compare_reports(current: Dict, baseline: Dict, threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> List[Dict]:
+    """Compara p50 (ou latência por item, nos casos vetorizados) com a referência"""
+    rows = []
+    for name, scales in current['results'].items():
+        for n, stats in scales.items():
+            reference = baseline.get('results', {}).get(name, {}).get(n)
+            if reference is None:
+                continue
+            metric = 'p50_us' if 'p50_us' in stats else 'per_item_us'
+            ratio = stats[metric] / reference[metric] if reference[metric] else float('inf')
+            rows.append({
+                'name': name,
+                'calls': int(n),
+                'metric': metric,
+                'baseline': reference[metric],
+                'current': stats[metric],
+                'ratio': ratio,
+                'regression': ratio > threshold
+            })
+    return rows
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_report(report: Dict):
+    print(f"{'Caso':<40}{'Chamadas':>10}{'p50 (µs)':>12}{'p99 (µs)':>12}{'Chamadas/s':>14}")
+    for name, scales in report['results'].items():
+        for n, stats in scales.items():
+            p50 = stats.get('p50_us', stats.get('per_item_us'))
+            p99 = stats.get('p99_us', float('nan'))
+            print(f"{name:<40}{n:>10}{p50:>12.2f}{p99:>12.2f}{stats['throughput']:>14.0f}")
+    for name, ok in report['checks'].items():
+        print(f"Consistência escalar x vetorizado ({name}): {'OK' if ok else 'DIVERGENTE'}")
+
+
+if __name__ == "__main__":
+    # Uso: python -m benchmark --output bench.json [--compare bench_base.json]
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos críticos do otimizador e da fase ao vivo")
+    parser.add_argument("--scales", default=','.join(str(s) for s in DEFAULT_SCALES),
+                        help="Números de chamadas separados por vírgula")
+    parser.add_argument("--only", default=None, help="Casos a executar, separados por vírgula")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-check", action="store_true", help="Pula a verificação escalar x vetorizado")
+    parser.add_argument("--output", default=None, help="Salva o relatório em JSON")
+    parser.add_argument("--compare", default=None, help="Relatório JSON de referência")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="Fator de piora do p50 considerado regressão")
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        scales=[int(s) for s in args.scales.split(',')],
+        names=args.only.split(',') if args.only else None,
+        seed=args.seed,
+        check=not args.no_check
+    )
+    _print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    failed = not all(report['checks'].values())
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        for row in compare_reports(report, baseline, args.threshold):
+            flag = ' REGRESSÃO' if row['regression'] else ''
+            print(f"{row['name']:<40}{row['calls']:>10}  {row['baseline']:.2f} -> {row['current']:.2f} "
+                  f"({row['ratio']:.2f}x){flag}")
+            failed |= row['regression']
+    sys.exit(1 if failed else 0)
@@ -1,18 +1,489 @@
 # project/bridge.py
+import argparse
+import logging
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from config import BET_TYPES, BET_TYPE_INDEX, MATCH_CONDITION_DTYPE
+from metrics import METRICS
+from portfolio import LEG_COLUMNS, POSITION_COLUMNS, PortfolioStore
+from quantum.optimizer import PORTFOLIO_MARKETS
+
+logger = logging.getLogger(__name__)
+
+
 class SystemBridge:
     def __init__(self):
         self.modules = {}
-        
+
     def register_module(self, name, module):
         self.modules[name] = module
-        
+
     def get_module(self, name):
         return self.modules.get(name)
-        
+
     def get_multi_bets_data(self):
         if 'multi_bets' in self.modules:
             return {
                 'combos': self.modules['multi_bets'].state['selected_combos'],
                 'amounts': self.modules['multi_bets'].state['calculated_amounts']
             }
-        return None
\ No newline at end of file
+        return None
+
+
+# --- Memória compartilhada entre processos ---
+# Regiões do segmento; cada uma tem um contador de versão próprio
+REGION_PORTFOLIO, REGION_MATCHES, REGION_RECOMMENDATIONS = 0, 1, 2
+REGIONS = {
+    'portfolio': REGION_PORTFOLIO,
+    'matches': REGION_MATCHES,
+    'recommendations': REGION_RECOMMENDATIONS
+}
+
+BRIDGE_MAGIC = 0x464C5558  # 'FLUX'
+# Incrementar quando o layout do segmento mudar (processos com layouts diferentes não se conectam)
+BRIDGE_LAYOUT = 1
+
+# Capacidades (posições, pernas, partidas, recomendações): o segmento não cresce depois de criado
+DEFAULT_CAPACITY = (4096, 8192, 256, 4096)
+
+MATCH_ID_BYTES = 32
+SCENARIO_NAME_BYTES = 64
+
+# Cabeçalho: capacidades, versão e tamanho ocupado de cada região e o capital do portfólio.
+# A versão é ímpar enquanto a região está sendo escrita (seqlock): leitores
+# copiam os dados e repetem a leitura se a versão mudou no meio.
+BRIDGE_HEADER_DTYPE = np.dtype([
+    ('magic', np.int64),
+    ('layout', np.int64),
+    ('capacity', np.int64, (4,)),
+    ('version', np.int64, (len(REGIONS),)),
+    ('size', np.int64, (4,)),
+    ('capital', np.float64)
+])
+_POSITIONS, _LEGS, _MATCHES, _RECOMMENDATIONS = range(4)
+
+# Estado de cada partida (mesmas colunas do MatchBoard); `fixture` liga a partida
+# às posições do portfólio e `bankroll` é o capital do portfólio dessa partida
+MATCH_STATE_DTYPE = np.dtype([
+    ('match_id', f'S{MATCH_ID_BYTES}'),
+    ('fixture', np.int32),
+    ('condition', MATCH_CONDITION_DTYPE),
+    ('volatility', np.int8),
+    ('last_volatility', np.int8),
+    ('red_card_team', np.int8),
+    ('red_card_minute', np.int16),
+    ('finished', np.bool_),
+    ('bankroll', np.float64),
+    ('capital', np.float64),
+    ('probabilities', np.float64, (len(PORTFOLIO_MARKETS),)),
+    ('version', np.int64)
+])
+
+# Recomendações calculadas: `match` é a linha da partida e `version` a versão do estado usada no cálculo
+RECOMMENDATION_DTYPE = np.dtype([
+    ('match', np.int32),
+    ('version', np.int64),
+    ('market', np.int16),
+    ('name', f'S{SCENARIO_NAME_BYTES}'),
+    ('stake', np.float64),
+    ('odd', np.float64),
+    ('prob', np.float64),
+    ('ev', np.float64),
+    ('protection_ratio', np.float64)
+])
+
+# Espera entre consultas da versão em `wait`
+DEFAULT_POLL_INTERVAL = 0.001
+
+
+def _layout(capacity: Sequence[int]) -> Tuple[Dict[str, Tuple[int, np.dtype, int]], int]:
+    """Offsets (nome -> (offset, dtype, linhas)) das colunas no segmento e o tamanho total"""
+    positions, legs, matches, recommendations = capacity
+    columns = [(name, dtype, positions) for name, dtype in POSITION_COLUMNS]
+    columns += [(name, dtype, legs) for name, dtype in LEG_COLUMNS]
+    columns += [('matches', MATCH_STATE_DTYPE, matches), ('recommendations', RECOMMENDATION_DTYPE, recommendations)]
+
+    offsets = {}
+    offset = BRIDGE_HEADER_DTYPE.itemsize
+    for name, dtype, rows in columns:
+        dtype = np.dtype(dtype)
+        offset = -(-offset // 64) * 64  # colunas alinhadas em 64 bytes
+        offsets[name] = (offset, dtype, rows)
+        offset += dtype.itemsize * rows
+    return offsets, offset
+
+
+def _open_segment(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Até o Python 3.12 o resource_tracker registra também quem só se conecta
+    # ao segmento e o apaga quando esse processo termina
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _encode(text: str, size: int, what: str) -> bytes:
+    encoded = text.encode('utf-8')
+    if len(encoded) > size:
+        raise ValueError(f"{what} com mais de {size} bytes: {text!r}")
+    return encoded
+
+
+class SharedBridge(SystemBridge):
+    """
+    Ponte entre processos em multiprocessing.shared_memory: colunas do
+    PortfolioStore, estado das partidas (MATCH_STATE_DTYPE) e recomendações
+    (RECOMMENDATION_DTYPE) ficam num único segmento, lidas pelos workers como
+    arrays NumPy sem pickle. Cada região tem um contador de versão: `version`
+    custa uma leitura de inteiro e os leitores só copiam quando ele muda.
+    Cada região deve ter um único processo escritor.
+
+    O processo que cria o segmento (`create=True`) é o dono e o remove em
+    `unlink`; os workers usam `SharedBridge.attach(nome)`.
+    """
+    def __init__(self, name: str = None, create: bool = True, capacity: Sequence[int] = DEFAULT_CAPACITY):
+        super().__init__()
+        if create:
+            capacity = tuple(int(c) for c in capacity)
+            if len(capacity) != 4 or min(capacity) <= 0:
+                raise ValueError("capacity deve ter 4 valores positivos (posições, pernas, partidas, recomendações)")
+            _, total = _layout(capacity)
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=total)
+        else:
+            if not name:
+                raise ValueError("Informe o nome do segmento para se conectar")
+            self._shm = _open_segment(name)
+
+        self._header = np.ndarray((), dtype=BRIDGE_HEADER_DTYPE, buffer=self._shm.buf)
+        if create:
+            self._header['magic'] = BRIDGE_MAGIC
+            self._header['layout'] = BRIDGE_LAYOUT
+            self._header['capacity'] = capacity
+        elif self._header['magic'] != BRIDGE_MAGIC or self._header['layout'] != BRIDGE_LAYOUT:
+            self._header = None
+            self._shm.close()
+            raise ValueError(f"Segmento '{name}' não é uma ponte compatível (layout {BRIDGE_LAYOUT})")
+
+        self.owner = create
+        self.capacity = tuple(int(c) for c in self._header['capacity'])
+        offsets, _ = _layout(self.capacity)
+        self._columns = {
+            name: np.ndarray((rows,), dtype=dtype, buffer=self._shm.buf, offset=offset)
+            for name, (offset, dtype, rows) in offsets.items()
+        }
+        self._versions = self._header['version']
+        self._sizes = self._header['size']
+        self._write_lock = threading.Lock()
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedBridge':
+        """Conecta-se a um segmento criado por outro processo"""
+        return cls(name, create=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        if self.owner:
+            self.unlink()
+        return False
+
+    def close(self):
+        """Solta as visões e desconecta do segmento"""
+        if self._header is None:
+            return
+        self._columns = {}
+        self._header = self._versions = self._sizes = None
+        self._shm.close()
+
+    def unlink(self):
+        """Remove o segmento do sistema (somente o dono)"""
+        if self.owner:
+            self._shm.unlink()
+
+    # --- Versões ---
+    def version(self, region: str) -> int:
+        """Quantas publicações completas a região já recebeu (0 = nunca escrita)"""
+        return int(self._versions[REGIONS[region]]) >> 1
+
+    def changed(self, region: str, since: int) -> bool:
+        return self.version(region) != since
+
+    def wait(self, region: str, since: int, timeout: float = None,
+             poll: float = DEFAULT_POLL_INTERVAL) -> Optional[int]:
+        """Aguarda uma versão diferente de `since`; retorna a nova versão (None se esgotar o tempo)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self.version(region)
+            if current != since:
+                return current
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll)
+
+    def _write(self, region: int, write):
+        with self._write_lock:
+            self._versions[region] += 1
+            try:
+                write()
+            finally:
+                self._versions[region] += 1
+
+    def _read(self, region: int, read):
+        """Leitura consistente (seqlock): retorna (versão, dados copiados)"""
+        versions = self._versions
+        while True:
+            before = int(versions[region])
+            if before & 1:
+                time.sleep(0)
+                continue
+            data = read()
+            if int(versions[region]) == before:
+                return before >> 1, data
+            METRICS.count('bridge.read_retries')
+
+    def _check_capacity(self, index: int, rows: int, what: str):
+        if rows > self.capacity[index]:
+            raise ValueError(f"{what}: {rows} linhas excedem a capacidade da ponte ({self.capacity[index]})")
+
+    # --- Portfólio ---
+    def publish_portfolio(self, store: PortfolioStore, capital: float = 0.0) -> int:
+        """Copia as colunas do PortfolioStore para o segmento; retorna a nova versão"""
+        size, legs_size = len(store), len(store.leg_market)
+        self._check_capacity(_POSITIONS, size, "Posições")
+        self._check_capacity(_LEGS, legs_size, "Pernas")
+
+        def write():
+            for name, _ in POSITION_COLUMNS:
+                self._columns[name][:size] = getattr(store, name)
+            for name, _ in LEG_COLUMNS:
+                self._columns[name][:legs_size] = getattr(store, name)
+            self._sizes[_POSITIONS] = size
+            self._sizes[_LEGS] = legs_size
+            self._header['capital'] = capital
+
+        self._write(REGION_PORTFOLIO, write)
+        return self.version('portfolio')
+
+    def read_portfolio(self) -> Tuple[int, float, PortfolioStore]:
+        """(versão, capital, cópia do PortfolioStore publicado)"""
+        def read():
+            size, legs_size = int(self._sizes[_POSITIONS]), int(self._sizes[_LEGS])
+            columns = {name: self._columns[name][:size].copy() for name, _ in POSITION_COLUMNS}
+            columns.update({name: self._columns[name][:legs_size].copy() for name, _ in LEG_COLUMNS})
+            return float(self._header['capital']), columns
+
+        version, (capital, columns) = self._read(REGION_PORTFOLIO, read)
+        return version, capital, PortfolioStore.from_columns(columns)
+
+    # --- Partidas ---
+    def publish_matches(self, board, fixtures: Sequence[int] = None) -> int:
+        """
+        Publica o estado das partidas de um MatchBoard (condições, volatilidade,
+        cartão vermelho, capital e probabilidades). `fixtures` liga cada linha às
+        posições do portfólio publicado; por padrão, todas usam a partida 0
+        (a mesma de PortfolioStore.from_portfolio), ou seja, um portfólio único.
+        """
+        n = len(board)
+        self._check_capacity(_MATCHES, n, "Partidas")
+        match_ids = [_encode(match_id, MATCH_ID_BYTES, "match_id") for match_id in board.match_ids]
+
+        def write():
+            state = self._columns['matches'][:n]
+            state['match_id'] = match_ids
+            state['fixture'] = 0 if fixtures is None else fixtures
+            state['condition'] = board.conditions[:n]
+            state['volatility'] = board.volatility[:n]
+            state['last_volatility'] = board.last_volatility[:n]
+            state['red_card_team'] = board.red_card_team[:n]
+            state['red_card_minute'] = board.red_card_minute[:n]
+            state['finished'] = board.finished[:n]
+            state['bankroll'] = [portfolio.capital for portfolio in board.portfolios]
+            state['capital'] = board.capital[:n]
+            state['probabilities'] = board.probabilities[:n]
+            state['version'] = board.version[:n]
+            self._sizes[_MATCHES] = n
+
+        self._write(REGION_MATCHES, write)
+        return self.version('matches')
+
+    def read_matches(self) -> Tuple[int, np.ndarray]:
+        """(versão, cópia do array MATCH_STATE_DTYPE das partidas publicadas)"""
+        return self._read(REGION_MATCHES, lambda: self._columns['matches'][:int(self._sizes[_MATCHES])].copy())
+
+    # --- Recomendações ---
+    def publish_recommendations(self, recommendations: Sequence[Sequence[Dict]],
+                                versions: Sequence[int] = None) -> int:
+        """
+        Publica as recomendações por linha de partida (a lista de registros do
+        RecommendationEngine de cada linha). `versions` é a versão do estado de
+        cada linha usada no cálculo. Textos de estratégia e proteção não são
+        publicados: o worker/UI os recalcula se precisar.
+        """
+        rows = [(match, rec) for match, recs in enumerate(recommendations) for rec in recs]
+        self._check_capacity(_RECOMMENDATIONS, len(rows), "Recomendações")
+        packed = np.zeros(len(rows), dtype=RECOMMENDATION_DTYPE)
+        if rows:
+            packed['match'] = [match for match, _ in rows]
+            if versions is not None:
+                packed['version'] = [versions[match] for match, _ in rows]
+            packed['market'] = [BET_TYPE_INDEX[rec['bet_type']] for _, rec in rows]
+            packed['name'] = [_encode(rec['name'], SCENARIO_NAME_BYTES, "Cenário") for _, rec in rows]
+            for field in ('stake', 'odd', 'prob', 'ev', 'protection_ratio'):
+                packed[field] = [rec.get(field, 0.0) for _, rec in rows]
+
+        def write():
+            self._columns['recommendations'][:len(packed)] = packed
+            self._sizes[_RECOMMENDATIONS] = len(packed)
+
+        self._write(REGION_RECOMMENDATIONS, write)
+        return self.version('recommendations')
+
+    def read_recommendations(self) -> Tuple[int, np.ndarray]:
+        """(versão, cópia do array RECOMMENDATION_DTYPE publicado)"""
+        return self._read(REGION_RECOMMENDATIONS,
+                          lambda: self._columns['recommendations'][:int(self._sizes[_RECOMMENDATIONS])].copy())
+
+    def publish_board(self, board, fixtures: Sequence[int] = None) -> Tuple[int, int]:
+        """Partidas e recomendações atuais de um MatchBoard; retorna as duas versões"""
+        matches = self.publish_matches(board, fixtures)
+        n = len(board)
+        return matches, self.publish_recommendations(board.recommendations, board.computed[:n])
+
+
+def unpack_recommendations(packed: np.ndarray, matches: int) -> List[List[Dict]]:
+    """Registros de recomendação por linha de partida a partir do array publicado"""
+    result = [[] for _ in range(matches)]
+    for row in packed:
+        result[int(row['match'])].append({
+            'bet_type': BET_TYPES[int(row['market'])],
+            'name': row['name'].decode('utf-8'),
+            'stake': float(row['stake']),
+            'odd': float(row['odd']),
+            'prob': float(row['prob']),
+            'ev': float(row['ev']),
+            'protection_ratio': float(row['protection_ratio'])
+        })
+    return result
+
+
+class RecommendationWorker:
+    """
+    Recalcula as recomendações num processo separado da interface: lê o
+    portfólio e o estado das partidas da ponte, mantém um MatchBoard local e
+    só recalcula as linhas cuja versão mudou, publicando o resultado na
+    região de recomendações.
+    """
+    def __init__(self, bridge: SharedBridge, engine=None):
+        from monitor import MatchBoard
+        from recommendations import RecommendationEngine
+        from resources import shared_optimizer
+
+        self.bridge = bridge
+        self.engine = engine or RecommendationEngine(shared_optimizer())
+        self.board = MatchBoard()
+        self._snapshots = {}
+        self._portfolio_version = -1
+        self._matches_version = 0
+        self._seen: Dict[str, int] = {}
+        self._published_order: List[str] = None
+
+    def _load_portfolio(self):
+        from recommendations import PortfolioSnapshot
+        version, capital, store = self.bridge.read_portfolio()
+        self._snapshots = {}
+        for fixture in np.unique(store.fixture).tolist():
+            portfolio = store.to_portfolio(capital, fixture=fixture)
+            self._snapshots[fixture] = PortfolioSnapshot.from_portfolio(portfolio)
+        self._portfolio_version = version
+        self._seen.clear()  # portfólio novo: todas as partidas são recalculadas
+
+    def step(self) -> int:
+        """Sincroniza com a ponte e recalcula o que mudou; retorna quantas partidas foram recalculadas"""
+        from recommendations import PortfolioSnapshot
+
+        if self.bridge.version('portfolio') != self._portfolio_version:
+            self._load_portfolio()
+        self._matches_version, state = self.bridge.read_matches()
+
+        board = self.board
+        match_ids = [m.decode('utf-8') for m in state['match_id']]
+        published = set(match_ids)
+        for match_id in [m for m in board.match_ids if m not in published]:
+            board.remove(match_id)
+            self._seen.pop(match_id, None)
+        for match_id, entry in zip(match_ids, state):
+            if self._seen.get(match_id) == int(entry['version']):
+                continue
+            snapshot = self._snapshots.get(int(entry['fixture']))
+            if snapshot is None:
+                snapshot = PortfolioSnapshot(float(entry['bankroll']), {}, ())
+            else:
+                snapshot = snapshot._replace(capital=float(entry['bankroll']))
+            row = board.add(match_id, snapshot)
+            board.conditions[row] = entry['condition']
+            board.volatility[row] = entry['volatility']
+            board.last_volatility[row] = entry['last_volatility']
+            board.red_card_team[row] = entry['red_card_team']
+            board.red_card_minute[row] = entry['red_card_minute']
+            board.finished[row] = entry['finished']
+            board.version[row] = board.computed[row] + 1
+            self._seen[match_id] = int(entry['version'])
+
+        rows = board.refresh(self.engine)
+        # Republica também quando partidas saíram ou mudaram de posição sem recálculo
+        if rows.size or match_ids != self._published_order:
+            # Recomendações na ordem das linhas publicadas pela interface
+            order = [board.row(match_id) for match_id in match_ids]
+            versions = state['version'].tolist()
+            self.bridge.publish_recommendations([board.recommendations[row] for row in order], versions)
+            self._published_order = match_ids
+        return int(rows.size)
+
+    def run(self, timeout: float = None, poll: float = DEFAULT_POLL_INTERVAL):
+        """
+        Laço do worker: recalcula a cada nova versão das partidas ou do portfólio.
+        Com `timeout`, encerra após esse tempo sem atualizações.
+        """
+        bridge = self.bridge
+        idle_since = time.monotonic()
+        self.step()
+        while True:
+            if (bridge.version('matches') != self._matches_version
+                    or bridge.version('portfolio') != self._portfolio_version):
+                self.step()
+                idle_since = time.monotonic()
+            elif timeout is not None and time.monotonic() - idle_since >= timeout:
+                return
+            else:
+                time.sleep(poll)
+
+
+if __name__ == "__main__":
+    # Uso: python -m bridge worker <nome-do-segmento> [--timeout 60]
+    parser = argparse.ArgumentParser(description="Worker de recomendações conectado à ponte de memória compartilhada")
+    parser.add_argument("command", choices=['worker'])
+    parser.add_argument("name")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Encerra após esse tempo sem atualizações (s)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    bridge = SharedBridge.attach(args.name)
+    try:
+        RecommendationWorker(bridge).run(args.timeout)
+    finally:
+        bridge.close()
@@ -1,7 +1,9 @@
 # flux_on/project/config.py
 from enum import Enum
-from dataclasses import dataclass, field
-from typing import Dict, List  # Adicione List aqui
+from dataclasses import dataclass, field, FrozenInstanceError
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple  # Adicione List aqui
+import numpy as np
 
 # O resto do código permanece o mesmo
 
@@ -34,31 +36,152 @@ class BetType(Enum):
     NO_MORE_GOALS = "Sem Mais Gols"  # Para partidas "mornas"
     NEXT_GOAL_LOSING_TEAM = "Próximo Gol - Time Perdendo"  # Pressão inversa
 
-    # --- Métodos auxiliares ---
+    # --- Métodos auxiliares (consultas O(1) no registro de mercados) ---
     @classmethod
     def get_opposite(cls, bet_type):
         """Retorna o tipo de aposta oposto para estratégias de hedge"""
-        opposites = {
-            cls.HOME_WIN: cls.AWAY_WIN,
-            cls.AWAY_WIN: cls.HOME_WIN,
-            cls.OVER_25: cls.UNDER_25,
-            cls.BOTH_TO_SCORE: cls.BOTH_TO_SCORE_NO,
-            cls.UNDER_25: cls.OVER_25,
-            cls.DRAW: None,  # Não tem oposto direto
-            cls.NEXT_GOAL_HOME: cls.NEXT_GOAL_AWAY,
-            cls.NEXT_GOAL_AWAY: cls.NEXT_GOAL_HOME
-        }
-        return opposites.get(bet_type)
+        return _market_lookup(MARKET_OPPOSITE, bet_type)
     
     @classmethod
     def is_under_over_type(cls, bet_type):
         """Verifica se é uma aposta do tipo under/over"""
-        return bet_type in [cls.UNDER_25, cls.OVER_25, cls.UNDER_35, cls.OVER_15_FH, cls.OVER_15_MATCH]
+        return bool(MARKET_CATEGORIES[BET_TYPE_INDEX[bet_type]] & MARKET_UNDER_OVER)
     
     @classmethod
     def is_winner_type(cls, bet_type):
         """Verifica se é uma aposta no vencedor"""
-        return bet_type in [cls.HOME_WIN, cls.AWAY_WIN, cls.DRAW, cls.WINNER]
+        return bool(MARKET_CATEGORIES[BET_TYPE_INDEX[bet_type]] & MARKET_WINNER)
+
+# Ordem canônica dos mercados: o índice inteiro é usado pelas APIs vetorizadas
+BET_TYPES = tuple(BetType)
+BET_TYPE_INDEX = {bet_type: i for i, bet_type in enumerate(BET_TYPES)}
+
+# --- Registro de mercados (construído uma vez na importação) ---
+# Categorias em bitmask: um mercado pode pertencer a várias
+MARKET_CORE = 1 << 0
+MARKET_HEDGE = 1 << 1
+MARKET_SPECIAL = 1 << 2
+MARKET_UNDER_OVER = 1 << 3
+MARKET_WINNER = 1 << 4
+MARKET_NEXT_GOAL = 1 << 5
+MARKET_FIRST_HALF = 1 << 6
+
+NO_MARKET = -1
+
+class MarketInfo(NamedTuple):
+    """Metadados de exibição e classificação de um mercado"""
+    index: int
+    bet_type: BetType
+    label: str
+    categories: int
+    fallback_odd: float
+
+_MARKET_CATEGORIES = {
+    BetType.UNDER_25: MARKET_CORE | MARKET_UNDER_OVER,
+    BetType.OVER_15_FH: MARKET_CORE | MARKET_UNDER_OVER | MARKET_FIRST_HALF,
+    BetType.BOTH_TO_SCORE: MARKET_CORE,
+    BetType.BOTH_TO_SCORE_NO: MARKET_CORE | MARKET_HEDGE,
+    BetType.WINNER: MARKET_CORE | MARKET_WINNER,
+    BetType.HOME_WIN: MARKET_CORE | MARKET_WINNER,
+    BetType.AWAY_WIN: MARKET_CORE | MARKET_WINNER,
+    BetType.DRAW: MARKET_CORE | MARKET_WINNER,
+    BetType.OVER_25: MARKET_HEDGE | MARKET_UNDER_OVER,
+    BetType.UNDER_35: MARKET_HEDGE | MARKET_UNDER_OVER,
+    BetType.NO_GOAL: MARKET_HEDGE,
+    BetType.NEXT_GOAL_HOME: MARKET_SPECIAL | MARKET_NEXT_GOAL,
+    BetType.NEXT_GOAL_AWAY: MARKET_SPECIAL | MARKET_NEXT_GOAL,
+    BetType.GOAL_NEXT_5_MIN: MARKET_SPECIAL,
+    BetType.DOUBLE_CHANCE_UNDERDOG: MARKET_SPECIAL,
+    BetType.OVER_15_MATCH: MARKET_SPECIAL | MARKET_UNDER_OVER,
+    BetType.AWAY_HANDICAP: MARKET_SPECIAL,
+    BetType.NO_MORE_GOALS: MARKET_SPECIAL,
+    BetType.NEXT_GOAL_LOSING_TEAM: MARKET_SPECIAL | MARKET_NEXT_GOAL
+}
+# Oposto direto (BetType.get_opposite)
+_MARKET_OPPOSITES = {
+    BetType.HOME_WIN: BetType.AWAY_WIN,
+    BetType.AWAY_WIN: BetType.HOME_WIN,
+    BetType.OVER_25: BetType.UNDER_25,
+    BetType.BOTH_TO_SCORE: BetType.BOTH_TO_SCORE_NO,
+    BetType.UNDER_25: BetType.OVER_25,
+    BetType.NEXT_GOAL_HOME: BetType.NEXT_GOAL_AWAY,
+    BetType.NEXT_GOAL_AWAY: BetType.NEXT_GOAL_HOME
+}
+
+# Hedge usado pelo módulo ao vivo (posição aberta -> proteção)
+_MARKET_HEDGES = {
+    BetType.HOME_WIN: BetType.AWAY_WIN,
+    BetType.AWAY_WIN: BetType.HOME_WIN,
+    BetType.OVER_25: BetType.UNDER_25,
+    BetType.BOTH_TO_SCORE: BetType.BOTH_TO_SCORE_NO
+}
+
+# Par proteção (70%) -> ataque (30%): (casa pressiona mais, visitante pressiona mais)
+_MARKET_ATTACKS = {
+    BetType.UNDER_25: (BetType.OVER_25, BetType.OVER_25),
+    BetType.BOTH_TO_SCORE_NO: (BetType.BOTH_TO_SCORE, BetType.BOTH_TO_SCORE),
+    BetType.DRAW: (BetType.HOME_WIN, BetType.AWAY_WIN)
+}
+
+_MARKET_FALLBACK_ODDS = {
+    BetType.HOME_WIN: 2.0,
+    BetType.AWAY_WIN: 3.5,
+    BetType.DRAW: 3.2,
+    BetType.OVER_25: 1.8,
+    BetType.UNDER_25: 2.0
+}
+
+def _market_index_array(mapping, columns: int = None) -> np.ndarray:
+    shape = (len(BET_TYPES),) if columns is None else (len(BET_TYPES), columns)
+    table = np.full(shape, NO_MARKET, dtype=np.int16)
+    for bet_type, target in mapping.items():
+        if columns is None:
+            table[BET_TYPE_INDEX[bet_type]] = BET_TYPE_INDEX[target]
+        else:
+            table[BET_TYPE_INDEX[bet_type]] = [BET_TYPE_INDEX[t] for t in target]
+    table.flags.writeable = False
+    return table
+
+MARKET_CATEGORIES = np.array([_MARKET_CATEGORIES[bt] for bt in BET_TYPES], dtype=np.uint16)
+MARKET_CATEGORIES.flags.writeable = False
+MARKET_OPPOSITE = _market_index_array(_MARKET_OPPOSITES)
+MARKET_HEDGE_TARGET = _market_index_array(_MARKET_HEDGES)
+MARKET_ATTACK_TARGET = _market_index_array(_MARKET_ATTACKS, columns=2)
+MARKET_FALLBACK_ODDS = np.array([_MARKET_FALLBACK_ODDS.get(bt, 2.0) for bt in BET_TYPES])
+MARKET_FALLBACK_ODDS.flags.writeable = False
+
+MARKETS = tuple(
+    MarketInfo(i, bt, bt.value, int(MARKET_CATEGORIES[i]), float(MARKET_FALLBACK_ODDS[i]))
+    for i, bt in enumerate(BET_TYPES)
+)
+
+def market_codes(bet_types) -> np.ndarray:
+    """Converte BetType (ou sequência deles) para os índices inteiros de BET_TYPES"""
+    if isinstance(bet_types, BetType):
+        return np.asarray(BET_TYPE_INDEX[bet_types])
+    codes = np.asarray(bet_types)
+    if codes.dtype == object:
+        return np.vectorize(BET_TYPE_INDEX.__getitem__, otypes=[np.int64])(codes)
+    return codes.astype(np.int64, copy=False)
+
+def has_category(bet_types, category: int):
+    """Testa a categoria de um mercado (bool) ou de um vetor de mercados (array booleano)"""
+    result = (MARKET_CATEGORIES[market_codes(bet_types)] & category) != 0
+    return bool(result) if result.ndim == 0 else result
+
+def _market_lookup(table: np.ndarray, bet_type: BetType):
+    """Consulta uma tabela de índices para um único mercado (None quando não há alvo)"""
+    target = int(table[BET_TYPE_INDEX[bet_type]])
+    return None if target == NO_MARKET else BET_TYPES[target]
+
+def get_hedge_market(bet_type: BetType):
+    """Mercado de proteção para uma posição aberta (None se não houver)"""
+    return _market_lookup(MARKET_HEDGE_TARGET, bet_type)
+
+def get_attack_market(bet_type: BetType, home_pressure: float, away_pressure: float):
+    """Mercado de ataque (30%) que complementa uma proteção (70%), ou None"""
+    target = int(MARKET_ATTACK_TARGET[BET_TYPE_INDEX[bet_type], 0 if home_pressure > away_pressure else 1])
+    return None if target == NO_MARKET else BET_TYPES[target]
 
 class QuantumState(Enum):
     """
@@ -71,17 +194,113 @@ class QuantumState(Enum):
     TRANSICAO = "Transição"
     CAOTICO = "Caótico"
 
-@dataclass
+@lru_cache(maxsize=256)
+def parse_score(score: str) -> Tuple[int, int]:
+    """Converte um placar 'casa-visitante' em inteiros (resultado em cache)"""
+    home, away = score.split('-')
+    return int(home), int(away)
+
+# Forma compacta (array estruturado) de MatchCondition para processamento em lote
+MATCH_CONDITION_DTYPE = np.dtype([
+    ('home_goals', np.int16),
+    ('away_goals', np.int16),
+    ('minute', np.float64),
+    ('home_pressure', np.float64),
+    ('away_pressure', np.float64)
+])
+
 class MatchCondition:
     """
     Representa uma fotografia do estado atual da partida.
-    Agora com suporte para contexto da partida.
+    Imutável, hashable e com __slots__: os gols ficam como inteiros e `score`
+    é uma propriedade de compatibilidade. O construtor continua aceitando o placar
+    em texto ("1-0"), ou home_goals/away_goals diretamente.
     """
-    score: str = "0-0"
-    minute: int = 0
-    home_pressure: float = 0.5
-    away_pressure: float = 0.5
-    match_context: List[str] = field(default_factory=list)  # Novo campo adicionado
+    __slots__ = ('home_goals', 'away_goals', 'minute', 'home_pressure', 'away_pressure', 'match_context')
+
+    def __init__(self, score: str = "0-0", minute: int = 0, home_pressure: float = 0.5,
+                 away_pressure: float = 0.5, match_context: Tuple[str, ...] = (),
+                 home_goals: int = None, away_goals: int = None):
+        if home_goals is None or away_goals is None:
+            home_goals, away_goals = parse_score(score)
+        set_field = object.__setattr__
+        set_field(self, 'home_goals', int(home_goals))
+        set_field(self, 'away_goals', int(away_goals))
+        set_field(self, 'minute', minute)
+        set_field(self, 'home_pressure', home_pressure)
+        set_field(self, 'away_pressure', away_pressure)
+        set_field(self, 'match_context', tuple(match_context))
+
+    @property
+    def score(self) -> str:
+        return f"{self.home_goals}-{self.away_goals}"
+
+    @property
+    def total_goals(self) -> int:
+        return self.home_goals + self.away_goals
+
+    def replace(self, **changes) -> 'MatchCondition':
+        """Cópia com campos alterados (equivalente a dataclasses.replace)"""
+        if 'score' in changes:
+            changes['home_goals'], changes['away_goals'] = parse_score(changes.pop('score'))
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return MatchCondition(**fields)
+
+    def _key(self) -> tuple:
+        return (self.home_goals, self.away_goals, self.minute,
+                self.home_pressure, self.away_pressure, self.match_context)
+
+    def __setattr__(self, name, value):
+        raise FrozenInstanceError(f"MatchCondition é imutável; use replace({name}=...)")
+
+    def __delattr__(self, name):
+        raise FrozenInstanceError("MatchCondition é imutável")
+
+    def __eq__(self, other):
+        if not isinstance(other, MatchCondition):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __reduce__(self):
+        return (_restore_match_condition, self._key())
+
+    def __repr__(self):
+        return (f"MatchCondition(score={self.score!r}, minute={self.minute!r}, "
+                f"home_pressure={self.home_pressure!r}, away_pressure={self.away_pressure!r}, "
+                f"match_context={self.match_context!r})")
+
+    @staticmethod
+    def pack(conditions) -> np.ndarray:
+        """Empacota uma sequência de condições no array estruturado MATCH_CONDITION_DTYPE"""
+        packed = np.empty(len(conditions), dtype=MATCH_CONDITION_DTYPE)
+        packed['home_goals'] = [c.home_goals for c in conditions]
+        packed['away_goals'] = [c.away_goals for c in conditions]
+        packed['minute'] = [c.minute for c in conditions]
+        packed['home_pressure'] = [c.home_pressure for c in conditions]
+        packed['away_pressure'] = [c.away_pressure for c in conditions]
+        return packed
+
+    @staticmethod
+    def unpack(packed: np.ndarray) -> List['MatchCondition']:
+        """Reconstrói as condições a partir do array empacotado (sem match_context)"""
+        return [
+            MatchCondition(home_goals=int(row['home_goals']), away_goals=int(row['away_goals']),
+                           minute=_packed_minute(row['minute']), home_pressure=float(row['home_pressure']),
+                           away_pressure=float(row['away_pressure']))
+            for row in packed
+        ]
+
+def _packed_minute(value) -> float:
+    minute = float(value)
+    return int(minute) if minute.is_integer() else minute
+
+def _restore_match_condition(home_goals, away_goals, minute, home_pressure, away_pressure, match_context):
+    return MatchCondition(minute=minute, home_pressure=home_pressure, away_pressure=away_pressure,
+                          match_context=match_context, home_goals=home_goals, away_goals=away_goals)
 
 @dataclass
 class QuantumBet:
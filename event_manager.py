@@ -1,18 +1,342 @@
 # project/event_manager.py
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Prioridades dos tópicos (menor = despachado primeiro)
+PRIORITY_CRITICAL = 0   # gols, cartões, fim de jogo
+PRIORITY_NORMAL = 5
+PRIORITY_BULK = 9       # ticks de odds e pressão
+
+# Modos de entrega de um assinante
+DISPATCH_SYNC = 'sync'        # na thread de quem publica (comportamento original)
+DISPATCH_THREAD = 'thread'    # no pool de threads do barramento
+DISPATCH_ASYNC = 'async'      # no event loop informado na assinatura
+
+DEFAULT_QUEUE_SIZE = 1024
+DEFAULT_WORKERS = 4
+
+
+class TopicConfig(NamedTuple):
+    """Configuração de um tópico do barramento"""
+    priority: int = PRIORITY_NORMAL
+    maxsize: int = DEFAULT_QUEUE_SIZE
+    batch_size: int = 1           # eventos entregues juntos aos assinantes com batch=True
+    batch_window: float = 0.0     # segundos aguardando o lote encher (0 = entrega o que houver)
+    overflow: str = 'drop_oldest' # 'drop_oldest' ou 'block' (quem publica espera espaço)
+
+
+# Tópicos conhecidos; os demais usam TopicConfig()
+DEFAULT_TOPICS = {
+    'goal': TopicConfig(priority=PRIORITY_CRITICAL, overflow='block'),
+    'red_card': TopicConfig(priority=PRIORITY_CRITICAL, overflow='block'),
+    'full_time': TopicConfig(priority=PRIORITY_CRITICAL, overflow='block'),
+    'odds_tick': TopicConfig(priority=PRIORITY_BULK, batch_size=64, batch_window=0.05),
+    'pressure': TopicConfig(priority=PRIORITY_BULK, batch_size=32, batch_window=0.05)
+}
+
+
+class _Subscriber:
+    """Assinante com caixa de entrada própria: um assinante lento não atrasa os demais"""
+    __slots__ = ('topic', 'callback', 'dispatch', 'batch', 'loop', 'mailbox', 'running', 'maxsize')
+
+    def __init__(self, topic, callback, dispatch, batch, loop, maxsize):
+        self.topic = topic
+        self.callback = callback
+        self.dispatch = dispatch
+        self.batch = batch
+        self.loop = loop
+        self.mailbox = deque()
+        self.running = False
+        self.maxsize = maxsize
+
+
 class EventManager:
+    """
+    Barramento de eventos do sistema (singleton).
+    `subscribe(nome, callback)` e `publish(nome, dados)` mantêm o comportamento
+    original: o callback roda na thread de quem publica. Assinaturas com
+    dispatch='thread' ou 'async' passam por filas limitadas por tópico; uma
+    thread despachante atende primeiro os tópicos de maior prioridade (gols
+    antes de ticks de odds), agrupa eventos em lotes quando configurado e
+    entrega no pool de threads ou no event loop do assinante.
+    Latência de entrega e profundidade das filas vão para o METRICS.
+    """
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance._events = {}
+            cls._instance._init_bus()
         return cls._instance
-    
-    def subscribe(self, event_name, callback):
-        if event_name not in self._events:
-            self._events[event_name] = []
-        self._events[event_name].append(callback)
-    
+
+    def _init_bus(self):
+        self._topics: Dict[str, TopicConfig] = dict(DEFAULT_TOPICS)
+        self._queues: Dict[str, deque] = {}
+        self._subscribers: Dict[str, List[_Subscriber]] = {}
+        self._lock = threading.Condition()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._workers = DEFAULT_WORKERS
+        self._pending = 0       # eventos em filas e caixas de entrada ainda não entregues
+        self._closed = False
+        self._published = 0
+        self._delivered = 0
+        self._dropped = 0
+        # Observadores de todos os tópicos, chamados na publicação (ex.: o diário de eventos)
+        self._taps: List[Callable] = []
+        METRICS.register_collector('event_bus', self.stats)
+
+    # --- Configuração ---
+    def configure_topic(self, event_name: str, **options) -> TopicConfig:
+        """Altera prioridade, tamanho da fila, lote ou política de overflow de um tópico"""
+        config = self._topics.get(event_name, TopicConfig())._replace(**options)
+        if config.maxsize <= 0 or config.batch_size <= 0:
+            raise ValueError("maxsize e batch_size devem ser positivos")
+        if config.overflow not in ('drop_oldest', 'block'):
+            raise ValueError(f"Política de overflow desconhecida: {config.overflow}")
+        with self._lock:
+            self._topics[event_name] = config
+        return config
+
+    def topic(self, event_name: str) -> TopicConfig:
+        return self._topics.get(event_name) or TopicConfig()
+
+    def set_workers(self, workers: int):
+        """Número de threads do pool (vale para o próximo pool criado)"""
+        if workers <= 0:
+            raise ValueError("workers deve ser positivo")
+        self._workers = workers
+
+    # --- API ---
+    def subscribe(self, event_name, callback, dispatch: str = DISPATCH_SYNC, batch: bool = False,
+                  loop: asyncio.AbstractEventLoop = None):
+        """
+        Assina um tópico. Com dispatch='thread' o callback roda no pool do
+        barramento; com dispatch='async' roda no `loop` (função ou corrotina).
+        Com batch=True recebe listas de eventos (até batch_size do tópico).
+        """
+        if dispatch == DISPATCH_SYNC:
+            if event_name not in self._events:
+                self._events[event_name] = []
+            self._events[event_name].append(callback)
+            return
+        if dispatch not in (DISPATCH_THREAD, DISPATCH_ASYNC):
+            raise ValueError(f"Modo de entrega desconhecido: {dispatch}")
+        if dispatch == DISPATCH_ASYNC and loop is None:
+            loop = asyncio.get_running_loop()
+
+        subscriber = _Subscriber(event_name, callback, dispatch, batch, loop, self.topic(event_name).maxsize)
+        with self._lock:
+            self._subscribers.setdefault(event_name, []).append(subscriber)
+            self._closed = False
+        self._ensure_dispatcher()
+
+    def unsubscribe(self, event_name, callback):
+        if callback in self._events.get(event_name, []):
+            self._events[event_name].remove(callback)
+        with self._lock:
+            subscribers = self._subscribers.get(event_name, [])
+            self._subscribers[event_name] = [s for s in subscribers if s.callback is not callback]
+
+    def add_tap(self, callback: Callable):
+        """Registra callback(nome, dados) chamado em toda publicação, antes dos assinantes"""
+        if callback not in self._taps:
+            self._taps = self._taps + [callback]
+
+    def remove_tap(self, callback: Callable):
+        self._taps = [tap for tap in self._taps if tap != callback]
+
     def publish(self, event_name, data=None):
+        for tap in self._taps:
+            tap(event_name, data)
         for callback in self._events.get(event_name, []):
-            callback(data)
\ No newline at end of file
+            callback(data)
+
+        if not self._subscribers.get(event_name):
+            return
+        config = self.topic(event_name)
+        with self._lock:
+            queue = self._queues.get(event_name)
+            if queue is None:
+                queue = self._queues[event_name] = deque()
+            if len(queue) >= config.maxsize:
+                if config.overflow == 'block':
+                    while len(queue) >= config.maxsize and not self._closed:
+                        self._lock.wait()
+                else:
+                    queue.popleft()
+                    self._pending -= 1
+                    self._dropped += 1
+                    METRICS.count(f'event_bus.dropped.{event_name}')
+            queue.append((time.perf_counter_ns(), data))
+            self._pending += 1
+            self._published += 1
+            self._lock.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Aguarda a entrega de todos os eventos publicados; retorna False se o tempo acabar"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._pending > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def shutdown(self, wait: bool = True):
+        """Encerra a thread despachante e o pool (eventos ainda na fila são descartados)"""
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        dispatcher, self._dispatcher = self._dispatcher, None
+        if dispatcher is not None and wait:
+            dispatcher.join()
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+        with self._lock:
+            self._queues.clear()
+            for subscribers in self._subscribers.values():
+                for subscriber in subscribers:
+                    subscriber.mailbox.clear()
+            self._pending = 0
+            self._lock.notify_all()
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores do barramento e profundidade de cada fila"""
+        with self._lock:
+            stats = {
+                'published': self._published,
+                'delivered': self._delivered,
+                'dropped': self._dropped,
+                'pending': self._pending
+            }
+            for name, queue in self._queues.items():
+                stats[f'depth.{name}'] = len(queue)
+        return stats
+
+    # --- Despacho ---
+    def _ensure_dispatcher(self):
+        with self._lock:
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='event-bus')
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name='event-bus-dispatcher',
+                                                    daemon=True)
+                self._dispatcher.start()
+
+    def _next_batch(self):
+        """Tópico de maior prioridade com eventos e o lote a entregar (chamado com o lock)"""
+        while not self._closed:
+            ready = [name for name, queue in self._queues.items() if queue]
+            if not ready:
+                self._lock.wait()
+                continue
+            name = min(ready, key=lambda n: self.topic(n).priority)
+            config = self.topic(name)
+            queue = self._queues[name]
+            if config.batch_size > 1 and config.batch_window > 0 and len(queue) < config.batch_size:
+                # Lote incompleto: espera a janela, mas um tópico mais prioritário interrompe a espera
+                deadline = queue[0][0] / 1e9 + config.batch_window
+                remaining = deadline - time.perf_counter()
+                if remaining > 0 and not self._has_higher_priority(config.priority):
+                    self._lock.wait(remaining)
+                    continue
+            events = [queue.popleft() for _ in range(min(config.batch_size, len(queue)))]
+            self._lock.notify_all()
+            return name, events
+        return None, None
+
+    def _has_higher_priority(self, priority: int) -> bool:
+        return any(queue and self.topic(name).priority < priority for name, queue in self._queues.items())
+
+    def _dispatch_loop(self):
+        while True:
+            with self._lock:
+                name, events = self._next_batch()
+                if name is None:
+                    return
+                config = self.topic(name)
+                subscribers = list(self._subscribers.get(name, ()))
+                # Cada evento fica pendente até todos os assinantes recebê-lo
+                self._pending += len(events) * len(subscribers) - len(events)
+                for subscriber in subscribers:
+                    for event in events:
+                        if len(subscriber.mailbox) >= subscriber.maxsize:
+                            if config.overflow == 'block':
+                                # Tópico crítico: espera o assinante abrir espaço em vez de descartar
+                                self._start_drain(subscriber)
+                                while len(subscriber.mailbox) >= subscriber.maxsize and not self._closed:
+                                    self._lock.wait()
+                                if self._closed:
+                                    return
+                            else:
+                                subscriber.mailbox.popleft()
+                                self._pending -= 1
+                                self._dropped += 1
+                                METRICS.count(f'event_bus.dropped.{name}')
+                        subscriber.mailbox.append(event)
+                    self._start_drain(subscriber)
+                self._lock.notify_all()
+
+    def _start_drain(self, subscriber: _Subscriber):
+        """Agenda a entrega da caixa de entrada se o assinante estiver parado (chamado com o lock)"""
+        if not subscriber.running:
+            subscriber.running = True
+            self._executor.submit(self._drain, subscriber)
+
+    def _drain(self, subscriber: _Subscriber):
+        """Entrega a caixa de entrada do assinante em ordem (uma tarefa por vez por assinante)"""
+        config = self.topic(subscriber.topic)
+        while True:
+            with self._lock:
+                if not subscriber.mailbox:
+                    subscriber.running = False
+                    self._lock.notify_all()
+                    return
+                count = min(config.batch_size, len(subscriber.mailbox)) if subscriber.batch else 1
+                events = [subscriber.mailbox.popleft() for _ in range(count)]
+
+            try:
+                if subscriber.batch:
+                    self._deliver(subscriber, [data for _, data in events])
+                else:
+                    self._deliver(subscriber, events[0][1])
+            except Exception as e:
+                logger.error(f"Erro no assinante de '{subscriber.topic}': {e}")
+
+            now = time.perf_counter_ns()
+            if METRICS.enabled:
+                for published, _ in events:
+                    METRICS.observe(f'event_bus.latency.{subscriber.topic}', now - published)
+            with self._lock:
+                self._pending -= len(events)
+                self._delivered += len(events)
+                self._lock.notify_all()
+
+    @staticmethod
+    def _deliver(subscriber: _Subscriber, payload):
+        if subscriber.dispatch == DISPATCH_THREAD:
+            subscriber.callback(payload)
+            return
+        if inspect.iscoroutinefunction(subscriber.callback):
+            future = asyncio.run_coroutine_threadsafe(subscriber.callback(payload), subscriber.loop)
+        else:
+            future = asyncio.run_coroutine_threadsafe(_call(subscriber.callback, payload), subscriber.loop)
+        # Aguarda para manter a ordem de entrega do assinante (o pool segue livre para os demais)
+        future.result()
+
+
+async def _call(callback: Callable, payload):
+    return callback(payload)
@@ -0,0 +1,312 @@
+# project/journal.py
+import argparse
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+import time
+import zlib
+from itertools import groupby
+from typing import Iterator, NamedTuple, Sequence
+from event_manager import EventManager
+from metrics import METRICS
+
+# Formato do arquivo (append-only, little-endian):
+#   cabeçalho: JOURNAL_MAGIC + versão (uint16)
+#   registro:  tamanho do payload (uint32), crc32 do payload (uint32), timestamp ns (int64),
+#              id do tópico (uint16), payload
+# O payload é o evento em pickle; um registro com id TOPIC_DEFINITION declara um tópico novo
+# (payload = id uint16 + nome UTF-8), de forma que cada evento carrega só 2 bytes de tópico.
+# Como todo pickle, o diário só deve ser lido se tiver sido gravado por este sistema.
+JOURNAL_MAGIC = b'FLUXJRNL'
+JOURNAL_VERSION = 1
+_HEADER = struct.Struct('<8sH')
+_RECORD = struct.Struct('<IIqH')
+_TOPIC_ID = struct.Struct('<H')
+TOPIC_DEFINITION = 0xFFFF
+MAX_TOPICS = TOPIC_DEFINITION
+
+# Gravação em grupo: o buffer vai para o disco (com um único fsync) a cada intervalo ou tamanho
+DEFAULT_FLUSH_INTERVAL = 0.05
+DEFAULT_FLUSH_BYTES = 1 << 20
+
+
+class JournalRecord(NamedTuple):
+    timestamp_ns: int
+    topic: str
+    data: object
+
+
+class JournalReader:
+    """
+    Leitura do diário por memória mapeada. Registros truncados ou corrompidos
+    no fim do arquivo (gravação interrompida) encerram a leitura; `valid_end`
+    indica o último byte íntegro.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError(f"Diário vazio ou inválido: {path}")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        magic, version = _HEADER.unpack_from(self._map, 0)
+        if magic != JOURNAL_MAGIC:
+            self.close()
+            raise ValueError(f"Arquivo não é um diário de eventos: {path}")
+        if version != JOURNAL_VERSION:
+            self.close()
+            raise ValueError(f"Versão de diário não suportada: {version}")
+        self.topics = {}
+        self.valid_end = _HEADER.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __iter__(self) -> Iterator[JournalRecord]:
+        return self.records()
+
+    def records(self, topics: Sequence[str] = None) -> Iterator[JournalRecord]:
+        """Eventos em ordem de gravação (opcionalmente só dos tópicos indicados)"""
+        wanted = set(topics) if topics is not None else None
+        loads = pickle.loads
+        for timestamp, topic, payload in self._walk():
+            if wanted is None or topic in wanted:
+                yield JournalRecord(timestamp, topic, loads(payload))
+
+    def scan(self) -> int:
+        """Percorre o arquivo inteiro sem desserializar os eventos; retorna o número de eventos"""
+        return sum(1 for _ in self._walk())
+
+    def _walk(self):
+        data = self._map
+        size = len(data)
+        offset = _HEADER.size
+        names = self.topics = {}
+        while offset + _RECORD.size <= size:
+            length, crc, timestamp, topic_id = _RECORD.unpack_from(data, offset)
+            start = offset + _RECORD.size
+            end = start + length
+            if end > size:
+                break
+            payload = data[start:end]
+            if zlib.crc32(payload) != crc:
+                break
+            offset = self.valid_end = end
+            if topic_id == TOPIC_DEFINITION:
+                (new_id,) = _TOPIC_ID.unpack_from(payload, 0)
+                names[new_id] = payload[_TOPIC_ID.size:].decode('utf-8')
+                continue
+            topic = names.get(topic_id)
+            if topic is None:
+                raise ValueError(f"Tópico {topic_id} sem definição no diário (offset {start})")
+            yield timestamp, topic, payload
+
+
+class JournalWriter:
+    """
+    Assinante do EventManager que grava cada evento publicado no diário.
+    A publicação só serializa o evento num buffer; uma thread grava o buffer
+    e faz um único fsync a cada `flush_interval` segundos (ou ao atingir
+    `flush_bytes`). Ao reabrir um diário existente, um registro final
+    incompleto é descartado antes de continuar gravando.
+    """
+    def __init__(self, path: str, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 flush_bytes: int = DEFAULT_FLUSH_BYTES, fsync: bool = True):
+        if flush_interval <= 0 or flush_bytes <= 0:
+            raise ValueError("flush_interval e flush_bytes devem ser positivos")
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.fsync = fsync
+        self._topics = {}
+        self._buffer = bytearray()
+        self._lock = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._bus = None
+        self.records_written = 0
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with JournalReader(path) as reader:
+                reader.scan()
+                valid_end = reader.valid_end
+                self._topics = {name: topic_id for topic_id, name in reader.topics.items()}
+            self._file = open(path, 'r+b')
+            self._file.truncate(valid_end)
+            self._file.seek(valid_end)
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION))
+            self._file.flush()
+
+        self._flusher = threading.Thread(target=self._flush_loop, name='journal-flusher', daemon=True)
+        self._flusher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # --- Ligação com o barramento ---
+    def attach(self, bus: EventManager = None) -> 'JournalWriter':
+        """Passa a gravar tudo o que for publicado no EventManager"""
+        self._bus = bus or EventManager()
+        self._bus.add_tap(self.record)
+        return self
+
+    def detach(self):
+        if self._bus is not None:
+            self._bus.remove_tap(self.record)
+            self._bus = None
+
+    # --- Gravação ---
+    def record(self, event_name: str, data=None, timestamp_ns: int = None):
+        """Serializa o evento no buffer (a gravação em disco é feita pela thread de flush)"""
+        payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        timestamp = time.time_ns() if timestamp_ns is None else timestamp_ns
+        with self._lock:
+            if self._closed:
+                raise ValueError("Diário fechado")
+            topic_id = self._topics.get(event_name)
+            if topic_id is None:
+                topic_id = len(self._topics)
+                if topic_id >= MAX_TOPICS:
+                    raise ValueError("Limite de tópicos do diário atingido")
+                self._topics[event_name] = topic_id
+                definition = _TOPIC_ID.pack(topic_id) + str(event_name).encode('utf-8')
+                self._append(TOPIC_DEFINITION, timestamp, definition)
+            self._append(topic_id, timestamp, payload)
+            self.records_written += 1
+            if len(self._buffer) >= self.flush_bytes:
+                self._lock.notify()
+
+    def _append(self, topic_id: int, timestamp: int, payload: bytes):
+        self._buffer += _RECORD.pack(len(payload), zlib.crc32(payload), timestamp, topic_id)
+        self._buffer += payload
+
+    def flush(self):
+        """Grava o buffer atual e sincroniza com o disco"""
+        with self._write_lock:
+            with self._lock:
+                buffer, self._buffer = self._buffer, bytearray()
+            if not buffer:
+                return
+            start = time.perf_counter_ns()
+            self._file.write(buffer)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            if METRICS.enabled:
+                METRICS.observe('JournalWriter.flush', time.perf_counter_ns() - start)
+                METRICS.count('journal.bytes', len(buffer))
+
+    def _flush_loop(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                if len(self._buffer) < self.flush_bytes:
+                    self._lock.wait(self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
+
+    def close(self):
+        self.detach()
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._lock.notify_all()
+        self._flusher.join()
+        self.flush()
+        self._file.close()
+
+
+def replay(path: str, publish=None, speed: float = 0.0, topics: Sequence[str] = None) -> int:
+    """
+    Republica os eventos do diário (por padrão no EventManager). `speed` é o
+    fator sobre o tempo real (0 = o mais rápido possível). Retorna o número de eventos.
+    """
+    publish = publish or EventManager().publish
+    count = 0
+    first = None
+    clock = time.perf_counter()
+    with JournalReader(path) as reader:
+        for record in reader.records(topics):
+            if speed > 0:
+                if first is None:
+                    first = record.timestamp_ns
+                wait = (record.timestamp_ns - first) / 1e9 / speed - (time.perf_counter() - clock)
+                if wait > 0:
+                    time.sleep(wait)
+            publish(record.topic, record.data)
+            count += 1
+    return count
+
+
+def replay_match_day(path: str, board=None, engine=None, portfolio=None):
+    """
+    Reconstrói um dia de jogos a partir do diário num MatchBoard novo (o estado
+    que o monitor multi-partidas mantém), recalculando as recomendações a cada
+    minuto de jogo como na sessão original, sem esperar o relógio real.
+    Retorna o MatchBoard.
+    """
+    from live_feed import FEED_EVENTS
+    from monitor import MatchBoard
+    from recommendations import RecommendationEngine
+    from resources import shared_optimizer
+
+    board = board if board is not None else MatchBoard(portfolio)
+    engine = engine or RecommendationEngine(shared_optimizer())
+    with JournalReader(path) as reader:
+        events = (record.data for record in reader.records(FEED_EVENTS))
+        for _, group in groupby(events, key=lambda event: event.get('minute')):
+            for event in group:
+                board.apply(event)
+            board.refresh(engine)
+    return board
+
+
+if __name__ == "__main__":
+    # Uso: python -m journal diario.flux [--topics goal,red_card] [--limit 20] [--replay]
+    parser = argparse.ArgumentParser(description="Leitura e reprodução do diário de eventos")
+    parser.add_argument("path")
+    parser.add_argument("--topics", default=None, help="Tópicos separados por vírgula")
+    parser.add_argument("--limit", type=int, default=20, help="Eventos exibidos (0 = nenhum)")
+    parser.add_argument("--replay", action="store_true", help="Reconstrói as partidas num MatchBoard")
+    args = parser.parse_args()
+
+    topics = args.topics.split(',') if args.topics else None
+    with JournalReader(args.path) as reader:
+        count = 0
+        for record in reader.records(topics):
+            if count < args.limit:
+                print(f"{record.timestamp_ns} {record.topic} {record.data!r}")
+            count += 1
+        print(f"{count} eventos, tópicos: {', '.join(sorted(reader.topics.values()))}", file=sys.stderr)
+
+    if args.replay:
+        start = time.perf_counter()
+        board = replay_match_day(args.path)
+        elapsed = time.perf_counter() - start
+        print(f"{len(board)} partidas reconstruídas em {elapsed:.2f} s", file=sys.stderr)
@@ -0,0 +1,361 @@
+# project/live_feed.py
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import sys
+import time
+from typing import AsyncIterator, Callable, Dict, Iterable, List, NamedTuple
+from config import MatchCondition, QuantumState
+from metrics import METRICS
+from quantum.optimizer import QuantumOptimizer
+from recommendations import PortfolioSnapshot, RecommendationEngine, in_play_capital
+
+logger = logging.getLogger(__name__)
+
+# Eventos do feed (uma linha JSON por evento, mesmos nomes do histórico do backtest):
+#   {"match_id": "m1", "event": "goal", "minute": 23, "team": "home"}
+#   {"match_id": "m1", "event": "pressure", "minute": 30, "home_pressure": 0.7, "away_pressure": 0.4,
+#    "volatility": "Caótico"}
+#   {"match_id": "m1", "event": "red_card", "minute": 40, "team": "away"}
+#   {"match_id": "m1", "event": "minute", "minute": 41}
+#   {"match_id": "m1", "event": "full_time", "minute": 94}
+FEED_EVENTS = ('minute', 'goal', 'pressure', 'red_card', 'volatility', 'full_time')
+
+# Eventos pendentes por partida antes de o produtor ser bloqueado (backpressure)
+DEFAULT_QUEUE_SIZE = 256
+
+# Linhas lidas por vez dos arquivos (a leitura roda fora do event loop)
+READ_BATCH_LINES = 1024
+
+# Eventos ingeridos antes de ceder o event loop às tasks das partidas
+INGEST_YIELD_EVERY = 32
+
+
+def parse_event(line: str) -> Dict:
+    """Converte uma linha JSON em evento, validando partida, tipo e minuto"""
+    event = json.loads(line)
+    if not isinstance(event, dict) or 'match_id' not in event:
+        raise ValueError("Evento sem match_id")
+    kind = str(event.get('event', '')).lower()
+    if kind not in FEED_EVENTS:
+        raise ValueError(f"Tipo de evento desconhecido: {event.get('event')}")
+    event['event'] = kind
+    event['match_id'] = str(event['match_id'])
+    if 'minute' in event:
+        event['minute'] = int(event['minute'])
+    return event
+
+
+class LiveUpdate(NamedTuple):
+    """Recomendações publicadas para uma partida após um lote de eventos"""
+    match_id: str
+    condition: MatchCondition
+    volatility: str
+    recommendations: List[Dict]
+    new: List[Dict]        # recomendações que não estavam na publicação anterior
+    events: int            # eventos aplicados neste lote
+    latency: float         # segundos entre a chegada do evento mais antigo e a publicação
+
+
+class LiveMatch:
+    """Estado incremental de uma partida acompanhada pelo feed"""
+    __slots__ = ('match_id', 'condition', 'volatility', 'last_volatility', 'red_card_event',
+                 'portfolio', 'initial_invested', 'published', 'finished', 'version')
+
+    def __init__(self, match_id: str, portfolio: PortfolioSnapshot):
+        self.match_id = match_id
+        self.condition = MatchCondition()
+        self.volatility = QuantumState.ESTAVEL.value
+        self.last_volatility = None
+        self.red_card_event = None
+        self.portfolio = portfolio
+        self.initial_invested = sum(bet.amount for bet in portfolio.initial_bets.values())
+        self.published = frozenset()
+        self.finished = False
+        self.version = 0
+
+    def apply(self, event: Dict) -> bool:
+        """Aplica um evento; retorna True se o estado usado nas recomendações mudou"""
+        condition = self.condition
+        changes = {}
+        changed = False
+        minute = event.get('minute')
+        if minute is not None and minute > condition.minute:
+            changes['minute'] = minute
+
+        kind = event['event']
+        if kind == 'goal':
+            if str(event.get('team', '')).lower() == 'home':
+                changes['home_goals'] = condition.home_goals + 1
+            else:
+                changes['away_goals'] = condition.away_goals + 1
+        elif kind in ('pressure', 'volatility'):
+            for field in ('home_pressure', 'away_pressure'):
+                if field in event and float(event[field]) != getattr(condition, field):
+                    changes[field] = float(event[field])
+            volatility = event.get('volatility')
+            if volatility and volatility != self.volatility:
+                QuantumState(volatility)  # valida o nome do estado
+                self.last_volatility = self.volatility
+                self.volatility = volatility
+                changed = True
+        elif kind == 'red_card' and self.red_card_event is None:
+            self.red_card_event = {
+                'minute': event.get('minute', condition.minute),
+                'team': 'HOME' if str(event.get('team', '')).lower() == 'home' else 'AWAY'
+            }
+            changed = True
+        elif kind == 'full_time':
+            self.finished = True
+
+        if changes:
+            self.condition = condition.replace(**changes)
+            changed = True
+        if changed:
+            self.version += 1
+        return changed
+
+
+class LiveFeed:
+    """
+    Ingestão assíncrona de eventos ao vivo. Cada partida tem uma fila limitada e
+    uma task própria: os eventos acumulados são aplicados em lote, o
+    RecommendationEngine roda uma vez por lote e os assinantes recebem um
+    LiveUpdate quando o conjunto de recomendações muda. Com a fila cheia,
+    `put` aguarda (backpressure até a fonte). Com `bus`, cada evento recebido
+    também é publicado no EventManager (por exemplo, para o diário de eventos).
+    """
+    def __init__(self, engine: RecommendationEngine, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 default_capital: float = 100.0, bus=None):
+        if queue_size <= 0:
+            raise ValueError("queue_size deve ser positivo")
+        self.engine = engine
+        self.queue_size = queue_size
+        self.default_capital = default_capital
+        self.bus = bus
+        self.matches: Dict[str, LiveMatch] = {}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._subscribers: List[Callable] = []
+
+    def track(self, match_id: str, portfolio: PortfolioSnapshot) -> LiveMatch:
+        """Registra a partida com o portfólio usado nas recomendações"""
+        match = self.matches.get(match_id)
+        if match is None:
+            match = self.matches[match_id] = LiveMatch(match_id, portfolio)
+        else:
+            match.portfolio = portfolio
+            match.initial_invested = sum(bet.amount for bet in portfolio.initial_bets.values())
+        return match
+
+    def subscribe(self, callback: Callable[[LiveUpdate], None]) -> Callable[[], None]:
+        """Assina as publicações (função comum ou corrotina); retorna a função de cancelamento"""
+        self._subscribers.append(callback)
+
+        def unsubscribe():
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+        return unsubscribe
+
+    async def put(self, event: Dict):
+        """Enfileira um evento na partida (aguarda se a fila da partida estiver cheia)"""
+        match_id = event['match_id']
+        if self.bus is not None:
+            self.bus.publish(event['event'], event)
+        queue = self._queues.get(match_id)
+        if queue is None:
+            if match_id not in self.matches:
+                self.track(match_id, PortfolioSnapshot(self.default_capital, {}, ()))
+            if self.matches[match_id].finished:
+                return
+            queue = self._queues[match_id] = asyncio.Queue(self.queue_size)
+            self._workers[match_id] = asyncio.create_task(self._run_match(self.matches[match_id], queue))
+        await queue.put((time.perf_counter(), event))
+
+    async def consume(self, lines: AsyncIterator[str]) -> int:
+        """Lê linhas JSON de uma fonte assíncrona; linhas inválidas são descartadas"""
+        count = 0
+        async for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if not line.strip():
+                continue
+            try:
+                event = parse_event(line)
+            except (ValueError, TypeError) as e:
+                METRICS.count('live_feed.invalid_events')
+                logger.warning(f"Evento inválido descartado: {e}")
+                continue
+            await self.put(event)
+            count += 1
+            # Fontes rápidas (arquivos) não podem monopolizar o loop: as partidas processam entre blocos
+            if count % INGEST_YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+        return count
+
+    async def join(self):
+        """Aguarda o processamento de todos os eventos já enfileirados"""
+        await asyncio.gather(*(queue.join() for queue in list(self._queues.values())))
+
+    async def close(self):
+        """Encerra as tasks das partidas (eventos pendentes são descartados)"""
+        workers = list(self._workers.values())
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+        self._queues.clear()
+
+    async def _run_match(self, match: LiveMatch, queue: asyncio.Queue):
+        try:
+            while True:
+                batch = [await queue.get()]
+                while not queue.empty():
+                    batch.append(queue.get_nowait())
+                try:
+                    changed = False
+                    for _, event in batch:
+                        try:
+                            changed |= match.apply(event)
+                        except (ValueError, TypeError) as e:
+                            METRICS.count('live_feed.invalid_events')
+                            logger.warning(f"Evento inválido na partida {match.match_id}: {e}")
+                    if changed:
+                        await self._publish(match, batch)
+                finally:
+                    for _ in batch:
+                        queue.task_done()
+                if match.finished:
+                    break
+        finally:
+            if self._queues.get(match.match_id) is queue:
+                del self._queues[match.match_id]
+                self._workers.pop(match.match_id, None)
+
+    async def _publish(self, match: LiveMatch, batch: list):
+        condition = match.condition
+        capital = in_play_capital(match.portfolio.capital, match.initial_invested,
+                                  len(match.portfolio.multi_bets), condition.minute)
+        recommendations = self.engine.recommend(
+            match.portfolio, condition, QuantumState(match.volatility), capital,
+            red_card_event=match.red_card_event, last_volatility=match.last_volatility
+        )
+        # A volatilidade anterior só vale para a primeira avaliação após a mudança
+        match.last_volatility = match.volatility
+
+        keys = frozenset((rec['bet_type'], rec['name']) for rec in recommendations)
+        if keys == match.published:
+            return
+        new = [rec for rec in recommendations if (rec['bet_type'], rec['name']) not in match.published]
+        match.published = keys
+
+        latency = time.perf_counter() - batch[0][0]
+        if METRICS.enabled:
+            METRICS.observe('LiveFeed.update_latency', int(latency * 1e9))
+        update = LiveUpdate(match.match_id, condition, match.volatility, recommendations, new, len(batch), latency)
+        for callback in list(self._subscribers):
+            try:
+                result = callback(update)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Erro no assinante do feed: {e}")
+
+
+async def read_json_lines(path: str, batch_lines: int = READ_BATCH_LINES) -> AsyncIterator[str]:
+    """Linhas de um arquivo JSON lines, lidas em blocos fora do event loop"""
+    with open(path, encoding='utf-8') as f:
+        while True:
+            lines = await asyncio.to_thread(f.readlines, batch_lines * 64)
+            if not lines:
+                break
+            for line in lines:
+                yield line
+
+
+async def replay_lines(lines: Iterable[str], seconds_per_minute: float = 0.0) -> AsyncIterator[str]:
+    """
+    Reproduz eventos gravados respeitando o relógio da partida
+    (`seconds_per_minute` segundos reais por minuto de jogo; 0 = sem espera).
+    """
+    clock = None
+    for line in lines:
+        if seconds_per_minute > 0 and line.strip():
+            minute = json.loads(line).get('minute')
+            if minute is not None:
+                if clock is not None and minute > clock:
+                    await asyncio.sleep((minute - clock) * seconds_per_minute)
+                clock = minute if clock is None else max(clock, minute)
+        yield line
+
+
+async def serve(feed: LiveFeed, host: str = '127.0.0.1', port: int = 8765) -> asyncio.AbstractServer:
+    """Servidor TCP local: cada conexão envia eventos em JSON lines"""
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            await feed.consume(reader)
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def _main(args):
+    bus = journal = None
+    if args.journal:
+        from event_manager import EventManager
+        from journal import JournalWriter
+        bus = EventManager()
+        journal = JournalWriter(args.journal).attach(bus)
+    feed = LiveFeed(RecommendationEngine(QuantumOptimizer()), queue_size=args.queue_size,
+                    default_capital=args.capital, bus=bus)
+
+    def emit(update: LiveUpdate):
+        print(json.dumps({
+            'match_id': update.match_id,
+            'score': update.condition.score,
+            'minute': update.condition.minute,
+            'volatility': update.volatility,
+            'new': [{'market': rec['bet_type'].name, 'name': rec['name'], 'stake': round(rec['stake'], 2),
+                     'odd': round(rec['odd'], 2)} for rec in update.new],
+            'latency_ms': round(update.latency * 1000, 3)
+        }, ensure_ascii=False), flush=True)
+
+    feed.subscribe(emit)
+    try:
+        if args.listen:
+            host, _, port = args.listen.rpartition(':')
+            server = await serve(feed, host or '127.0.0.1', int(port))
+            async with server:
+                await server.serve_forever()
+        else:
+            if args.seconds_per_minute > 0:
+                with open(args.events, encoding='utf-8') as f:
+                    await feed.consume(replay_lines(f.readlines(), args.seconds_per_minute))
+            else:
+                await feed.consume(read_json_lines(args.events))
+            await feed.join()
+            await feed.close()
+    finally:
+        if journal is not None:
+            journal.close()
+
+
+if __name__ == "__main__":
+    # Uso: python -m live_feed eventos.jsonl [--seconds-per-minute 0.5] [--journal dia.flux]
+    #      python -m live_feed --listen 127.0.0.1:8765
+    parser = argparse.ArgumentParser(description="Feed ao vivo de eventos com recomendações incrementais")
+    parser.add_argument("events", nargs='?', help="Arquivo JSON lines com os eventos")
+    parser.add_argument("--listen", default=None, help="host:porta para receber eventos por socket")
+    parser.add_argument("--seconds-per-minute", type=float, default=0.0,
+                        help="Reproduz o arquivo no relógio da partida")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument("--capital", type=float, default=100.0)
+    parser.add_argument("--journal", default=None, help="Grava os eventos recebidos no diário (python -m journal)")
+    args = parser.parse_args()
+    if not args.events and not args.listen:
+        parser.error("Informe o arquivo de eventos ou --listen")
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    asyncio.run(_main(args))
@@ -2,30 +2,55 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Modo de perfil da inicialização (FLUX_PROFILE_STARTUP=1): instalado antes dos demais imports
+import startup
+if startup.profiling_enabled():
+    startup.IMPORT_PROFILER.install()
+
 import streamlit as st
 import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-from quantum.optimizer import QuantumOptimizer
-from modules.initial_odds import InitialOddsModule
-from modules.multi_bets import MultiBetsModule
-from modules.in_play import InPlayModule
+import uuid
+from functools import cached_property
+import persistence
+from resources import shared_optimizer
 from config import BetPortfolio, BetType, QuantumBet
 from utils import safe_divide
+from metrics import METRICS, timed
 
 class BettingSystem:
     def __init__(self):
-        self.optimizer = QuantumOptimizer()
-        self.initial_odds = InitialOddsModule(self)
-        self.multi_bets = MultiBetsModule(self)
-        self.in_play = InPlayModule(self)
+        # Otimizador e parâmetros compartilhados entre sessões; os módulos são criados no primeiro uso
+        self.optimizer = shared_optimizer()
         self._phase_containers = {
             "initial_odds": st.empty(),
             "multi_bets": st.empty(),
             "in_play": st.empty()
         }
         
+    # Módulos importados no primeiro uso: a tela de capital não paga pelas fases seguintes
+    @cached_property
+    def initial_odds(self):
+        from modules.initial_odds import InitialOddsModule
+        return InitialOddsModule(self)
+
+    @cached_property
+    def multi_bets(self):
+        from modules.multi_bets import MultiBetsModule
+        return MultiBetsModule(self)
+
+    @cached_property
+    def in_play(self):
+        from modules.in_play import InPlayModule
+        return InPlayModule(self)
+
+    @cached_property
+    def monitor(self):
+        from modules.monitor import MatchMonitorModule
+        return MatchMonitorModule(self)
+
     def _validate_state(self):
         required_states = {
             'portfolio': None,
@@ -49,7 +74,11 @@ class BettingSystem:
         
         return True
 
+    @timed()
     def run_phase(self):
+        # O módulo da fase atual inicializa o próprio estado: é criado antes da validação
+        getattr(self, st.session_state.get('current_phase', 'initial_odds'), None)
+
         # Validação inicial do estado
         self._validate_state()
         
@@ -81,17 +110,20 @@ class BettingSystem:
                 phase_result = False
                 
                 if current_phase == "initial_odds":
-                    phase_result = self.initial_odds.run()
+                    with METRICS.timer("phase.initial_odds"):
+                        phase_result = self.initial_odds.run()
                     if phase_result and st.session_state.get("initial_odds_confirmed"):
                         st.session_state.current_phase = "multi_bets"
 
                 elif current_phase == "multi_bets":
-                    phase_result = self.multi_bets.run()
+                    with METRICS.timer("phase.multi_bets"):
+                        phase_result = self.multi_bets.run()
                     if phase_result and st.session_state.get("multi_bets_confirmed"):
                         st.session_state.current_phase = "in_play"
 
                 elif current_phase == "in_play":
-                    phase_result = self.in_play.run()
+                    with METRICS.timer("phase.in_play"):
+                        phase_result = self.in_play.run()
                     if phase_result and st.session_state.get("in_play_confirmed"):
                         self._reset_system()
 
@@ -111,7 +143,11 @@ class BettingSystem:
     def _reset_system(self):
         """Reinicialização completa e segura do sistema"""
         current_capital = st.session_state.portfolio.capital
+        session_id = st.session_state.get('session_id')
         st.session_state.clear()
+        # Mantém o identificador: sem ele o próximo run restauraria o snapshot anterior ao reset
+        if session_id:
+            st.session_state.session_id = session_id
         st.session_state.portfolio = BetPortfolio(capital=current_capital)
         st.session_state.current_phase = "initial_odds"
         st.session_state.system = self
@@ -121,8 +157,37 @@ class BettingSystem:
         st.session_state.current_phase = next_phase
         st.rerun()
 
+def _session_id() -> str:
+    """Identificador da sessão na URL (?sid=...): sobrevive a um refresh do navegador"""
+    session_id = st.query_params.get('sid')
+    if not session_id or not session_id.isalnum():
+        session_id = uuid.uuid4().hex
+        st.query_params['sid'] = session_id
+    return session_id
+
+def _restore_session():
+    """Restaura portfólio e estados das fases do último snapshot da sessão"""
+    st.session_state.session_id = _session_id()
+    restored = persistence.restore(persistence.session_path(st.session_state.session_id))
+    if restored:
+        for key, value in restored.items():
+            st.session_state[key] = value
+        logger.info(f"Sessão {st.session_state.session_id} restaurada ({', '.join(restored)})")
+
+def _autosave_session():
+    """Agenda o snapshot da sessão (gravado em segundo plano, sem bloquear a interface)"""
+    try:
+        data = persistence.dumps(st.session_state)
+    except ValueError as e:
+        logger.warning(f"Snapshot da sessão não gerado: {e}")
+        return
+    persistence.AUTOSAVER.schedule(persistence.session_path(st.session_state.session_id), data)
+
 def initialize_session_state():
     """Garante a inicialização correta de todos os estados com apostas obrigatórias"""
+    if 'session_id' not in st.session_state:
+        _restore_session()
+
     if 'portfolio' not in st.session_state:
         st.session_state.portfolio = BetPortfolio(capital=0.0)
         
@@ -207,11 +272,31 @@ def main():
         st.subheader("Navegação de Fase")
         st.write(f"Fase Atual: **{st.session_state.current_phase.replace('_', ' ').title()}**")
 
+        st.write("---")
+        view = st.radio("Visão", ["Fluxo da Partida", "Monitor Multi-Partidas"], key="view_mode")
+
+        # Métricas de desempenho (FLUX_METRICS=1)
+        if METRICS.enabled:
+            st.write("---")
+            with st.expander("Métricas de Desempenho"):
+                snapshot = METRICS.snapshot()
+                for name, timing in snapshot['timings'].items():
+                    st.caption(f"{name}: {timing['count']} chamadas, média {timing['mean_seconds'] * 1000:.2f} ms")
+                st.download_button("Exportar (Prometheus)", METRICS.to_prometheus(),
+                                   file_name="flux_metrics.prom", key="metrics_prometheus")
+                st.download_button("Exportar (JSON)", METRICS.to_json(indent=2),
+                                   file_name="flux_metrics.json", key="metrics_json")
+
     # Conteúdo principal condicional
-    if st.session_state.portfolio.capital > 0:
+    if view == "Monitor Multi-Partidas":
+        st.session_state.system.monitor.run()
+    elif st.session_state.portfolio.capital > 0:
         st.session_state.system.run_phase()
     else:
         st.info("Defina o Capital Total na barra lateral e clique em 'Iniciar Fluxo' para começar.")
+        startup.mark_first_render('capital_input')
+
+    _autosave_session()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,223 @@
+# project/metrics.py
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict
+
+# Limites superiores dos baldes de latência (segundos), de 1 µs a 10 s
+LATENCY_BUCKETS = (
+    1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0
+)
+_BUCKETS_NS = tuple(int(b * 1e9) for b in LATENCY_BUCKETS)
+
+
+class _Timing:
+    """Contadores de uma operação: chamadas, erros, tempo acumulado e histograma"""
+    __slots__ = ('count', 'errors', 'total_ns', 'max_ns', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        # Último balde (+Inf) para durações acima de LATENCY_BUCKETS[-1]
+        self.buckets = [0] * (len(_BUCKETS_NS) + 1)
+
+
+class _NullTimer:
+    """Context manager vazio devolvido quando a instrumentação está desligada"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('_registry', '_name', '_start')
+
+    def __init__(self, registry: 'MetricsRegistry', name: str):
+        self._registry = registry
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._registry.observe(self._name, time.perf_counter_ns() - self._start, error=exc_type is not None)
+        return False
+
+
+class MetricsRegistry:
+    """
+    Registro em processo de tempos e contadores dos caminhos críticos
+    (fases do Streamlit, métodos do otimizador, renderização dos gráficos).
+    Desligado, cada ponto instrumentado custa apenas a leitura de `enabled`.
+    """
+    def __init__(self, enabled: bool = False, namespace: str = 'flux'):
+        self.enabled = enabled
+        self.namespace = namespace
+        self._timings: Dict[str, _Timing] = {}
+        self._counters: Dict[str, float] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """Zera tempos e contadores (os coletores registrados são mantidos)"""
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+    # --- Registro ---
+    def observe(self, name: str, duration_ns: int, error: bool = False):
+        """Registra uma duração (ns) para a operação `name`"""
+        bucket = bisect_left(_BUCKETS_NS, duration_ns)
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = self._timings[name] = _Timing()
+            timing.count += 1
+            timing.total_ns += duration_ns
+            if duration_ns > timing.max_ns:
+                timing.max_ns = duration_ns
+            timing.buckets[bucket] += 1
+            if error:
+                timing.errors += 1
+
+    def count(self, name: str, value: float = 1):
+        """Incrementa um contador (no-op com a instrumentação desligada)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def timer(self, name: str):
+        """Context manager que mede o bloco: `with METRICS.timer('phase.in_play'): ...`"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name: str = None):
+        """
+        Decorador que mede cada chamada da função. O nome padrão é
+        `<Classe>.<método>` (ou o nome qualificado da função).
+        """
+        def decorator(func):
+            label = name or func.__qualname__
+            registry = self
+            clock = time.perf_counter_ns
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not registry.enabled:
+                    return func(*args, **kwargs)
+                start = clock()
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException:
+                    registry.observe(label, clock() - start, error=True)
+                    raise
+                registry.observe(label, clock() - start)
+                return result
+            return wrapper
+        return decorator
+
+    def register_collector(self, name: str, collect: Callable[[], Dict[str, float]]):
+        """Registra uma fonte de medidas instantâneas (ex.: estatísticas do cache)"""
+        with self._lock:
+            self._collectors[name] = collect
+
+    # --- Exportação ---
+    def snapshot(self) -> Dict:
+        """Estado atual do registro em estruturas serializáveis em JSON"""
+        with self._lock:
+            timings = {
+                name: {
+                    'count': t.count,
+                    'errors': t.errors,
+                    'total_seconds': t.total_ns / 1e9,
+                    'mean_seconds': t.total_ns / 1e9 / t.count if t.count else 0.0,
+                    'max_seconds': t.max_ns / 1e9,
+                    'buckets': dict(zip([str(b) for b in LATENCY_BUCKETS] + ['+Inf'], t.buckets))
+                }
+                for name, t in sorted(self._timings.items())
+            }
+            counters = dict(sorted(self._counters.items()))
+            collectors = list(self._collectors.items())
+
+        gauges = {}
+        for prefix, collect in collectors:
+            for key, value in collect().items():
+                if isinstance(value, (int, float)):
+                    gauges[f"{prefix}.{key}"] = value
+        return {
+            'enabled': self.enabled,
+            'timings': timings,
+            'counters': counters,
+            'gauges': gauges
+        }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def to_prometheus(self) -> str:
+        """Formato de exposição em texto do Prometheus (histogramas cumulativos)"""
+        snapshot = self.snapshot()
+        ns = self.namespace
+        lines = []
+
+        duration = f"{ns}_operation_duration_seconds"
+        lines.append(f"# HELP {duration} Duração das operações instrumentadas.")
+        lines.append(f"# TYPE {duration} histogram")
+        for name, t in snapshot['timings'].items():
+            label = _label_value(name)
+            cumulative = 0
+            for bound, observed in t['buckets'].items():
+                cumulative += observed
+                lines.append(f'{duration}_bucket{{operation="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{duration}_sum{{operation="{label}"}} {t["total_seconds"]!r}')
+            lines.append(f'{duration}_count{{operation="{label}"}} {t["count"]}')
+
+        errors = f"{ns}_operation_errors_total"
+        lines.append(f"# HELP {errors} Chamadas instrumentadas que terminaram com exceção.")
+        lines.append(f"# TYPE {errors} counter")
+        for name, t in snapshot['timings'].items():
+            lines.append(f'{errors}{{operation="{_label_value(name)}"}} {t["errors"]}')
+
+        events = f"{ns}_events_total"
+        lines.append(f"# HELP {events} Contadores de eventos.")
+        lines.append(f"# TYPE {events} counter")
+        for name, value in snapshot['counters'].items():
+            lines.append(f'{events}{{name="{_label_value(name)}"}} {value!r}')
+
+        gauge = f"{ns}_gauge"
+        lines.append(f"# HELP {gauge} Medidas instantâneas dos coletores registrados.")
+        lines.append(f"# TYPE {gauge} gauge")
+        for name, value in snapshot['gauges'].items():
+            lines.append(f'{gauge}{{name="{_label_value(name)}"}} {float(value)!r}')
+        return '\n'.join(lines) + '\n'
+
+
+def _label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Registro compartilhado por todo o processo (ligado com FLUX_METRICS=1)
+METRICS = MetricsRegistry(enabled=os.environ.get('FLUX_METRICS', '0') not in ('', '0', 'false'))
+timed = METRICS.timed
+timer = METRICS.timer
@@ -1,17 +1,18 @@
 import streamlit as st
-import pandas as pd
+import numpy as np
 from typing import Optional
-import plotly.express as px  # Adicione esta linha no topo com os outros imports
-from config import BetType, MatchCondition, QuantumState, QuantumBet
+from config import (
+    BetType, MatchCondition, QuantumState, parse_score,
+    MARKETS, BET_TYPE_INDEX, get_hedge_market, get_attack_market
+)
 from utils import safe_divide
+from metrics import METRICS, timed
 from event_manager import EventManager
-from functools import lru_cache
-
-@lru_cache(maxsize=32)
-def calculate_probability(bet_type, score, minute, home_pressure, away_pressure):
-    """Função otimizada para cálculos de probabilidade"""
-    # Implemente aqui os cálculos que estavam em estimate_contextual_probability
-    pass
+from recommendations import (
+    VOLATILITY_FACTORS, PortfolioSnapshot, RecommendationEngine, in_play_capital,
+    dynamic_ratios, strategy, strategy_info, hedge_info
+)
+from scenarios import is_bet_won
 
 STATE_KEYS = {
     'multi_bets': {
@@ -30,6 +31,67 @@ def init_state(module_name):
     if f'{module_name}_state' not in st.session_state:
         st.session_state[f'{module_name}_state'] = STATE_KEYS[module_name].copy()
 
+
+def _timing_under_25(minute, home_goals, away_goals, pressure_diff):
+    total_goals = home_goals + away_goals
+    return (
+        "ENTRADA FORTE (antes dos 25')" if minute < 25 and total_goals == 0 else
+        "ENTRADA MODERADA (25'-35')" if minute < 35 and total_goals < 1 else
+        "PROTEÇÃO (35'-60')" if minute < 60 and total_goals < 2 else
+        "HEDGE OBRIGATÓRIO (após 60')"
+    )
+
+
+def _timing_over_15_fh(minute, home_goals, away_goals, pressure_diff):
+    total_goals = home_goals + away_goals
+    return (
+        "ENTRADA AGGRESSIVA (antes dos 15')" if minute < 15 and pressure_diff > 0.3 else
+        "ENTRADA PADRÃO (15'-25')" if minute < 25 else
+        "ÚLTIMA CHANCE (25'-35')" if minute < 35 and total_goals == 0 else
+        "EVITAR (após 35')"
+    )
+
+
+def _timing_both_to_score(minute, home_goals, away_goals, pressure_diff):
+    total_goals = home_goals + away_goals
+    return (
+        "ENTRADA INICIAL (antes dos 20')" if minute < 20 else
+        "ENTRADA TARDIA (20'-40')" if minute < 40 and total_goals == 0 else
+        "PROTEÇÃO PARCIAL (40'-70')" if home_goals == 1 or away_goals == 1 else
+        "POSICIONAR CONTRA (após 70')"
+    )
+
+
+def _timing_double_chance_underdog(minute, home_goals, away_goals, pressure_diff):
+    goal_diff = home_goals - away_goals
+    return (
+        "ENTRADA INICIAL (antes dos 25')" if minute < 25 and goal_diff == 0 else
+        "POSICIONAR CONTRA (25'-60')" if goal_diff == 1 else
+        "HEDGE PARCIAL (após 60')" if abs(goal_diff) <= 1 else
+        "MANTER POSIÇÃO"
+    )
+
+
+def _timing_over_15_match(minute, home_goals, away_goals, pressure_diff):
+    total_goals = home_goals + away_goals
+    return (
+        "ENTRADA FORTE (antes dos 15')" if minute < 15 else
+        "ENTRADA CONDICIONAL (15'-30')" if minute < 30 and total_goals == 0 else
+        "PROTEÇÃO (30'-60')" if total_goals == 1 else
+        "LIQUIDAR POSIÇÃO (após 60')"
+    )
+
+
+# Regras de timing por mercado (só a regra do mercado consultado é avaliada)
+TIMING_RULES = {
+    BetType.UNDER_25: _timing_under_25,
+    BetType.OVER_15_FH: _timing_over_15_fh,
+    BetType.BOTH_TO_SCORE: _timing_both_to_score,
+    BetType.DOUBLE_CHANCE_UNDERDOG: _timing_double_chance_underdog,
+    BetType.OVER_15_MATCH: _timing_over_15_match
+}
+
+
 class InPlayModule:
     def __init__(self, system):
         self.system = system
@@ -43,12 +105,13 @@ class InPlayModule:
             }
         self.state = st.session_state.in_play_state
 
+        # Recomendações memorizadas pela impressão digital das entradas (portfólio, condição, volatilidade, capital)
+        if 'in_play_cache' not in st.session_state:
+            st.session_state.in_play_cache = {}
+
         # Adicionando mapeamento de volatilidade para valores numéricos
-        self.volatility_map = {
-            "Estável": 0.3,
-            "Transição": 0.6,
-            "Caótico": 0.9
-        }
+        self.volatility_map = VOLATILITY_FACTORS
+        self.engine = RecommendationEngine(system.optimizer)
         
     def _load_custom_styles(self):
         """Carrega estilos e animações customizadas"""
@@ -193,9 +256,12 @@ class InPlayModule:
             "2-2": "Jogo aberto"
         }
         
+        options = list(score_options.keys())
         selected_score = st.selectbox(
             "Placar Atual",
-            options=list(score_options.keys()),
+            options=options,
+            # Parte do placar salvo (sessão restaurada)
+            index=options.index(self.state["score"]) if self.state["score"] in options else 0,
             format_func=lambda x: f"{x} ({score_options[x]})",
             key="live_score_select"
         )
@@ -227,7 +293,7 @@ class InPlayModule:
 
     def _auto_adjust_pressure(self, score):
         """Ajusta automaticamente as pressões conforme o placar"""
-        home_goals, away_goals = map(int, score.split('-'))
+        home_goals, away_goals = parse_score(score)
         goal_diff = home_goals - away_goals
         
         # Pressão base baseada no placar
@@ -278,6 +344,7 @@ class InPlayModule:
         quantum_state = QuantumState(self.state["volatility"])
         
         recommendations = self._generate_dynamic_recommendations(condition, quantum_state, capital_for_phase)
+        self._render_red_card_demo(condition)
         
         # Exibir recomendações com contexto
         if not recommendations:
@@ -339,9 +406,9 @@ class InPlayModule:
             with col1:
                 with st.expander("🔍 Apostas Iniciais (60%)", expanded=True):
                     if st.session_state.portfolio.initial_bets:
-                        for bet_type, bet in st.session_state.portfolio.initial_bets.items():
+                        for bet in st.session_state.portfolio.initial_bets.values():
                             st.metric(
-                                label=bet_type.value,
+                                label=bet.bet_type.value,
                                 value=f"R$ {bet.amount:.2f}",
                                 delta=f"Odd: {bet.odd:.2f}"
                             )
@@ -520,275 +587,52 @@ class InPlayModule:
 
     def _generate_dynamic_recommendations(self, condition: MatchCondition, quantum_state: QuantumState, capital: float):
         """
-        Enhanced decision engine that now includes:
-        1. Quantum Comeback scenario
-        2. Safety Hedge for multi-bets
-        3. Red Card Effect analysis
+        Recomendações do RecommendationEngine para o portfólio da sessão.
+        Estratégia e proteção fazem parte de cada registro, então um rerun sem
+        mudança de portfólio, condição, volatilidade ou capital reaproveita tudo.
         """
-        recommendations = []
-        home_goals, away_goals = map(int, condition.score.split('-'))
-        total_goals = home_goals + away_goals
-        goal_diff = home_goals - away_goals
-        minute = condition.minute
-        home_pressure = condition.home_pressure
-        away_pressure = condition.away_pressure
-        volatility = quantum_state.value
-
-        # 1️⃣ Quantum Comeback Scenario (Virada Quântica)
-        if ((home_goals < away_goals and home_pressure > 0.75) or 
-            (away_goals < home_goals and away_pressure > 0.75)) and 60 <= minute <= 75:
-            
-            is_home_favorite = home_pressure > away_pressure
-            losing_team = "HOME" if home_goals < away_goals else "AWAY"
-            
-            main_bet = BetType.HOME_WIN if is_home_favorite else BetType.AWAY_WIN
-            hedge_bet = BetType.DRAW  # Proteção com empate
-            
-            # Probabilidades ajustadas
-            prob_main = self.system.optimizer.estimate_contextual_probability(main_bet, condition)
-            prob_hedge = self.system.optimizer.estimate_contextual_probability(hedge_bet, condition)
-            
-            # Aplicando regra 70/30
-            recommendations.extend([
-                {
-                    "bet_type": main_bet,
-                    "name": f"Virada Quântica - {'Casa' if is_home_favorite else 'Visitante'} (70%)",
-                    "reason": f"Time favorito pressionando para virada (Prob: {prob_main:.1%})",
-                    "weight": 0.7 * 1.5,  # 70% do peso original
-                    "min_odd": 2.50,
-                    "priority": "Alta",
-                    "quantum_moment": True
-                },
-                {
-                    "bet_type": hedge_bet,
-                    "name": f"Proteção Empate (30%)",
-                    "reason": f"Proteção contra empate (Prob: {prob_hedge:.1%})",
-                    "weight": 0.3 * 1.5,  # 30% do peso original
-                    "min_odd": 3.50,
-                    "priority": "Média",
-                    "hedge_protection": True
-                }
-            ])
-
-        # 2️⃣ Safety Hedge Scenario (Hedge de Segurança)
-        if hasattr(st.session_state, 'portfolio') and hasattr(st.session_state.portfolio, 'multi_bets'):
-            for multi_bet in st.session_state.portfolio.multi_bets:
-                if minute >= 80 and total_goals <= 2 and len(multi_bet['bets']) >= 3:
-                    # Check if only one leg remains
-                    remaining_legs = [
-                        leg for leg in multi_bet['bets'] 
-                        if not self._is_bet_won(leg, condition.score)
-                    ]
-                    
-                    if len(remaining_legs) == 1:
-                        remaining_bet = remaining_legs[0]
-                        hedge_bet = self._get_hedge_bet(remaining_bet, condition.score)
-                        
-                        if hedge_bet:
-                            recommendations.append({
-                                "bet_type": hedge_bet,
-                                "name": f"Hedge de Segurança para {multi_bet['name']}",
-                                "reason": (
-                                    f"Aposta múltipla prestes a ser ganha com apenas 1 mercado pendente. "
-                                    f"Proteja seu lucro apostando no oposto: {hedge_bet.value}."
-                                ),
-                                "weight": 1.3,
-                                "min_odd": 1.80,
-                                "priority": "Crítica",
-                                "hedge_required": True
-                            })
-
-        # 3️⃣ Red Card Effect (Efeito Cartão Vermelho) - Simulated event
-        if st.session_state.get('red_card_event', False):
-            if home_goals == away_goals or abs(goal_diff) == 1:
-                if st.session_state.red_card_event['team'] == 'HOME':
-                    recommendations.append({
-                        'bet_type': BetType.UNDER_25,  # OBRIGATÓRIO
-                        'name': "Nome da aposta",      # OBRIGATÓRIO
-                        'stake': 100.00,              # OBRIGATÓRIO
-                        'odd': 1.85,                  # OBRIGATÓRIO
-                        'prob': 0.55,                 # OBRIGATÓRIO
-                        'strategy': "Estratégia descritiva",  # OBRIGATÓRIO
-                        "name": "Efeito Cartão Vermelho - Menos Gols (Casa com 1 a menos)",
-                        "reason": "Cartão vermelho para o time da casa. Expectativa de jogo mais fechado.",
-                        "weight": 1.4,
-                        "min_odd": 1.60,
-                        "priority": "Alta"
-                    })
-                else:
-                    recommendations.append({
-                        "bet_type": BetType.AWAY_HANDICAP,
-                        "name": "Efeito Cartão Vermelho - Handicap Visitante",
-                        "reason": "Cartão vermelho para o visitante. Favorito deve ampliar vantagem.",
-                        "weight": 1.2,
-                        "min_odd": 1.80,
-                        "priority": "Média"
-                    })
-            
-        # 4️⃣ Cenário: Jogo com 1 gol e estável no intervalo
-        if total_goals == 1 and 40 <= minute <= 50 and volatility == "Estável":
-            recommendations.append({
-                "bet_type": BetType.UNDER_25,
-                "name": "Menos de 2.5 Gols (Total)",
-                "reason": "Mercado estável e apenas 1 gol no 1º tempo. A tendência defensiva deve se manter.",
-                "weight": 1.1,
-                "min_odd": 1.50
-            })
-
-        # 5️⃣ Cenário: Pressão forte do favorito no início
-        if home_pressure > 0.70 and minute <= 25 and volatility == "Caótico":
-            recommendations.append({
-                "bet_type": BetType.BOTH_TO_SCORE_NO,
-                "name": "Ambas as Equipes Marcam - Não",
-                "reason": f"Pressão massiva do favorito ({home_pressure:.0%}) em mercado volátil. Aposta protege contra um gol unilateral.",
-                "weight": 0.9,
-                "min_odd": 1.60
-            })
-
-        # 6️⃣ Cenário: Pressão forte do azarão no início
-        if away_pressure > 0.70 and minute <= 25 and volatility == "Caótico":
-            recommendations.append({
-                "bet_type": BetType.NEXT_GOAL_AWAY,
-                "name": "Próximo Gol - Visitante (Azarão)",
-                "reason": f"Pressão surpreendente do azarão ({away_pressure:.0%}). Valor na odd do próximo gol.",
-                "weight": 0.8,
-                "min_odd": 2.00
-            })
-            
-        # 7️⃣ Cenário: Empate equilibrado no intervalo
-        if home_goals == 1 and away_goals == 1 and 40 <= minute <= 50 and volatility in ["Estável", "Transição"]:
-            recommendations.append({
-                "bet_type": BetType.DRAW,
-                "name": "Resultado Final - Empate",
-                "reason": "Jogo empatado e equilibrado no intervalo. A probabilidade de o resultado se manter é significativa.",
-                "weight": 0.7,
-                "min_odd": 3.50
-            })
-
-        # 8️⃣ Cenário: Pressão inversa ao placar (time perdendo pressionando)
-        if (home_goals < away_goals and home_pressure > 0.6) or (away_goals < home_goals and away_pressure > 0.6):
-            losing_team = "Casa" if home_goals < away_goals else "Visitante"
-            pressure = home_pressure if losing_team == "Casa" else away_pressure
-            recommendations.append({
-                "bet_type": BetType.NEXT_GOAL_LOSING_TEAM,
-                "name": f"Próximo Gol - {losing_team} (Time Perdendo)",
-                "reason": f"Time perdendo ({losing_team}) com pressão alta ({pressure:.0%}). Boa oportunidade para contra-ataque.",
-                "weight": 0.9,
-                "min_odd": 2.20
-            })
-
-        # 9️⃣ Cenário: Mudança brusca de volatilidade
-        if hasattr(self, 'last_volatility') and self.last_volatility != volatility and minute > 1:
-            if volatility == "Caótico" and self.last_volatility == "Estável":
-                recommendations.append({
-                    "bet_type": BetType.GOAL_NEXT_5_MIN,
-                    "name": "Gol nos próximos 5 minutos",
-                    "reason": "Mudança brusca para mercado Caótico. Alta probabilidade de gol em curto prazo.",
-                    "weight": 1.4,  # Peso alto para eventos iminentes
-                    "min_odd": 2.50
-                })
-            self.last_volatility = volatility
-
-        # 🔟 Cenário: Partida morna (sem chances claras)
-        if total_goals <= 1 and minute >= 60 and home_pressure < 0.4 and away_pressure < 0.4:
-            recommendations.append({
-                "bet_type": BetType.NO_MORE_GOALS,
-                "name": "Sem mais gols na partida",
-                "reason": "Jogo com baixa intensidade e poucas finalizações nos últimos 15 minutos.",
-                "weight": 1.2,
-                "min_odd": 2.00
-            })
-            
-        if not st.session_state.get('red_card_event', False) and minute > 30:
+        snapshot = self._portfolio_snapshot()
+        red_card_event = st.session_state.get('red_card_event') or None
+        last_volatility = getattr(self, 'last_volatility', None)
+        key = (
+            snapshot.fingerprint(), condition, quantum_state, capital,
+            tuple(sorted(red_card_event.items())) if red_card_event else None,
+            last_volatility
+        )
+        return self._cached('recommendations', key, lambda: self.engine.recommend(
+            snapshot, condition, quantum_state, capital,
+            red_card_event=red_card_event,
+            last_volatility=last_volatility
+        ))
+
+    def _portfolio_snapshot(self) -> PortfolioSnapshot:
+        return PortfolioSnapshot.from_portfolio(getattr(st.session_state, 'portfolio', None))
+
+    def _cached(self, name: str, key, compute):
+        """Valor memorizado em st.session_state.in_play_cache enquanto `key` não muda"""
+        cache = st.session_state.in_play_cache
+        entry = cache.get(name)
+        if entry is not None and entry[0] == key:
+            METRICS.count('in_play.cache_hits')
+            return entry[1]
+        METRICS.count('in_play.cache_misses')
+        value = compute()
+        cache[name] = (key, value)
+        return value
+
+    def _render_red_card_demo(self, condition: MatchCondition):
+        """Botão de demonstração que simula um cartão vermelho para o time com mais pressão"""
+        if not st.session_state.get('red_card_event', False) and condition.minute > 30:
             if st.button("Simular Cartão Vermelho (Demo)"):
                 st.session_state.red_card_event = {
-                    'minute': minute,
-                    'team': 'HOME' if home_pressure > away_pressure else 'AWAY'
+                    'minute': condition.minute,
+                    'team': 'HOME' if condition.home_pressure > condition.away_pressure else 'AWAY'
                 }
                 st.rerun()
 
-        # Distribuição do capital
-        if recommendations:
-            total_weight = sum(r["weight"] for r in recommendations)
-            
-            for rec in recommendations:
-                # Primeiro calcula as proporções de proteção/ataque
-                protection_ratio, attack_ratio = self._calculate_dynamic_ratios(rec['bet_type'], condition)
-                
-                # Garante valores válidos
-                protection_ratio = protection_ratio if protection_ratio is not None else 0.7
-                attack_ratio = 1 - protection_ratio
-
-                # Calcula a probabilidade contextual
-                prob = self.system.optimizer.estimate_contextual_probability(
-                    rec["bet_type"], 
-                    condition
-                )
-                
-                # Calcula o valor proporcional
-                proportion = rec["weight"] / total_weight
-                stake = capital * proportion
-                
-                # Obtém a odd atual (com fallback para odd mínima)
-                initial_bet = st.session_state.portfolio.initial_bets.get(rec["bet_type"])
-                odd_live = (initial_bet.odd * (1 + (0.5 - prob))) if initial_bet else rec["min_odd"]
-                
-                # Adiciona detalhes calculados
-                rec.update({
-                    "odd": odd_live,
-                    "prob": prob,
-                    "stake": stake,
-                    "proportion": proportion,
-                    "ev": (prob * odd_live - 1) * 100,
-                    "protection_ratio": protection_ratio,
-                    "attack_ratio": attack_ratio,
-                    "protection_stake": stake * protection_ratio,
-                    "attack_stake": stake * attack_ratio,
-                    "strategy": self._get_strategy(rec["bet_type"], condition, protection_ratio),
-                    "hedge": self._get_hedge_info(rec["bet_type"], initial_bet.amount if initial_bet else 0)
-                })
-
-        enhanced_recommendations = []
-        for rec in recommendations:
-            protection_weight, attack_weight, attack_bet = self._calculate_protection_weights(rec["bet_type"], condition)
-            
-            if protection_weight and attack_weight and attack_bet:
-                # Cria recomendação de proteção (70%)
-                protection_rec = rec.copy()
-                protection_rec.update({
-                    "weight": protection_weight,
-                    "priority": "Proteção",
-                    "strategy": "Proteção do resultado atual (70% do capital)"
-                })
-                
-                # Cria recomendação de ataque (30%)
-                attack_prob = self.system.optimizer.estimate_contextual_probability(attack_bet, condition)
-                attack_rec = {
-                    "bet_type": attack_bet,
-                    "name": f"Ataque {attack_bet.value} (30%)",
-                    "reason": f"Complemento de {rec['name']} com 30% para potencializar ganhos",
-                    "weight": attack_weight,
-                    "min_odd": rec["min_odd"] * 1.3,  # Odd ajustada
-                    "priority": "Ataque",
-                    "prob": attack_prob,
-                    "strategy": "Potencialização de ganhos (30% do capital)"
-                }
-                
-                enhanced_recommendations.extend([protection_rec, attack_rec])
-            else:
-                enhanced_recommendations.append(rec)
-        
-        return recommendations
-    
     def _get_fallback_odd(self, bet_type: BetType) -> float:
         """Obtém odd de fallback quando não disponível"""
-        return {
-            BetType.HOME_WIN: 2.0,
-            BetType.AWAY_WIN: 3.5,
-            BetType.DRAW: 3.2,
-            BetType.OVER_25: 1.8,
-            BetType.UNDER_25: 2.0
-        }.get(bet_type, 2.0)
+        return MARKETS[BET_TYPE_INDEX[bet_type]].fallback_odd
     
     def _calculate_protection_weights(self, bet_type: BetType, condition: MatchCondition) -> tuple:
         """Calcula os pesos para estratégia de proteção (70/30).
@@ -799,22 +643,16 @@ class InPlayModule:
     
     def _calculate_protection_weights(self, bet_type: BetType, condition: MatchCondition) -> tuple:
         """Calcula os pesos de proteção (70%) e ataque (30%) baseado no contexto"""
-        home_goals, away_goals = map(int, condition.score.split('-'))
+        home_goals, away_goals = condition.home_goals, condition.away_goals
         total_goals = home_goals + away_goals
         
-        # Mapeamento de proteção vs. ataque
-        protection_bets = {
-            BetType.UNDER_25: BetType.OVER_25,
-            BetType.BOTH_TO_SCORE_NO: BetType.BOTH_TO_SCORE,
-            BetType.DRAW: BetType.HOME_WIN if condition.home_pressure > condition.away_pressure else BetType.AWAY_WIN
-        }
+        # Mapeamento de proteção vs. ataque (registro de mercados)
+        attack_bet = get_attack_market(bet_type, condition.home_pressure, condition.away_pressure)
         
-        if bet_type in protection_bets:
-            attack_bet = protection_bets[bet_type]
-            
+        if attack_bet is not None:
             # Calcula probabilidades relativas
-            prob_protection = self.system.optimizer.estimate_contextual_probability(bet_type, condition)
-            prob_attack = self.system.optimizer.estimate_contextual_probability(attack_bet, condition)
+            prob_protection = self.system.optimizer.cached_probability(bet_type, condition)
+            prob_attack = self.system.optimizer.cached_probability(attack_bet, condition)
             
             total_prob = prob_protection + prob_attack
             
@@ -825,74 +663,22 @@ class InPlayModule:
         
         return None, None, None
     
-    def _is_bet_won(self, bet_type: BetType, score: str) -> bool:
+    def _is_bet_won(self, bet_type: BetType, condition: MatchCondition) -> bool:
         """Check if a bet type is already won based on current score"""
-        home_goals, away_goals = map(int, score.split('-'))
-        
-        bet_results = {
-            BetType.HOME_WIN: home_goals > away_goals,
-            BetType.AWAY_WIN: away_goals > home_goals,
-            BetType.DRAW: home_goals == away_goals,
-            BetType.OVER_15: (home_goals + away_goals) > 1.5,
-            BetType.OVER_25: (home_goals + away_goals) > 2.5,
-            BetType.BOTH_TO_SCORE: home_goals >= 1 and away_goals >= 1
-        }
-        return bet_results.get(bet_type, False)
+        return is_bet_won(bet_type, condition)
 
     def _get_hedge_bet(self, original_bet: BetType, score: str) -> Optional[BetType]:
         """Get the opposite bet for hedging purposes"""
-        hedge_map = {
-            BetType.HOME_WIN: BetType.AWAY_WIN,
-            BetType.AWAY_WIN: BetType.HOME_WIN,
-            BetType.OVER_25: BetType.UNDER_25,
-            BetType.BOTH_TO_SCORE: BetType.BOTH_TO_SCORE_NO
-        }
-        return hedge_map.get(original_bet)
+        return get_hedge_market(original_bet)
     
     def _get_timing_recommendation(self, bet_type, condition):
         """Versão final corrigida com tratamento completo de erros"""
         try:
             # Extração segura dos dados do placar
-            home_goals, away_goals = map(int, condition.score.split('-'))
-            total_goals = home_goals + away_goals
-            goal_diff = home_goals - away_goals
+            home_goals, away_goals = condition.home_goals, condition.away_goals
             minute = condition.minute
             pressure_diff = self.state["home_pressure"] - self.state["away_pressure"]
             
-            # Regras de timing completas
-            timing_rules = {
-                BetType.UNDER_25: (
-                    "ENTRADA FORTE (antes dos 25')" if minute < 25 and total_goals == 0 else
-                    "ENTRADA MODERADA (25'-35')" if minute < 35 and total_goals < 1 else
-                    "PROTEÇÃO (35'-60')" if minute < 60 and total_goals < 2 else
-                    "HEDGE OBRIGATÓRIO (após 60')"
-                ),
-                BetType.OVER_15_FH: (
-                    "ENTRADA AGGRESSIVA (antes dos 15')" if minute < 15 and pressure_diff > 0.3 else
-                    "ENTRADA PADRÃO (15'-25')" if minute < 25 else
-                    "ÚLTIMA CHANCE (25'-35')" if minute < 35 and total_goals == 0 else
-                    "EVITAR (após 35')"
-                ),
-                BetType.BOTH_TO_SCORE: (
-                    "ENTRADA INICIAL (antes dos 20')" if minute < 20 else
-                    "ENTRADA TARDIA (20'-40')" if minute < 40 and total_goals == 0 else
-                    "PROTEÇÃO PARCIAL (40'-70')" if any([home_goals == 1, away_goals == 1]) else
-                    "POSICIONAR CONTRA (após 70')"
-                ),
-                BetType.DOUBLE_CHANCE_UNDERDOG: (
-                    "ENTRADA INICIAL (antes dos 25')" if minute < 25 and goal_diff == 0 else
-                    "POSICIONAR CONTRA (25'-60')" if goal_diff == 1 else
-                    "HEDGE PARCIAL (após 60')" if abs(goal_diff) <= 1 else
-                    "MANTER POSIÇÃO"
-                ),
-                BetType.OVER_15_MATCH: (
-                    "ENTRADA FORTE (antes dos 15')" if minute < 15 else
-                    "ENTRADA CONDICIONAL (15'-30')" if minute < 30 and total_goals == 0 else
-                    "PROTEÇÃO (30'-60')" if total_goals == 1 else
-                    "LIQUIDAR POSIÇÃO (após 60')"
-                )
-            }
-            
             # Fatores contextuais
             context_factors = []
             if self.state["volatility"] == "Caótico":
@@ -906,7 +692,10 @@ class InPlayModule:
                 context_factors.append(f"Pressão favorável ao visitante ({abs(pressure_diff):.1f})")
             
             # Recomendação final
-            base_recommendation = timing_rules.get(bet_type, "Analisar contexto manualmente")
+            rule = TIMING_RULES.get(bet_type)
+            base_recommendation = (
+                rule(minute, home_goals, away_goals, pressure_diff) if rule else "Analisar contexto manualmente"
+            )
             return f"{base_recommendation} [{', '.join(context_factors)}]" if context_factors else base_recommendation
             
         except Exception as e:
@@ -915,161 +704,25 @@ class InPlayModule:
     
     def _get_strategy(self, bet_type: BetType, condition: MatchCondition, protection_ratio: float = None) -> dict:
         """Método unificado para obter estratégias de aposta"""
-        # Calcular protection_ratio se não foi fornecido
-        if protection_ratio is None:
-            protection_ratio, _ = self._calculate_dynamic_ratios(bet_type, condition)
-        
-        # Agora podemos chamar _get_strategy_info com protection_ratio definido
-        strategy_info = self._get_strategy_info(bet_type, condition, protection_ratio)
-        
-        return {
-            "strategy": f"Estratégia para {bet_type.value}",
-            "detail": strategy_info,
-            "protection_ratio": protection_ratio,
-            "attack_ratio": 1 - protection_ratio
-        }
-    
+        return strategy(bet_type, condition, self.state["volatility"], protection_ratio)
+
     def _get_strategy_info(self, bet_type, condition, protection_ratio=None):
         """Versão segura com fallback"""
-        if protection_ratio is None:
-            protection_ratio = 0.7  # Valor padrão
-        home_goals, away_goals = map(int, condition.score.split('-'))
-        total_goals = home_goals + away_goals
-        goal_diff = home_goals - away_goals
-        minute = condition.minute
-        volatility = self.state["volatility"]
-        pressure_diff = condition.home_pressure - condition.away_pressure
-        
-        # Fatores de ponderação
-        volatility_factor = self.volatility_map.get(volatility, 0.5)
-        pressure_factor = abs(pressure_diff)  # 0 a 1
-        time_factor = min(1.0, minute / 90)  # 0 a 1
-        
-        # Estratégias base
-        base_strategies = {
-            BetType.UNDER_25: {
-                "Estável": {
-                    "early": ("Proteção 30% + Ataque 70%", "Aposta preventiva com foco em under"),
-                    "mid": ("Proteção 50% + Ataque 50%", "Ajuste balanceado"),
-                    "late": ("Proteção 70% + Ataque 30%", "Bloqueio defensivo")
-                },
-                "Caótico": {
-                    "early": ("Proteção 50% + Ataque 50%", "Aposta cautelosa em under"),
-                    "mid": ("Proteção 60% + Ataque 40%", "Defesa contra virada"),
-                    "late": ("Proteção 80% + Ataque 20%", "Proteção máxima")
-                }
-            },
-            BetType.OVER_25: {
-                "Transição": {
-                    "early": ("Ataque 70% + Proteção 30%", "Explorar início ofensivo"),
-                    "mid": ("Ataque 50% + Proteção 50%", "Ajuste tático"),
-                    "late": ("Proteção 70% + Ataque 30%", "Travar lucros")
-                }
-            },
-            BetType.HOME_WIN: {
-                "Estável": {
-                    "early": ("Ataque 60% + Proteção 40%", "Valor na casa"),
-                    "mid": ("Ataque 40% + Proteção 60%", "Consolidação"),
-                    "late": ("Proteção 80% + Ataque 20%", "Manter vantagem")
-                }
-            },
-            BetType.AWAY_WIN: {
-                "Caótico": {
-                    "early": ("Ataque 30% + Proteção 70%", "Especulação cautelosa"),
-                    "mid": ("Ataque 50% + Proteção 50%", "Virada potencial"),
-                    "late": ("Ataque 70% + Proteção 30%", "Pressão final")
-                }
-            }
-        }
-        
-        # Determinar fase do jogo
-        if minute < 30:
-            game_phase = "early"
-        elif minute < 60:
-            game_phase = "mid"
-        else:
-            game_phase = "late"
-        
-        # Obter estratégia específica ou padrão
-        strategy = base_strategies.get(bet_type, {}).get(volatility, {}).get(game_phase)
-        
-        if not strategy:
-            # Estratégia padrão com cálculo dinâmico
-            protection_ratio = 0.5 + (0.4 * volatility_factor) - (0.2 * pressure_factor) + (0.3 * time_factor)
-            protection_ratio = max(0.2, min(0.8, protection_ratio))  # Limitar entre 20% e 80%
-            attack_ratio = 1 - protection_ratio
-            
-            protection_pct = int(protection_ratio * 100)
-            attack_pct = int(attack_ratio * 100)
-            
-            default_strategy = (
-                f"Proteção {protection_pct}% + Ataque {attack_pct}%",
-                "Estratégia dinâmica baseada no contexto"
-            )
-            return default_strategy
-        
-        return f"{strategy[0]} - {strategy[1]}"  # Apenas a string formatada
-    
+        return strategy_info(bet_type, condition, self.state["volatility"], protection_ratio)
+
     def _calculate_dynamic_ratios(self, bet_type, condition):
         """Calcula proporções de proteção/ataque com fallback seguro"""
-        try:
-            minute = condition.minute
-            volatility = self.state["volatility"]
-            pressure_diff = abs(condition.home_pressure - condition.away_pressure)
-            
-            # Fatores de ponderação
-            time_factor = min(1.0, minute / 90)
-            volatility_factor = self.volatility_map.get(volatility, 0.5)
-            pressure_factor = pressure_diff
-            
-            # Cálculo base com tratamento de erro
-            base = 0.5  # Valor padrão seguro
-            if bet_type in [BetType.UNDER_25, BetType.BOTH_TO_SCORE_NO]:
-                base = 0.6 + (0.2 * volatility_factor) - (0.1 * pressure_factor)
-            elif bet_type in [BetType.OVER_25, BetType.BOTH_TO_SCORE]:
-                base = 0.4 - (0.1 * volatility_factor) + (0.2 * time_factor)
-                
-            # Garantir limites seguros
-            protection_ratio = max(0.1, min(0.9, base))
-            return protection_ratio, 1 - protection_ratio
-            
-        except Exception:
-            # Fallback em caso de qualquer erro
-            return 0.7, 0.3  # Proporção 70/30 padrão
+        return dynamic_ratios(bet_type, condition, self.state["volatility"])
 
     def _get_hedge_info(self, bet_type, initial_amount):
         """Aprimorado com sistema de proteção dinâmica"""
-        # Probabilidade de ocorrência do evento oposto
-        current_score = self.state["score"]
         condition = MatchCondition(
-            score=current_score,
+            score=self.state["score"],
             minute=self.state["minute"],
             home_pressure=self.state["home_pressure"],
             away_pressure=self.state["away_pressure"]
         )
-        
-        hedge_map = {
-            BetType.HOME_WIN: BetType.AWAY_WIN,
-            BetType.AWAY_WIN: BetType.HOME_WIN,
-            BetType.OVER_25: BetType.UNDER_25,
-            BetType.BOTH_TO_SCORE: BetType.BOTH_TO_SCORE_NO
-        }
-        
-        if bet_type in hedge_map:
-            hedge_bet = hedge_map[bet_type]
-            prob_main = self.system.optimizer.estimate_contextual_probability(bet_type, condition)
-            prob_hedge = self.system.optimizer.estimate_contextual_probability(hedge_bet, condition)
-            
-            # Calcula proporção ideal de hedge (30%-70%)
-            if prob_main + prob_hedge > 0:
-                hedge_ratio = min(0.7, max(0.3, prob_hedge / (prob_main + prob_hedge)))
-                return (
-                    f"Proteção dinâmica recomendada: R$ {initial_amount * hedge_ratio:.2f} "
-                    f"({hedge_ratio*100:.0f}% do valor inicial)\n"
-                    f"Probabilidade de proteção: {prob_hedge:.1%}"
-                )
-        
-        return "Proteção não calculada (analisar manualmente)"
+        return hedge_info(self.system.optimizer, bet_type, condition, initial_amount)
 
     def _calculate_in_play_capital(self):
         """Calcula o capital seguro para apostas ao vivo com tratamento aprimorado para multi_bets"""
@@ -1078,46 +731,16 @@ class InPlayModule:
             if not hasattr(st.session_state, 'portfolio'):
                 return 0
                 
+            portfolio = st.session_state.portfolio
             # Calcula o total investido nas apostas iniciais
             initial_invested = sum(
-                bet.amount for bet in st.session_state.portfolio.initial_bets.values()
-            ) if hasattr(st.session_state.portfolio, 'initial_bets') else 0
-            
-            # Calcula o valor REAL investido nas combinações múltiplas
-            multi_invested = 0
-            if hasattr(st.session_state.portfolio, 'multi_bets'):
-                # Calcula o capital alocado para a fase de combinações (31%)
-                combo_capital = st.session_state.portfolio.capital * 0.31
-                
-                # Divide igualmente entre as combinações selecionadas
-                num_combos = len(st.session_state.portfolio.multi_bets)
-                if num_combos > 0:
-                    multi_invested = combo_capital  # O valor total alocado para combinações
-            
-            # Capital total investido (iniciais + combinações)
-            total_invested = initial_invested + multi_invested
-            
-            # Capital disponível (9% do total ou saldo restante)
-            available_capital = st.session_state.portfolio.capital - total_invested
-            base_in_play_capital = min(
-                st.session_state.portfolio.capital * 0.09,
-                available_capital
-            )
-            
-            # Ajuste dinâmico baseado no minuto do jogo
-            minute_factor = min(1.0, self.state.get("minute", 0) / 90)
-            in_play_capital = base_in_play_capital
-            
-            # Aumenta a alocação para proteção no final do jogo
-            if minute_factor > 0.75:  # Últimos 25%
-                protection_boost = 1.0 + (minute_factor - 0.75) * 2  # Até 1.5x
-                in_play_capital = min(in_play_capital * protection_boost, st.session_state.portfolio.capital * 0.12)
-            
-            # Garante que não ultrapasse 12% do capital total
-            max_capital = st.session_state.portfolio.capital * 0.12
-            final_capital = min(max(0, in_play_capital), max_capital)
-            
-            return final_capital
+                bet.amount for bet in portfolio.initial_bets.values()
+            ) if hasattr(portfolio, 'initial_bets') else 0
+
+            # Combinações confirmadas consomem os 31% da Fase 2
+            multi_bets = getattr(portfolio, 'multi_bets', None) or ()
+            return in_play_capital(float(portfolio.capital), initial_invested, len(multi_bets),
+                                   self.state.get("minute", 0))
             
         except Exception as e:
             st.error(f"Erro no cálculo do capital: {str(e)}")
@@ -1134,8 +757,13 @@ class InPlayModule:
         else:
             return [BetType.UNDER_35, BetType.BOTH_TO_SCORE, BetType.WINNER]
  
+    @timed()
     def _render_probability_chart(self):
         """Renderiza o gráfico de probabilidades com Plotly"""
+        # Importados só quando o gráfico é desenhado: pandas e plotly pesam na partida do app
+        import pandas as pd
+        import plotly.express as px
+
         condition = MatchCondition(
             score=self.state["score"],
             minute=self.state["minute"],
@@ -1143,22 +771,16 @@ class InPlayModule:
             away_pressure=self.state["away_pressure"]
         )
         
-        # Dados para o gráfico
-        minutes = range(condition.minute, 91, 5)
+        # Dados para o gráfico: trajetória minuto a minuto numa única chamada vetorizada
         bet_types = [BetType.UNDER_25, BetType.BOTH_TO_SCORE]
+        minutes, trajectory = self.system.optimizer.probability_trajectory(bet_types, condition)
         
-        # Criar DataFrame com os dados
-        data = []
-        for m in minutes:
-            for bt in bet_types:
-                prob = self.system.optimizer.estimate_contextual_probability(bt, condition)
-                data.append({
-                    "Minuto": m,
-                    "Probabilidade": prob,
-                    "Tipo": bt.value
-                })
-        
-        df = pd.DataFrame(data)
+        # Criar DataFrame com os dados (formato longo: uma linha por minuto e mercado)
+        df = pd.DataFrame({
+            "Minuto": np.tile(minutes, len(bet_types)),
+            "Probabilidade": trajectory.ravel(),
+            "Tipo": np.repeat([bt.value for bt in bet_types], len(minutes))
+        })
         
         # Criar gráfico interativo
         fig = px.line(
@@ -1186,19 +808,11 @@ class InPlayModule:
     
     def _display_probability_flow_chart(self, condition: MatchCondition, quantum_state: QuantumState):
         """Cria um gráfico que mostra o 'canto geométrico' das probabilidades."""
-        # ... (código do gráfico permanece o mesmo) ...
-        minutes = range(condition.minute, 91, 5)
-        chart_data = []
+        import pandas as pd  # Importado só quando o gráfico é desenhado
 
         bet_types_to_chart = [BetType.UNDER_25, BetType.BOTH_TO_SCORE]
+        minutes, trajectory = self.system.optimizer.probability_trajectory(bet_types_to_chart, condition)
 
-        for bt in bet_types_to_chart:
-            probs = []
-            for m in minutes:
-                temp_cond = MatchCondition(condition.score, m, condition.home_pressure, condition.away_pressure)
-                probs.append(self.system.optimizer.estimate_contextual_probability(bt, temp_cond))
-            chart_data.append(pd.Series(probs, index=minutes, name=bt.value))
-        
-        df = pd.concat(chart_data, axis=1)
+        df = pd.DataFrame(trajectory.T, index=minutes, columns=[bt.value for bt in bet_types_to_chart])
         st.line_chart(df)
         st.caption("Gráfico de Fluxo: Projeção da evolução das probabilidades até o final do jogo.")
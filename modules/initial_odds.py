@@ -3,6 +3,46 @@ from typing import Dict
 from config import BetType, MatchCondition, QuantumState, QuantumBet, HumanBiasProfile
 from utils import safe_divide
 
+
+def optimize_initial_allocations(optimizer, odds: Dict[BetType, float]) -> Dict[BetType, float]:
+    """Alocação pré-jogo da Fase 1 (percentuais por mercado), sem dependência do Streamlit"""
+    # MatchCondition é imutável: o contexto entra na construção
+    match_condition = MatchCondition(
+        score="0-0",
+        minute=0,
+        home_pressure=0.5,  # Valor padrão
+        away_pressure=0.5,  # Valor padrão
+        match_context=('high_stakes',)
+    )
+
+    # Perfil de viés simplificado
+    bias_profile = HumanBiasProfile(
+        market_weights={
+            BetType.UNDER_25: 1.18,
+            BetType.WINNER: 1.15
+        }
+    )
+
+    return optimizer.optimize_portfolio(
+        available_bets=odds,
+        condition=match_condition,
+        quantum_state=QuantumState.ESTAVEL,
+        bias_profile=bias_profile
+    )
+
+
+def build_initial_bets(optimizer, allocations: Dict[BetType, float], odds: Dict[BetType, float],
+                       capital_for_phase: float) -> Dict[BetType, QuantumBet]:
+    """Converte os percentuais da Fase 1 em apostas (valor, odd, probabilidade pré-jogo e lucro esperado)"""
+    initial_bets = {}
+    for bet_type, percentage in allocations.items():
+        odd = odds[bet_type]
+        amount = capital_for_phase * percentage
+        prob = optimizer.cached_probability(bet_type, MatchCondition())
+        ev = amount * (odd - 1)
+        initial_bets[bet_type] = QuantumBet(bet_type, amount, odd, prob, ev)
+    return initial_bets
+
 class InitialOddsModule:
     def __init__(self, system):
         self.system = system
@@ -69,32 +109,8 @@ class InitialOddsModule:
                 # Botão de otimização
                 if st.button("Analisar e Otimizar Portfólio Inicial", key="optimize_standard"):
                     try:
-                        # Criação do MatchCondition sem contextos (ou com contextos vazios)
-                        match_condition = MatchCondition(
-                            score="0-0",
-                            minute=0,
-                            home_pressure=0.5,  # Valor padrão
-                            away_pressure=0.5   # Valor padrão
-                        )
-                        
-                        # Se precisar de contextos específicos, faça depois:
-                        match_condition.match_context.append('high_stakes')  # Adiciona contexto se necessário
-                        
-                        quantum_state = QuantumState.ESTAVEL
-
-                        # Criando perfil de viés simplificado
-                        bias_profile = HumanBiasProfile(
-                            market_weights={
-                                BetType.UNDER_25: 1.18,
-                                BetType.WINNER: 1.15
-                            }
-                        )
-
-                        self.state["allocations"] = self.system.optimizer.optimize_portfolio(
-                            available_bets=self.state["odds"],
-                            condition=match_condition,
-                            quantum_state=quantum_state,
-                            bias_profile=bias_profile
+                        self.state["allocations"] = optimize_initial_allocations(
+                            self.system.optimizer, self.state["odds"]
                         )
                         st.success("Portfólio otimizado com sucesso.")
                     except Exception as e:
@@ -106,20 +122,17 @@ class InitialOddsModule:
                     st.subheader("Portfólio Inicial Recomendado")
                     st.info(f"Capital alocado para esta fase: R$ {capital_for_phase:.2f}")
                     
-                    initial_bets = {}
+                    initial_bets = build_initial_bets(
+                        self.system.optimizer, self.state["allocations"], self.state["odds"], capital_for_phase
+                    )
                     for bet_type, percentage in self.state["allocations"].items():
-                        odd = self.state["odds"][bet_type]
-                        amount = capital_for_phase * percentage
-                        prob = self.system.optimizer.estimate_contextual_probability(bet_type, MatchCondition())
-                        ev = amount * (odd - 1)
-
-                        initial_bets[bet_type] = QuantumBet(bet_type, amount, odd, prob, ev)
+                        bet = initial_bets[bet_type]
                         
                         with st.container():
                             cols = st.columns(3)
                             cols[0].metric(label=f"**{bet_type.value}**", value=f"{percentage:.1%}")
-                            cols[1].metric(label="Valor Alocado", value=f"R$ {amount:.2f}")
-                            cols[2].metric(label="Lucro Esperado", value=f"R$ {ev:.2f}", delta=f"{(odd-1)*100:.1f}% ROI")
+                            cols[1].metric(label="Valor Alocado", value=f"R$ {bet.amount:.2f}")
+                            cols[2].metric(label="Lucro Esperado", value=f"R$ {bet.ev:.2f}", delta=f"{(bet.odd-1)*100:.1f}% ROI")
 
                     # BOTÃO DE CONFIRMAÇÃO (dentro do bloco de allocations)
                     if st.button("Confirmar Âncoras e Avançar", key="confirm_standard", type="primary"):
@@ -144,7 +157,7 @@ class InitialOddsModule:
                                 for bet in mandatory_bets:
                                     if bet not in initial_bets or initial_bets[bet].amount <= 0:
                                         odd = self.state["odds"][bet]
-                                        prob = self.system.optimizer.estimate_contextual_probability(bet, MatchCondition())
+                                        prob = self.system.optimizer.cached_probability(bet, MatchCondition())
                                         initial_bets[bet] = QuantumBet(bet, min_amount, odd, prob, min_amount * (odd - 1))
                         
                         try:     
@@ -178,7 +191,7 @@ class InitialOddsModule:
         odd = self.state["odds"][bet_type]
         amount = min(5.0, st.session_state.portfolio.capital * 0.8)
         
-        prob = self.system.optimizer.estimate_contextual_probability(bet_type, MatchCondition())
+        prob = self.system.optimizer.cached_probability(bet_type, MatchCondition())
         ev = (prob * odd - 1) * amount
 
         st.subheader("Recomendação de Aposta Única")
@@ -0,0 +1,181 @@
+import os
+import time
+from itertools import groupby
+from typing import Dict, List
+import streamlit as st
+from config import MatchCondition, QuantumState
+from metrics import timed
+from monitor import MatchBoard
+from live_feed import parse_event
+from recommendations import PortfolioSnapshot, RecommendationEngine
+
+# Threads usadas no recálculo das recomendações das partidas alteradas
+MONITOR_WORKERS = min(4, os.cpu_count() or 1)
+
+GRID_COLUMNS = ("Partida", "Placar", "Min", "Pressão C/V", "Volatilidade", "Recs", "Stake", "Melhor entrada")
+
+GRID_STYLE = """
+<style>
+    .monitor-row {
+        display: grid;
+        grid-template-columns: 1.2fr 0.6fr 0.5fr 1fr 1fr 0.5fr 0.8fr 3fr;
+        gap: 0.5rem;
+        font-size: 0.85rem;
+        padding: 2px 0;
+        border-bottom: 1px solid rgba(128, 128, 128, 0.2);
+    }
+    .monitor-header { font-weight: 600; }
+    .monitor-finished { opacity: 0.5; }
+</style>
+"""
+
+
+def _grid_row(cells, css_class: str = "") -> str:
+    return f'<div class="monitor-row {css_class}">' + "".join(f"<span>{cell}</span>" for cell in cells) + "</div>"
+
+
+def render_row(summary: Dict) -> str:
+    """HTML compacto de uma linha da grade a partir de MatchBoard.summary"""
+    best = summary['best']
+    best_text = (f"{best['name']} ({best['bet_type'].value}) @ {best['odd']:.2f}, EV {best['ev']:.1f}%"
+                 if best else "-")
+    red_card = " 🟥" if summary['red_card'] else ""
+    return _grid_row(
+        (
+            f"{summary['match_id']}{red_card}",
+            summary['score'],
+            f"{summary['minute']}'",
+            f"{summary['home_pressure']:.2f} / {summary['away_pressure']:.2f}",
+            summary['volatility'],
+            summary['recommendations'],
+            f"R$ {summary['stake']:.2f}",
+            best_text
+        ),
+        "monitor-finished" if summary['finished'] else ""
+    )
+
+
+class MatchMonitorModule:
+    """
+    Monitor de várias partidas simultâneas. O estado fica num MatchBoard em
+    st.session_state.monitor_board; a grade tem um placeholder por partida e,
+    durante a reprodução de eventos, só as linhas recalculadas são redesenhadas.
+    """
+    def __init__(self, system):
+        self.system = system
+        self.engine = RecommendationEngine(system.optimizer)
+
+    @property
+    def board(self) -> MatchBoard:
+        if 'monitor_board' not in st.session_state:
+            portfolio = PortfolioSnapshot.from_portfolio(st.session_state.get('portfolio'))
+            st.session_state.monitor_board = MatchBoard(portfolio if portfolio.capital > 0 else None)
+            st.session_state.monitor_rows = {}
+        return st.session_state.monitor_board
+
+    def run(self):
+        st.header("Monitor Multi-Partidas")
+        board = self.board
+        self._render_match_controls(board)
+
+        board.refresh(self.engine, workers=MONITOR_WORKERS)
+        placeholders = self._render_grid(board)
+        self._render_replay(board, placeholders)
+        return True
+
+    def _render_match_controls(self, board: MatchBoard):
+        """Inclusão manual e atualização de uma partida"""
+        with st.expander("Adicionar / Atualizar Partida", expanded=len(board) == 0):
+            cols = st.columns(3)
+            match_id = cols[0].text_input("Partida", value=f"Jogo {len(board) + 1}", key="monitor_match_id")
+            score = cols[1].text_input("Placar", value="0-0", key="monitor_score")
+            minute = cols[2].number_input("Minuto", min_value=0, max_value=130, value=0, key="monitor_minute")
+            cols = st.columns(3)
+            home_pressure = cols[0].slider("Pressão Casa", 0.0, 1.0, 0.5, 0.05, key="monitor_home_pressure")
+            away_pressure = cols[1].slider("Pressão Visitante", 0.0, 1.0, 0.5, 0.05, key="monitor_away_pressure")
+            volatility = cols[2].selectbox("Volatilidade", [s.value for s in QuantumState], key="monitor_volatility")
+
+            cols = st.columns(2)
+            if cols[0].button("Salvar Partida", key="monitor_save"):
+                try:
+                    if match_id in board:
+                        board.update(match_id, score=score, minute=int(minute), home_pressure=home_pressure,
+                                     away_pressure=away_pressure, volatility=volatility)
+                    else:
+                        board.add(match_id, PortfolioSnapshot.from_portfolio(st.session_state.get('portfolio')),
+                                  MatchCondition(score=score, minute=int(minute), home_pressure=home_pressure,
+                                                 away_pressure=away_pressure),
+                                  volatility)
+                except ValueError:
+                    st.error("Placar inválido: use o formato casa-visitante (ex.: 1-0)")
+            if match_id in board and cols[1].button("Remover Partida", key="monitor_remove"):
+                board.remove(match_id)
+                st.session_state.monitor_rows.pop(match_id, None)
+
+    @timed()
+    def _render_grid(self, board: MatchBoard) -> List:
+        """Grade compacta: um placeholder por partida, HTML reaproveitado nas linhas sem mudança"""
+        st.markdown(GRID_STYLE, unsafe_allow_html=True)
+        if len(board) == 0:
+            st.info("Nenhuma partida monitorada. Adicione partidas ou reproduza um arquivo de eventos.")
+            return []
+
+        st.markdown(_grid_row(GRID_COLUMNS, "monitor-header"), unsafe_allow_html=True)
+        cache = st.session_state.monitor_rows
+        changed = board.changed_rows()
+        for row in changed:
+            cache[board.match_ids[row]] = render_row(board.summary(row))
+        board.mark_rendered(changed)
+
+        self._grid = st.container()
+        placeholders = []
+        for match_id in board.match_ids:
+            placeholder = self._grid.empty()
+            placeholder.markdown(cache[match_id], unsafe_allow_html=True)
+            placeholders.append(placeholder)
+        return placeholders
+
+    def _redraw_changed(self, board: MatchBoard, placeholders: List):
+        """Redesenha apenas as linhas cujo estado foi recalculado"""
+        cache = st.session_state.monitor_rows
+        rows = board.changed_rows()
+        for row in rows:
+            html = cache[board.match_ids[row]] = render_row(board.summary(row))
+            if row < len(placeholders):
+                placeholders[row].markdown(html, unsafe_allow_html=True)
+            else:
+                # Partida nova vinda do arquivo de eventos
+                placeholders.append(self._grid.empty())
+                placeholders[-1].markdown(html, unsafe_allow_html=True)
+        board.mark_rendered(rows)
+
+    def _render_replay(self, board: MatchBoard, placeholders: List):
+        """Reprodução de um arquivo de eventos (JSON lines do feed ao vivo) minuto a minuto"""
+        st.markdown("---")
+        uploaded = st.file_uploader("Eventos ao vivo (JSON lines)", type=["jsonl", "json", "txt"],
+                                    key="monitor_events")
+        seconds_per_minute = st.slider("Segundos por minuto de jogo", 0.0, 2.0, 0.2, 0.1,
+                                       key="monitor_speed")
+        if uploaded is None or not st.button("Reproduzir Eventos", key="monitor_replay"):
+            return
+
+        events = []
+        for line in uploaded.getvalue().decode("utf-8").splitlines():
+            if line.strip():
+                try:
+                    events.append(parse_event(line))
+                except (ValueError, TypeError):
+                    continue
+
+        progress = st.progress(0.0)
+        applied = 0
+        for _, group in groupby(events, key=lambda e: e.get('minute')):
+            for event in group:
+                board.apply(event)
+                applied += 1
+            board.refresh(self.engine, workers=MONITOR_WORKERS)
+            self._redraw_changed(board, placeholders)
+            progress.progress(applied / len(events))
+            if seconds_per_minute > 0:
+                time.sleep(seconds_per_minute)
+        st.success(f"{applied} eventos aplicados em {len(board)} partidas")
@@ -1,4 +1,5 @@
 import streamlit as st
+from typing import Dict, List
 from config import BetType, MatchCondition, QuantumState, QuantumBet  # Adicione QuantumBet aqui
 from utils import safe_divide
 from event_manager import EventManager
@@ -20,6 +21,140 @@ def init_state(module_name):
     if f'{module_name}_state' not in st.session_state:
         st.session_state[f'{module_name}_state'] = STATE_KEYS[module_name].copy()
 
+def available_combinations(initial_bets: Dict[BetType, QuantumBet]) -> List[Dict]:
+    """Combinações da Fase 2 com as odds das apostas iniciais (fallback para as odds padrão)"""
+    # Função para obter odds com fallback
+    def get_odd(bet_type, default_odd):
+        return initial_bets[bet_type].odd if bet_type in initial_bets else default_odd
+
+    # Todas combinações possíveis
+    all_combinations = [
+        {
+            "name": "Dupla Chance Azarão + 1,5 Gols (Partida Inteira)",
+            "bets": [BetType.DOUBLE_CHANCE_UNDERDOG, BetType.OVER_15_MATCH],
+            "odds": [
+                get_odd(BetType.DOUBLE_CHANCE_UNDERDOG, 2.30),
+                get_odd(BetType.OVER_15_MATCH, 1.70)
+            ],
+            "description": "Proteção do azarão com expectativa de gols",
+            "requires_allocation": True
+        },
+        {
+            "name": "Combo Defensivo",
+            "bets": [BetType.UNDER_25, BetType.WINNER],
+            "odds": [
+                get_odd(BetType.UNDER_25, 1.90),
+                get_odd(BetType.WINNER, 1.50)
+            ],
+            "description": "Proteção contra resultados inesperados",
+            "requires_allocation": False
+        },
+        {
+            "name": "Combo de Gols",
+            "bets": [BetType.OVER_15_FH, BetType.BOTH_TO_SCORE],
+            "odds": [
+                get_odd(BetType.OVER_15_FH, 2.20),
+                get_odd(BetType.BOTH_TO_SCORE, 1.80)
+            ],
+            "description": "Foco em jogos com alta probabilidade de gols",
+            "requires_allocation": False
+        }
+    ]
+
+    return all_combinations
+
+
+def combo_priority(combo: Dict, initial_odds: Dict[BetType, float]) -> float:
+    """Calcula a prioridade com base em regras estratégicas revisadas"""
+    priority = 0.0
+    
+    # 1. Mapear as odds da combinação
+    combo_odds = {}
+    for bet_type, odd in zip(combo['bets'], combo['odds']):
+        combo_odds[bet_type] = initial_odds.get(bet_type, odd)
+    
+    # 2. Prioridade base para todas as combinações
+    priority += 0.3  # Valor base para qualquer combinação
+    
+    # 3. Regra principal: Favorito vs Dupla Chance
+    if BetType.DOUBLE_CHANCE_UNDERDOG in combo_odds and BetType.WINNER in combo_odds:
+        odd_dc = combo_odds[BetType.DOUBLE_CHANCE_UNDERDOG]
+        odd_fav = combo_odds[BetType.WINNER]
+        
+        # Se odd do favorito for maior, prioriza FAVORITO
+        if odd_fav > odd_dc:
+            priority += 0.4  # Prioridade para combinações com favorito
+        else:
+            priority += 0.2  # Prioridade moderada para Dupla Chance
+    
+    # 4. Ajuste para combinações defensivas (Under 2.5)
+    if BetType.UNDER_25 in combo_odds:
+        odd_under = combo_odds[BetType.UNDER_25]
+        if odd_under > 2.0:
+            priority += 0.3  # Prioridade média quando odd alta
+        else:
+            priority += 0.1  # Prioridade baixa
+    
+    # 5. Ajuste para combinações ofensivas (Over 1.5 FH)
+    if BetType.OVER_15_FH in combo_odds:
+        odd_over = combo_odds[BetType.OVER_15_FH]
+        if odd_over < 2.0:
+            priority += 0.25  # Prioridade quando odd baixa
+    
+    return min(priority, 1.0)  # Limite máximo
+
+
+def combo_weights(combos: List[Dict], initial_odds: Dict[BetType, float],
+                  initial_bets: Dict[BetType, QuantumBet]) -> List[float]:
+    """Calcula pesos com distribuição mais equilibrada"""
+    weights = []
+    
+    # 1. Calcular prioridades base
+    priorities = [combo_priority(c, initial_odds) for c in combos]
+    
+    # 2. Calcular valor investido inicialmente (com fallback)
+    invested = []
+    
+    for combo in combos:
+        total = sum(
+            initial_bets[bt].amount 
+            for bt in combo['bets'] 
+            if bt in initial_bets
+        )
+        invested.append(total if total > 0 else 0.1)  # Evita zero
+    
+    # 3. Fator de ajuste pelas odds (favorece odds menores)
+    odd_factors = []
+    for combo in combos:
+        if len(combo['bets']) >= 2:
+            odd1 = initial_odds.get(combo['bets'][0], combo['odds'][0])
+            odd2 = initial_odds.get(combo['bets'][1], combo['odds'][1])
+            odd_factors.append(1/(odd1 * odd2))  # Inverso do produto
+        else:
+            odd_factors.append(1.0)
+    
+    # Normalização
+    total_priority = sum(priorities) or 1
+    total_invested = sum(invested) or 1
+    total_odd = sum(odd_factors) or 1
+    
+    # Combinação final (50% prioridade, 30% investimento, 20% odds)
+    for p, i, o in zip(priorities, invested, odd_factors):
+        weight = (0.5 * safe_divide(p, total_priority)) + \
+                (0.3 * safe_divide(i, total_invested)) + \
+                (0.2 * safe_divide(o, total_odd))
+        weights.append(weight)
+    
+    # Garantir soma = 1
+    total = sum(weights) or 1
+    return [w/total for w in weights]
+
+
+def multi_bets_capital(capital: float, total_initial: float) -> float:
+    """Capital da Fase 2: 31% do total, limitado ao saldo após as apostas iniciais"""
+    return min(capital * 0.31, capital - total_initial)
+
+
 class MultiBetsModule:
     def __init__(self, system):
         self.system = system
@@ -95,16 +230,6 @@ class MultiBetsModule:
 
     def _get_available_combinations(self):
         initial_bets = st.session_state.portfolio.initial_bets
-        
-        # Dicionário de nomes de apostas (resolve o erro BET_NAMES)
-        BET_NAMES = {
-            BetType.DOUBLE_CHANCE_UNDERDOG: "Dupla Chance Azarão",
-            BetType.OVER_15_MATCH: "1,5 Gols (Partida Inteira)",
-            BetType.UNDER_25: "Under 2.5 Gols",
-            BetType.WINNER: "Vencedor da Partida",
-            BetType.OVER_15_FH: "Mais de 1.5 Gols (1º Tempo)",
-            BetType.BOTH_TO_SCORE: "Ambos Marcam"
-        }
 
         # Verificação adaptativa das apostas obrigatórias
         mandatory_bets = {
@@ -118,54 +243,7 @@ class MultiBetsModule:
                 odd = 2.30 if bet == BetType.DOUBLE_CHANCE_UNDERDOG else 1.70
                 initial_bets[bet] = QuantumBet(bet, 0, odd, 0, 0)
 
-        # Função para obter odds com fallback
-        def get_odd(bet_type, default_odd):
-            return initial_bets[bet_type].odd if bet_type in initial_bets else default_odd
-
-        # Todas combinações possíveis
-        all_combinations = [
-            {
-                "name": "Dupla Chance Azarão + 1,5 Gols (Partida Inteira)",
-                "bets": [BetType.DOUBLE_CHANCE_UNDERDOG, BetType.OVER_15_MATCH],
-                "odds": [
-                    get_odd(BetType.DOUBLE_CHANCE_UNDERDOG, 2.30),
-                    get_odd(BetType.OVER_15_MATCH, 1.70)
-                ],
-                "description": "Proteção do azarão com expectativa de gols",
-                "requires_allocation": True
-            },
-            {
-                "name": "Combo Defensivo",
-                "bets": [BetType.UNDER_25, BetType.WINNER],
-                "odds": [
-                    get_odd(BetType.UNDER_25, 1.90),
-                    get_odd(BetType.WINNER, 1.50)
-                ],
-                "description": "Proteção contra resultados inesperados",
-                "requires_allocation": False
-            },
-            {
-                "name": "Combo de Gols",
-                "bets": [BetType.OVER_15_FH, BetType.BOTH_TO_SCORE],
-                "odds": [
-                    get_odd(BetType.OVER_15_FH, 2.20),
-                    get_odd(BetType.BOTH_TO_SCORE, 1.80)
-                ],
-                "description": "Foco em jogos com alta probabilidade de gols",
-                "requires_allocation": False
-            }
-        ]
-
-        # Filtra combinações disponíveis
-        available_combos = all_combinations
-        
-        # Mostra aviso se alguma combinação foi filtrada
-        if len(available_combos) < len(all_combinations):
-            missing = [combo["name"] for combo in all_combinations 
-                    if combo not in available_combos]
-            st.warning(f"Combinações não disponíveis: {', '.join(missing)} - Aloque valores nas apostas correspondentes")
-
-        return available_combos
+        return available_combinations(initial_bets)
 
     def _render_combo_selection(self, combos):
         """Renderiza a seleção de combinações"""
@@ -182,90 +260,16 @@ class MultiBetsModule:
 
     def _calculate_combo_priority(self, combo):
         """Calcula a prioridade com base em regras estratégicas revisadas"""
-        priority = 0.0
-        initial_odds = st.session_state.initial_odds_state["initial_odds_fixed"]
-        
-        # 1. Mapear as odds da combinação
-        combo_odds = {}
-        for bet_type, odd in zip(combo['bets'], combo['odds']):
-            combo_odds[bet_type] = initial_odds.get(bet_type, odd)
-        
-        # 2. Prioridade base para todas as combinações
-        priority += 0.3  # Valor base para qualquer combinação
-        
-        # 3. Regra principal: Favorito vs Dupla Chance
-        if BetType.DOUBLE_CHANCE_UNDERDOG in combo_odds and BetType.WINNER in combo_odds:
-            odd_dc = combo_odds[BetType.DOUBLE_CHANCE_UNDERDOG]
-            odd_fav = combo_odds[BetType.WINNER]
-            
-            # Se odd do favorito for maior, prioriza FAVORITO
-            if odd_fav > odd_dc:
-                priority += 0.4  # Prioridade para combinações com favorito
-            else:
-                priority += 0.2  # Prioridade moderada para Dupla Chance
-        
-        # 4. Ajuste para combinações defensivas (Under 2.5)
-        if BetType.UNDER_25 in combo_odds:
-            odd_under = combo_odds[BetType.UNDER_25]
-            if odd_under > 2.0:
-                priority += 0.3  # Prioridade média quando odd alta
-            else:
-                priority += 0.1  # Prioridade baixa
-        
-        # 5. Ajuste para combinações ofensivas (Over 1.5 FH)
-        if BetType.OVER_15_FH in combo_odds:
-            odd_over = combo_odds[BetType.OVER_15_FH]
-            if odd_over < 2.0:
-                priority += 0.25  # Prioridade quando odd baixa
-        
-        return min(priority, 1.0)  # Limite máximo
+        return combo_priority(combo, st.session_state.initial_odds_state["initial_odds_fixed"])
 
     def _calculate_combo_weights(self, combos):
         """Calcula pesos com distribuição mais equilibrada"""
-        weights = []
-        initial_odds = st.session_state.initial_odds_state["initial_odds_fixed"]
-        
-        # 1. Calcular prioridades base
-        priorities = [self._calculate_combo_priority(c) for c in combos]
-        
-        # 2. Calcular valor investido inicialmente (com fallback)
-        invested = []
         portfolio = getattr(st.session_state, 'portfolio', None)
-        initial_bets = getattr(portfolio, 'initial_bets', {})
-        
-        for combo in combos:
-            total = sum(
-                initial_bets[bt].amount 
-                for bt in combo['bets'] 
-                if bt in initial_bets
-            )
-            invested.append(total if total > 0 else 0.1)  # Evita zero
-        
-        # 3. Fator de ajuste pelas odds (favorece odds menores)
-        odd_factors = []
-        for combo in combos:
-            if len(combo['bets']) >= 2:
-                odd1 = initial_odds.get(combo['bets'][0], combo['odds'][0])
-                odd2 = initial_odds.get(combo['bets'][1], combo['odds'][1])
-                odd_factors.append(1/(odd1 * odd2))  # Inverso do produto
-            else:
-                odd_factors.append(1.0)
-        
-        # Normalização
-        total_priority = sum(priorities) or 1
-        total_invested = sum(invested) or 1
-        total_odd = sum(odd_factors) or 1
-        
-        # Combinação final (50% prioridade, 30% investimento, 20% odds)
-        for p, i, o in zip(priorities, invested, odd_factors):
-            weight = (0.5 * safe_divide(p, total_priority)) + \
-                    (0.3 * safe_divide(i, total_invested)) + \
-                    (0.2 * safe_divide(o, total_odd))
-            weights.append(weight)
-        
-        # Garantir soma = 1
-        total = sum(weights) or 1
-        return [w/total for w in weights]
+        return combo_weights(
+            combos,
+            st.session_state.initial_odds_state["initial_odds_fixed"],
+            getattr(portfolio, 'initial_bets', {})
+        )
     
     def _render_strategy_analysis(self, combo, current_odds):
         """Mostra a análise com foco na distribuição correta"""
@@ -369,10 +373,7 @@ class MultiBetsModule:
         """Calcula o capital disponível de forma segura"""
         initial_bets = st.session_state.portfolio.initial_bets.values()
         total_initial = sum(b.amount for b in initial_bets) if initial_bets else 0
-        return min(
-            st.session_state.portfolio.capital * 0.31,
-            st.session_state.portfolio.capital - total_initial
-        )
+        return multi_bets_capital(st.session_state.portfolio.capital, total_initial)
 
     def _calculate_combinations(self, capital):
         """Calcula os valores das combinações"""
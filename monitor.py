@@ -0,0 +1,296 @@
+# project/monitor.py
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+import numpy as np
+from config import MatchCondition, QuantumState, MATCH_CONDITION_DTYPE, market_codes, parse_score
+from metrics import METRICS, timed
+from quantum.optimizer import PORTFOLIO_MARKETS
+from recommendations import PortfolioSnapshot, RecommendationEngine, in_play_capital
+
+logger = logging.getLogger(__name__)
+
+# Estados de volatilidade guardados como códigos (índice nesta tupla)
+VOLATILITY_STATES = tuple(state.value for state in QuantumState)
+NO_VOLATILITY = -1
+
+# Time com cartão vermelho (0 = nenhum)
+RED_CARD_TEAMS = (None, 'HOME', 'AWAY')
+
+_PORTFOLIO_CODES = market_codes(PORTFOLIO_MARKETS)
+
+# Capacidade inicial das colunas (dobra quando cheia)
+INITIAL_CAPACITY = 16
+
+# Partidas por tarefa quando o recálculo usa o pool de threads
+REFRESH_CHUNK_SIZE = 32
+
+
+class MatchBoard:
+    """
+    Estado de várias partidas ao vivo em colunas: as condições ficam num único
+    array MATCH_CONDITION_DTYPE e volatilidade, cartão vermelho e versões em
+    arrays paralelos. Cada alteração incrementa a versão da linha; `refresh`
+    recalcula apenas as linhas cuja versão mudou (probabilidades de todas elas
+    numa chamada vetorizada, recomendações em lote) e `changed_rows` indica o
+    que a grade precisa redesenhar.
+    """
+    def __init__(self, default_portfolio: PortfolioSnapshot = None, capacity: int = INITIAL_CAPACITY):
+        # Portfólio das partidas que chegam pelo feed sem terem sido incluídas com `add`
+        self.default_portfolio = default_portfolio or PortfolioSnapshot(100.0, {}, ())
+        self.match_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._allocate(max(1, capacity))
+        self.portfolios: List[PortfolioSnapshot] = []
+        self.initial_invested: List[float] = []
+        self.recommendations: List[List[Dict]] = []
+
+    def _allocate(self, capacity: int):
+        size = len(self.match_ids)
+        old = getattr(self, 'conditions', None)
+
+        def grow(array, dtype, fill):
+            column = np.full(capacity, fill, dtype=dtype)
+            if array is not None:
+                column[:size] = array[:size]
+            return column
+
+        self.conditions = grow(old, MATCH_CONDITION_DTYPE, 0)
+        self.volatility = grow(getattr(self, 'volatility', None), np.int8, 0)
+        self.last_volatility = grow(getattr(self, 'last_volatility', None), np.int8, NO_VOLATILITY)
+        self.red_card_team = grow(getattr(self, 'red_card_team', None), np.int8, 0)
+        self.red_card_minute = grow(getattr(self, 'red_card_minute', None), np.int16, 0)
+        self.finished = grow(getattr(self, 'finished', None), np.bool_, False)
+        self.capital = grow(getattr(self, 'capital', None), np.float64, 0.0)
+        self.probabilities = grow(getattr(self, 'probabilities', None),
+                                  (np.float64, (len(PORTFOLIO_MARKETS),)), 0.0)
+        # Versão do estado, versão já recalculada e versão já desenhada na grade
+        self.version = grow(getattr(self, 'version', None), np.int64, 1)
+        self.computed = grow(getattr(self, 'computed', None), np.int64, 0)
+        self.rendered = grow(getattr(self, 'rendered', None), np.int64, 0)
+
+    def __len__(self):
+        return len(self.match_ids)
+
+    def __contains__(self, match_id: str):
+        return match_id in self._rows
+
+    def row(self, match_id: str) -> int:
+        try:
+            return self._rows[match_id]
+        except KeyError:
+            raise KeyError(f"Partida não monitorada: {match_id}") from None
+
+    # --- Estado ---
+    def add(self, match_id: str, portfolio: PortfolioSnapshot, condition: MatchCondition = None,
+            volatility: str = QuantumState.ESTAVEL.value) -> int:
+        """Inclui a partida (ou troca o portfólio de uma já monitorada); retorna a linha"""
+        if match_id in self._rows:
+            row = self._rows[match_id]
+            self.portfolios[row] = portfolio
+            self.initial_invested[row] = sum(bet.amount for bet in portfolio.initial_bets.values())
+            self.version[row] += 1
+            return row
+
+        row = len(self.match_ids)
+        if row == len(self.version):
+            self._allocate(2 * row)
+        self.match_ids.append(match_id)
+        self._rows[match_id] = row
+        self.portfolios.append(portfolio)
+        self.initial_invested.append(sum(bet.amount for bet in portfolio.initial_bets.values()))
+        self.recommendations.append([])
+        for column in self._columns():
+            column[row] = 0
+        self.conditions[row] = MatchCondition.pack([condition or MatchCondition()])[0]
+        self.volatility[row] = VOLATILITY_STATES.index(QuantumState(volatility).value)
+        self.last_volatility[row] = NO_VOLATILITY
+        self.version[row] = 1
+        return row
+
+    def remove(self, match_id: str):
+        """Remove a partida; a última linha ocupa o lugar da removida"""
+        row = self.row(match_id)
+        del self._rows[match_id]
+        last = len(self.match_ids) - 1
+        if row != last:
+            moved = self.match_ids[last]
+            self.match_ids[row] = moved
+            self._rows[moved] = row
+            for column in self._columns():
+                column[row] = column[last]
+            self.portfolios[row] = self.portfolios[last]
+            self.initial_invested[row] = self.initial_invested[last]
+            self.recommendations[row] = self.recommendations[last]
+            # A linha passa a mostrar outra partida: força o redesenho
+            self.rendered[row] = 0
+        self.match_ids.pop()
+        self.portfolios.pop()
+        self.initial_invested.pop()
+        self.recommendations.pop()
+
+    def _columns(self):
+        return (self.conditions, self.volatility, self.last_volatility, self.red_card_team,
+                self.red_card_minute, self.finished, self.capital, self.probabilities,
+                self.version, self.computed, self.rendered)
+
+    def condition(self, row: int) -> MatchCondition:
+        return MatchCondition.unpack(self.conditions[row:row + 1])[0]
+
+    def update(self, match_id: str, score: str = None, minute: int = None, home_pressure: float = None,
+               away_pressure: float = None, volatility: str = None) -> bool:
+        """Atualiza o estado da partida; retorna True (e incrementa a versão) se algo mudou"""
+        row = self.row(match_id)
+        changed = self._assign(row, score, minute, home_pressure, away_pressure, volatility)
+        if changed:
+            self.version[row] += 1
+        return changed
+
+    def _assign(self, row: int, score: str = None, minute: int = None, home_pressure: float = None,
+                away_pressure: float = None, volatility: str = None) -> bool:
+        """Grava os campos informados na linha sem tocar na versão; retorna True se algo mudou"""
+        current = self.conditions[row]
+        changed = False
+
+        if score is not None:
+            home, away = parse_score(score)
+            if home != current['home_goals'] or away != current['away_goals']:
+                current['home_goals'], current['away_goals'] = home, away
+                changed = True
+        for field, value in (('minute', minute), ('home_pressure', home_pressure), ('away_pressure', away_pressure)):
+            if value is not None and float(value) != current[field]:
+                current[field] = value
+                changed = True
+        if volatility is not None:
+            code = VOLATILITY_STATES.index(QuantumState(volatility).value)
+            if code != self.volatility[row]:
+                self.last_volatility[row] = self.volatility[row]
+                self.volatility[row] = code
+                changed = True
+        return changed
+
+    def apply(self, event: Dict) -> bool:
+        """Aplica um evento do feed ao vivo (mesmo formato de live_feed.parse_event)"""
+        match_id = event['match_id']
+        if match_id not in self._rows:
+            self.add(match_id, self.default_portfolio)
+        row = self._rows[match_id]
+        current = self.conditions[row]
+        minute = event.get('minute')
+        # Campos gravados sem versionar: a versão sobe uma única vez ao final do evento
+        changed = self._assign(row, minute=minute if minute is not None and minute > current['minute'] else None)
+
+        kind = event['event']
+        if kind == 'goal':
+            home = str(event.get('team', '')).lower() == 'home'
+            current['home_goals' if home else 'away_goals'] += 1
+            changed = True
+        elif kind in ('pressure', 'volatility'):
+            changed |= self._assign(row, home_pressure=event.get('home_pressure'),
+                                    away_pressure=event.get('away_pressure'), volatility=event.get('volatility'))
+        elif kind == 'red_card' and self.red_card_team[row] == 0:
+            self.red_card_team[row] = 1 if str(event.get('team', '')).lower() == 'home' else 2
+            self.red_card_minute[row] = event.get('minute', int(current['minute']))
+            changed = True
+        elif kind == 'full_time' and not self.finished[row]:
+            self.finished[row] = True
+            changed = True
+
+        if changed:
+            self.version[row] += 1
+        return changed
+
+    # --- Recálculo ---
+    def dirty_rows(self) -> np.ndarray:
+        """Linhas com estado alterado desde o último recálculo"""
+        n = len(self.match_ids)
+        return np.flatnonzero(self.version[:n] != self.computed[:n])
+
+    @timed()
+    def refresh(self, engine: RecommendationEngine, workers: int = 0) -> np.ndarray:
+        """
+        Recalcula as linhas alteradas: probabilidades dos mercados do portfólio
+        de todas elas numa única chamada vetorizada e recomendações em lote
+        (em blocos de REFRESH_CHUNK_SIZE num pool de threads se workers > 1).
+        Retorna as linhas recalculadas.
+        """
+        rows = self.dirty_rows()
+        if rows.size == 0:
+            return rows
+
+        packed = self.conditions[rows]
+        self.probabilities[rows] = engine.optimizer.estimate_contextual_probability_batch(
+            _PORTFOLIO_CODES[None, :],
+            packed['home_goals'][:, None], packed['away_goals'][:, None], packed['minute'][:, None],
+            packed['home_pressure'][:, None], packed['away_pressure'][:, None]
+        )
+
+        conditions = MatchCondition.unpack(packed)
+        jobs = list(zip(rows.tolist(), conditions))
+        if workers > 1 and len(jobs) > REFRESH_CHUNK_SIZE:
+            chunks = [jobs[i:i + REFRESH_CHUNK_SIZE] for i in range(0, len(jobs), REFRESH_CHUNK_SIZE)]
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = [r for chunk in pool.map(lambda c: self._recommend_chunk(engine, c), chunks) for r in chunk]
+        else:
+            results = self._recommend_chunk(engine, jobs)
+
+        for (row, _), (capital, recommendations) in zip(jobs, results):
+            self.capital[row] = capital
+            self.recommendations[row] = recommendations
+        # A volatilidade anterior só vale para a primeira avaliação após a mudança
+        self.last_volatility[rows] = NO_VOLATILITY
+        self.computed[rows] = self.version[rows]
+        METRICS.count('monitor.refreshed_rows', int(rows.size))
+        return rows
+
+    def _recommend_chunk(self, engine: RecommendationEngine, jobs) -> List[tuple]:
+        results = []
+        for row, condition in jobs:
+            portfolio = self.portfolios[row]
+            capital = in_play_capital(portfolio.capital, self.initial_invested[row],
+                                      len(portfolio.multi_bets), condition.minute)
+            red_team = RED_CARD_TEAMS[self.red_card_team[row]]
+            last = self.last_volatility[row]
+            try:
+                recommendations = engine.recommend(
+                    portfolio, condition, QuantumState(VOLATILITY_STATES[self.volatility[row]]), capital,
+                    red_card_event={'minute': int(self.red_card_minute[row]), 'team': red_team} if red_team else None,
+                    last_volatility=VOLATILITY_STATES[last] if last != NO_VOLATILITY else None
+                )
+            except Exception as e:
+                logger.error(f"Erro ao recalcular a partida {self.match_ids[row]}: {e}")
+                recommendations = []
+            results.append((capital, recommendations))
+        return results
+
+    # --- Grade ---
+    def changed_rows(self) -> np.ndarray:
+        """Linhas recalculadas que a grade ainda não desenhou nessa versão"""
+        n = len(self.match_ids)
+        return np.flatnonzero(self.computed[:n] != self.rendered[:n])
+
+    def mark_rendered(self, rows: Iterable[int]):
+        rows = np.asarray(list(rows) if not isinstance(rows, np.ndarray) else rows, dtype=np.int64)
+        self.rendered[rows] = self.computed[rows]
+
+    def summary(self, row: int) -> Dict:
+        """Resumo compacto da linha para a grade do monitor"""
+        condition = self.conditions[row]
+        recommendations = self.recommendations[row]
+        best = max(recommendations, key=lambda r: r['ev'], default=None)
+        red_team = RED_CARD_TEAMS[self.red_card_team[row]]
+        return {
+            'match_id': self.match_ids[row],
+            'score': f"{int(condition['home_goals'])}-{int(condition['away_goals'])}",
+            'minute': int(condition['minute']),
+            'home_pressure': float(condition['home_pressure']),
+            'away_pressure': float(condition['away_pressure']),
+            'volatility': VOLATILITY_STATES[self.volatility[row]],
+            'red_card': red_team,
+            'finished': bool(self.finished[row]),
+            'capital': float(self.capital[row]),
+            'probabilities': dict(zip(PORTFOLIO_MARKETS, self.probabilities[row].tolist())),
+            'recommendations': len(recommendations),
+            'stake': sum(r['stake'] for r in recommendations),
+            'best': best
+        }
@@ -0,0 +1,356 @@
+# project/persistence.py
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Mapping, Optional
+import numpy as np
+from config import BetPortfolio, BetType, QuantumBet, QuantumState
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Estado da sessão que sobrevive a um refresh do navegador ou reinício do servidor
+SNAPSHOT_KEYS = (
+    'portfolio',
+    'current_phase',
+    'initial_odds_state',
+    'initial_odds_confirmed',
+    'multi_bets_state',
+    'multi_bets_confirmed',
+    'in_play_state',
+    'in_play_confirmed',
+    'red_card_event'
+)
+
+# Diretório dos snapshots (sobrescrito por FLUX_SESSION_DIR)
+DEFAULT_SESSION_DIR = os.environ.get(
+    'FLUX_SESSION_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sessions')
+)
+
+# Gravação adiada: espera `AUTOSAVE_DELAY` s sem alterações, mas nunca mais que `AUTOSAVE_MAX_DELAY` s
+AUTOSAVE_DELAY = 0.5
+AUTOSAVE_MAX_DELAY = 5.0
+
+# Formato: cabeçalho (SNAPSHOT_MAGIC, versão, crc32 e tamanho do corpo) + corpo codificado.
+# Incrementar SNAPSHOT_VERSION quando a codificação de algum tipo mudar.
+SNAPSHOT_MAGIC = b'FLUXSNAP'
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct('<8sHII')
+
+# Enums gravados pelo nome do membro (a ordem das declarações pode mudar entre versões)
+_ENUMS = (BetType, QuantumState)
+
+# Marcadores de tipo do corpo
+_NONE, _TRUE, _FALSE, _INT, _FLOAT, _STR, _REF, _BYTES = b'NTFidsrb'
+_LIST, _TUPLE, _DICT, _ENUM, _BET, _PORTFOLIO, _ARRAY = b'ltmeqpa'
+_DOUBLE = struct.Struct('<d')
+_BET_FIELDS = struct.Struct('<dddd')
+
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+class _Encoder:
+    """Codificação por marcadores; textos repetidos (chaves, nomes de mercado) viram referências"""
+    def __init__(self):
+        self.out = bytearray()
+        self.strings: Dict[str, int] = {}
+
+    def string(self, value: str):
+        out = self.out
+        ref = self.strings.get(value)
+        if ref is not None:
+            out.append(_REF)
+            _write_varint(out, ref)
+            return
+        self.strings[value] = len(self.strings)
+        encoded = value.encode('utf-8')
+        out.append(_STR)
+        _write_varint(out, len(encoded))
+        out += encoded
+
+    def value(self, value):
+        out = self.out
+        if value is None:
+            out.append(_NONE)
+        elif value is True or value is False or isinstance(value, np.bool_):
+            out.append(_TRUE if value else _FALSE)
+        elif isinstance(value, _ENUMS):
+            out.append(_ENUM)
+            out.append(_ENUMS.index(type(value)))
+            self.string(value.name)
+        elif isinstance(value, (int, np.integer)):
+            value = int(value)
+            if not -2**63 <= value < 2**63:
+                raise ValueError(f"Inteiro fora do intervalo de 64 bits no snapshot: {value}")
+            out.append(_INT)
+            _write_varint(out, (value << 1) ^ (value >> 63))  # zigzag: negativos pequenos ficam curtos
+        elif isinstance(value, (float, np.floating)):
+            out.append(_FLOAT)
+            out += _DOUBLE.pack(value)
+        elif isinstance(value, str):
+            self.string(value)
+        elif isinstance(value, QuantumBet):
+            out.append(_BET)
+            self.value(value.bet_type)
+            out += _BET_FIELDS.pack(value.amount, value.odd, value.probability, value.ev)
+        elif isinstance(value, BetPortfolio):
+            out.append(_PORTFOLIO)
+            out += _DOUBLE.pack(value.capital)
+            self.value(value.initial_bets)
+            self.value(value.multi_bets)
+            self.value(value.in_play_bets)
+        elif isinstance(value, (bytes, bytearray)):
+            out.append(_BYTES)
+            _write_varint(out, len(value))
+            out += value
+        elif isinstance(value, dict):
+            out.append(_DICT)
+            _write_varint(out, len(value))
+            for key, item in value.items():
+                self.value(key)
+                self.value(item)
+        elif isinstance(value, (list, tuple)):
+            out.append(_LIST if isinstance(value, list) else _TUPLE)
+            _write_varint(out, len(value))
+            for item in value:
+                self.value(item)
+        elif isinstance(value, np.ndarray) and not value.dtype.hasobject:
+            out.append(_ARRAY)
+            self.string(value.dtype.str)
+            _write_varint(out, value.ndim)
+            for dim in value.shape:
+                _write_varint(out, dim)
+            data = np.ascontiguousarray(value).tobytes()
+            _write_varint(out, len(data))
+            out += data
+        else:
+            raise ValueError(f"Tipo não suportado no snapshot: {type(value).__name__}")
+
+
+class _Decoder:
+    def __init__(self, data: memoryview):
+        self.data = data
+        self.offset = 0
+        self.strings = []
+
+    def varint(self) -> int:
+        data, offset = self.data, self.offset
+        result = shift = 0
+        while True:
+            byte = data[offset]
+            offset += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        self.offset = offset
+        return result
+
+    def raw(self, size: int) -> memoryview:
+        start = self.offset
+        end = self.offset = start + size
+        if end > len(self.data):
+            raise ValueError("Snapshot truncado")
+        return self.data[start:end]
+
+    def value(self):
+        tag = self.data[self.offset]
+        self.offset += 1
+        if tag == _NONE:
+            return None
+        if tag == _TRUE:
+            return True
+        if tag == _FALSE:
+            return False
+        if tag == _INT:
+            encoded = self.varint()
+            return (encoded >> 1) ^ -(encoded & 1)
+        if tag == _FLOAT:
+            return _DOUBLE.unpack(self.raw(_DOUBLE.size))[0]
+        if tag == _STR:
+            value = str(self.raw(self.varint()), 'utf-8')
+            self.strings.append(value)
+            return value
+        if tag == _REF:
+            return self.strings[self.varint()]
+        if tag == _ENUM:
+            enum = _ENUMS[self.raw(1)[0]]
+            return enum[self.value()]
+        if tag == _BET:
+            bet_type = self.value()
+            return QuantumBet(bet_type, *_BET_FIELDS.unpack(self.raw(_BET_FIELDS.size)))
+        if tag == _PORTFOLIO:
+            capital = _DOUBLE.unpack(self.raw(_DOUBLE.size))[0]
+            return BetPortfolio(capital, self.value(), self.value(), self.value())
+        if tag == _BYTES:
+            return bytes(self.raw(self.varint()))
+        if tag == _DICT:
+            return {self.value(): self.value() for _ in range(self.varint())}
+        if tag == _LIST:
+            return [self.value() for _ in range(self.varint())]
+        if tag == _TUPLE:
+            return tuple(self.value() for _ in range(self.varint()))
+        if tag == _ARRAY:
+            dtype = np.dtype(self.value())
+            shape = tuple(self.varint() for _ in range(self.varint()))
+            return np.frombuffer(self.raw(self.varint()), dtype=dtype).reshape(shape).copy()
+        raise ValueError(f"Marcador desconhecido no snapshot: {tag!r} (offset {self.offset - 1})")
+
+
+def dumps(state: Mapping) -> bytes:
+    """Snapshot binário das chaves SNAPSHOT_KEYS presentes em `state` (ex.: st.session_state)"""
+    encoder = _Encoder()
+    encoder.value({key: state[key] for key in SNAPSHOT_KEYS if key in state})
+    body = encoder.out
+    return _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, zlib.crc32(body), len(body)) + body
+
+
+def loads(data: bytes) -> Dict:
+    """Estado salvo por `dumps`; ValueError se o snapshot for de outra versão ou estiver corrompido"""
+    data = memoryview(data)
+    if len(data) < _HEADER.size:
+        raise ValueError("Snapshot vazio ou truncado")
+    magic, version, crc, size = _HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("Arquivo não é um snapshot de sessão")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Versão de snapshot não suportada: {version}")
+    body = data[_HEADER.size:]
+    if len(body) != size or zlib.crc32(body) != crc:
+        raise ValueError("Snapshot corrompido (tamanho ou crc32 não conferem)")
+    try:
+        return _Decoder(body).value()
+    except (IndexError, KeyError, struct.error) as e:
+        raise ValueError(f"Snapshot inválido: {e}") from None
+
+
+def session_path(session_id: str, directory: str = None) -> str:
+    if not session_id.isalnum():
+        raise ValueError(f"Identificador de sessão inválido: {session_id!r}")
+    return os.path.join(directory or DEFAULT_SESSION_DIR, f"{session_id}.flux")
+
+
+def write_snapshot(path: str, data: bytes):
+    """Grava de forma atômica (arquivo temporário + fsync + rename)"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def restore(path: str) -> Optional[Dict]:
+    """Estado salvo em `path` (None se não existe ou não pode ser lido)"""
+    start = time.perf_counter_ns()
+    try:
+        with open(path, 'rb') as f:
+            state = loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Snapshot ignorado ({path}): {e}")
+        return None
+    if METRICS.enabled:
+        METRICS.observe('persistence.restore', time.perf_counter_ns() - start)
+    return state
+
+
+class AutoSaver:
+    """
+    Gravação dos snapshots em segundo plano. `schedule` só guarda os bytes
+    mais recentes de cada arquivo; uma thread única grava cada arquivo depois
+    de AUTOSAVE_DELAY s sem novas alterações (ou AUTOSAVE_MAX_DELAY s desde a
+    primeira pendente). Snapshots idênticos ao último gravado são ignorados.
+    """
+    def __init__(self, delay: float = AUTOSAVE_DELAY, max_delay: float = AUTOSAVE_MAX_DELAY):
+        if delay < 0 or max_delay < delay:
+            raise ValueError("Requer 0 <= delay <= max_delay")
+        self.delay = delay
+        self.max_delay = max_delay
+        self._pending: Dict[str, tuple] = {}  # path -> (bytes, primeira alteração, última alteração)
+        self._saved: Dict[str, int] = {}      # path -> crc32 do último snapshot gravado
+        self._lock = threading.Condition()
+        # Retirar da fila e gravar sob o mesmo lock: um snapshot antigo nunca sobrescreve um novo
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self.writes = 0
+
+    def schedule(self, path: str, data: bytes) -> bool:
+        """Agenda a gravação; retorna False se o snapshot é igual ao já gravado"""
+        crc = zlib.crc32(data)
+        with self._lock:
+            if path not in self._pending and self._saved.get(path) == crc:
+                return False
+            now = time.monotonic()
+            first = self._pending[path][1] if path in self._pending else now
+            self._pending[path] = (data, first, now)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='session-autosave', daemon=True)
+                self._thread.start()
+            self._lock.notify()
+        return True
+
+    def _due(self, now: float):
+        """Arquivos prontos para gravar e o tempo até o próximo ficar pronto"""
+        due, wait = [], None
+        for path, (_, first, last) in self._pending.items():
+            ready_at = min(last + self.delay, first + self.max_delay)
+            if ready_at <= now:
+                due.append(path)
+            else:
+                wait = ready_at - now if wait is None else min(wait, ready_at - now)
+        return due, wait
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while True:
+                    due, wait = self._due(time.monotonic())
+                    if due or not self._pending:
+                        break
+                    self._lock.wait(wait)
+                if not due:
+                    self._thread = None
+                    return
+            with self._write_lock:
+                with self._lock:
+                    batch = [(path, self._pending.pop(path)[0]) for path in due if path in self._pending]
+                for path, data in batch:
+                    self._write(path, data)
+
+    def _write(self, path: str, data: bytes):
+        start = time.perf_counter_ns()
+        try:
+            write_snapshot(path, data)
+        except OSError as e:
+            logger.error(f"Falha ao salvar a sessão em {path}: {e}")
+            return
+        with self._lock:
+            self._saved[path] = zlib.crc32(data)
+            self.writes += 1
+        if METRICS.enabled:
+            METRICS.observe('persistence.write', time.perf_counter_ns() - start)
+
+    def flush(self):
+        """Grava imediatamente tudo o que estiver pendente (testes e encerramento)"""
+        with self._write_lock:
+            with self._lock:
+                batch = [(path, entry[0]) for path, entry in self._pending.items()]
+                self._pending.clear()
+            for path, data in batch:
+                self._write(path, data)
+
+
+# Thread de gravação única para todas as sessões do processo
+AUTOSAVER = AutoSaver()
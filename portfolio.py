@@ -0,0 +1,306 @@
+# project/portfolio.py
+import numpy as np
+from typing import Dict, Iterator, List, Sequence
+from config import BetType, QuantumBet, BetPortfolio, BET_TYPES, BET_TYPE_INDEX
+
+# Fases do fluxo 60/31/9
+PHASE_INITIAL, PHASE_MULTI, PHASE_IN_PLAY = 0, 1, 2
+PHASES = {
+    'initial': PHASE_INITIAL,
+    'multi': PHASE_MULTI,
+    'in_play': PHASE_IN_PLAY
+}
+
+# Mercado das posições múltiplas (as pernas ficam na tabela de pernas)
+COMBO_MARKET = -1
+
+# Colunas do PortfolioStore (nome, dtype): posições e pernas das múltiplas
+POSITION_COLUMNS = (
+    ('market', np.int16),
+    ('amount', np.float64),
+    ('odd', np.float64),
+    ('probability', np.float64),
+    ('ev', np.float64),
+    ('phase', np.int8),
+    ('fixture', np.int32)
+)
+LEG_COLUMNS = (
+    ('leg_position', np.int32),
+    ('leg_market', np.int16),
+    ('leg_odd', np.float64)
+)
+
+
+class QuantumBetView:
+    """
+    Visão de uma linha do PortfolioStore com a mesma interface de QuantumBet.
+    Leituras e escritas vão direto para as colunas do armazenamento.
+    """
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store: 'PortfolioStore', index: int):
+        self._store = store
+        self._index = index
+
+    @property
+    def bet_type(self):
+        market = int(self._store.market[self._index])
+        return None if market == COMBO_MARKET else BET_TYPES[market]
+
+    @property
+    def legs(self) -> List[BetType]:
+        """Mercados da posição (um único para apostas simples)"""
+        market = int(self._store.market[self._index])
+        if market != COMBO_MARKET:
+            return [BET_TYPES[market]]
+        return [BET_TYPES[m] for m in self._store.legs_of(self._index)]
+
+    @property
+    def amount(self) -> float:
+        return float(self._store.amount[self._index])
+
+    @amount.setter
+    def amount(self, value: float):
+        self._store.amount[self._index] = value
+
+    @property
+    def odd(self) -> float:
+        return float(self._store.odd[self._index])
+
+    @odd.setter
+    def odd(self, value: float):
+        self._store.odd[self._index] = value
+
+    @property
+    def probability(self) -> float:
+        return float(self._store.probability[self._index])
+
+    @probability.setter
+    def probability(self, value: float):
+        self._store.probability[self._index] = value
+
+    @property
+    def ev(self) -> float:
+        return float(self._store.ev[self._index])
+
+    @ev.setter
+    def ev(self, value: float):
+        self._store.ev[self._index] = value
+
+    @property
+    def phase(self) -> int:
+        return int(self._store.phase[self._index])
+
+    @property
+    def fixture(self) -> int:
+        return int(self._store.fixture[self._index])
+
+    def to_bet(self) -> QuantumBet:
+        """Materializa um QuantumBet independente (apenas apostas simples)"""
+        return QuantumBet(self.bet_type, self.amount, self.odd, self.probability, self.ev)
+
+    def __repr__(self):
+        name = self.bet_type.name if self.bet_type else '+'.join(bt.name for bt in self.legs)
+        return f"QuantumBetView({name}, amount={self.amount:.2f}, odd={self.odd:.2f})"
+
+
+class PortfolioStore:
+    """
+    Armazenamento colunar de posições (NumPy) para bankrolls com milhares de apostas
+    em várias partidas. Cada posição ocupa ~40 bytes nas colunas
+    (mercado, valor, odd, probabilidade, EV, fase, partida); as pernas das múltiplas
+    ficam numa tabela separada. Os agregados são operações vetorizadas.
+    """
+    def __init__(self, capacity: int = 64):
+        self._size = 0
+        self._legs_size = 0
+        self._allocate(max(capacity, 1), max(capacity, 1))
+
+    def _allocate(self, capacity: int, legs_capacity: int):
+        def grow(name, dtype, size, used):
+            new = np.zeros(size, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                new[:used] = old[:used]
+            setattr(self, name, new)
+
+        for name, dtype in POSITION_COLUMNS:
+            grow('_' + name, dtype, capacity, self._size)
+        for name, dtype in LEG_COLUMNS:
+            grow('_' + name, dtype, legs_capacity, self._legs_size)
+
+    def _reserve(self, positions: int = 1, legs: int = 0):
+        capacity = len(self._market)
+        legs_capacity = len(self._leg_market)
+        if self._size + positions > capacity or self._legs_size + legs > legs_capacity:
+            self._allocate(
+                max(capacity * 2, self._size + positions),
+                max(legs_capacity * 2, self._legs_size + legs)
+            )
+
+    # --- Colunas (somente as linhas ocupadas) ---
+    market = property(lambda self: self._market[:self._size])
+    amount = property(lambda self: self._amount[:self._size])
+    odd = property(lambda self: self._odd[:self._size])
+    probability = property(lambda self: self._probability[:self._size])
+    ev = property(lambda self: self._ev[:self._size])
+    phase = property(lambda self: self._phase[:self._size])
+    fixture = property(lambda self: self._fixture[:self._size])
+    leg_position = property(lambda self: self._leg_position[:self._legs_size])
+    leg_market = property(lambda self: self._leg_market[:self._legs_size])
+    leg_odd = property(lambda self: self._leg_odd[:self._legs_size])
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelas colunas (incluindo a capacidade reservada)"""
+        return sum(getattr(self, '_' + name).nbytes for name, _ in POSITION_COLUMNS + LEG_COLUMNS)
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray]) -> 'PortfolioStore':
+        """
+        Armazenamento com cópia das colunas dadas (nomes de POSITION_COLUMNS e
+        LEG_COLUMNS, mesmo tamanho dentro de cada grupo), sem passar por `add`.
+        """
+        size = len(columns['market'])
+        legs_size = len(columns['leg_market'])
+        store = cls(capacity=max(size, legs_size))
+        for group, used in ((POSITION_COLUMNS, size), (LEG_COLUMNS, legs_size)):
+            for name, _ in group:
+                values = columns[name]
+                if len(values) != used:
+                    raise ValueError(f"Coluna '{name}' com {len(values)} linhas (esperado {used})")
+                getattr(store, '_' + name)[:used] = values
+        store._size = size
+        store._legs_size = legs_size
+        return store
+
+    def add(self, bet_type: BetType, amount: float, odd: float, probability: float = 0.0,
+            ev: float = 0.0, phase: str = 'initial', fixture: int = 0) -> int:
+        """Adiciona uma aposta simples e retorna o índice da posição"""
+        self._reserve(1)
+        i = self._size
+        self._market[i] = BET_TYPE_INDEX[bet_type]
+        self._amount[i] = amount
+        self._odd[i] = odd
+        self._probability[i] = probability
+        self._ev[i] = ev
+        self._phase[i] = PHASES[phase]
+        self._fixture[i] = fixture
+        self._size += 1
+        return i
+
+    def add_combo(self, bet_types: Sequence[BetType], odds: Sequence[float], amount: float,
+                  probability: float = 0.0, ev: float = 0.0, phase: str = 'multi', fixture: int = 0) -> int:
+        """Adiciona uma múltipla (odd combinada = produto das pernas)"""
+        self._reserve(1, len(bet_types))
+        i = self._size
+        self._market[i] = COMBO_MARKET
+        self._amount[i] = amount
+        self._odd[i] = float(np.prod(odds))
+        self._probability[i] = probability
+        self._ev[i] = ev
+        self._phase[i] = PHASES[phase]
+        self._fixture[i] = fixture
+
+        start, end = self._legs_size, self._legs_size + len(bet_types)
+        self._leg_position[start:end] = i
+        self._leg_market[start:end] = [BET_TYPE_INDEX[bt] for bt in bet_types]
+        self._leg_odd[start:end] = odds
+        self._legs_size = end
+        self._size += 1
+        return i
+
+    def legs_of(self, index: int) -> np.ndarray:
+        """Índices de mercado das pernas de uma múltipla"""
+        return self.leg_market[self.leg_position == index]
+
+    def view(self, index: int) -> QuantumBetView:
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        return QuantumBetView(self, index)
+
+    def views(self, phase: str = None, fixture: int = None) -> Iterator[QuantumBetView]:
+        """Visões QuantumBet das posições filtradas"""
+        for index in np.flatnonzero(self._mask(phase, fixture)):
+            yield QuantumBetView(self, int(index))
+
+    def _mask(self, phase: str = None, fixture: int = None) -> np.ndarray:
+        mask = np.ones(self._size, dtype=bool)
+        if phase is not None:
+            mask &= self.phase == PHASES[phase]
+        if fixture is not None:
+            mask &= self.fixture == fixture
+        return mask
+
+    # --- Agregados vetorizados ---
+    def total_amount(self, phase: str = None, fixture: int = None) -> float:
+        return float(self.amount[self._mask(phase, fixture)].sum())
+
+    def total_ev(self, phase: str = None, fixture: int = None) -> float:
+        return float(self.ev[self._mask(phase, fixture)].sum())
+
+    def potential_return(self, phase: str = None, fixture: int = None) -> float:
+        mask = self._mask(phase, fixture)
+        return float((self.amount[mask] * self.odd[mask]).sum())
+
+    def amount_by_phase(self) -> Dict[str, float]:
+        totals = np.bincount(self.phase, weights=self.amount, minlength=len(PHASES))
+        return {name: float(totals[code]) for name, code in PHASES.items()}
+
+    def exposure_by_market(self, fixture: int = None) -> Dict[BetType, float]:
+        """Valor apostado por mercado (apostas simples; múltiplas contam em cada perna)"""
+        mask = self._mask(fixture=fixture)
+        single = mask & (self.market != COMBO_MARKET)
+        totals = np.bincount(self.market[single], weights=self.amount[single], minlength=len(BET_TYPES))
+        if self._legs_size:
+            in_scope = mask[self.leg_position]
+            totals += np.bincount(self.leg_market[in_scope],
+                                  weights=self.amount[self.leg_position[in_scope]],
+                                  minlength=len(BET_TYPES))
+        return {BET_TYPES[i]: float(v) for i, v in enumerate(totals) if v}
+
+    # --- Conversão de/para BetPortfolio ---
+    @classmethod
+    def from_portfolio(cls, portfolio: BetPortfolio, fixture: int = 0,
+                       multi_amounts: Sequence[float] = None) -> 'PortfolioStore':
+        store = cls(capacity=len(portfolio.initial_bets) + len(portfolio.multi_bets or []) +
+                    len(portfolio.in_play_bets))
+        store.extend_from_portfolio(portfolio, fixture, multi_amounts)
+        return store
+
+    def extend_from_portfolio(self, portfolio: BetPortfolio, fixture: int = 0,
+                              multi_amounts: Sequence[float] = None):
+        """
+        Copia as posições de um BetPortfolio. As múltiplas usam 'amount' do combo
+        ou `multi_amounts` (valores calculados na Fase 2); sem nenhum deles, valor zero.
+        """
+        for phase, bets in (('initial', portfolio.initial_bets), ('in_play', portfolio.in_play_bets)):
+            for bet_type, bet in bets.items():
+                self.add(bet_type, bet.amount, bet.odd, bet.probability, bet.ev, phase, fixture)
+
+        for i, combo in enumerate(portfolio.multi_bets or []):
+            amount = combo.get('amount')
+            if amount is None:
+                amount = multi_amounts[i] if multi_amounts is not None and i < len(multi_amounts) else 0.0
+            self.add_combo(combo['bets'], combo['odds'], amount, fixture=fixture)
+
+    def to_portfolio(self, capital: float, fixture: int = 0) -> BetPortfolio:
+        """Reconstrói o BetPortfolio de uma partida"""
+        portfolio = BetPortfolio(capital=capital)
+        for view in self.views(fixture=fixture):
+            if view.phase == PHASE_MULTI:
+                legs = self.leg_position == view._index
+                portfolio.multi_bets.append({
+                    'name': ' + '.join(bt.value for bt in view.legs),
+                    'bets': view.legs,
+                    'odds': [float(o) for o in self.leg_odd[legs]],
+                    'amount': view.amount
+                })
+            elif view.phase == PHASE_IN_PLAY:
+                portfolio.in_play_bets[view.bet_type] = view.to_bet()
+            else:
+                portfolio.initial_bets[view.bet_type] = view.to_bet()
+        return portfolio
@@ -0,0 +1,136 @@
+# flux_on/project/quantum/cache.py
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable
+
+
+class ProbabilityCache:
+    """
+    Cache LRU de probabilidades contextuais, compartilhado entre sessões e módulos.
+    A chave é o estado quantizado (bet_type, gols, minuto, pressões): durante o
+    monitoramento ao vivo os mesmos estados são consultados repetidamente.
+    """
+    def __init__(self, maxsize: int = 4096, pressure_step: float = 0.01):
+        if maxsize <= 0:
+            raise ValueError("maxsize deve ser positivo")
+        self.maxsize = maxsize
+        self.pressure_step = pressure_step
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def make_key(self, bet_type, home_goals: int, away_goals: int, minute: int,
+                 home_pressure: float, away_pressure: float) -> tuple:
+        """Quantiza o estado da partida (pressões no passo configurado, minuto inteiro)"""
+        return (
+            bet_type,
+            home_goals,
+            away_goals,
+            int(minute),
+            int(round(home_pressure / self.pressure_step)),
+            int(round(away_pressure / self.pressure_step))
+        )
+
+    def dequantize_pressure(self, units: int) -> float:
+        """Converte a pressão quantizada de volta para float (ex.: 57 -> 0.57)"""
+        return round(units * self.pressure_step, 10)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], float]) -> float:
+        """Retorna o valor em cache ou calcula, armazena e aplica a política LRU"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key]
+            self._misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def invalidate(self):
+        """Descarta todas as entradas (ex.: quando os parâmetros históricos mudam)"""
+        with self._lock:
+            self._entries.clear()
+            self._invalidations += 1
+
+    def resize(self, maxsize: int):
+        """Altera o tamanho máximo, despejando as entradas mais antigas se necessário"""
+        if maxsize <= 0:
+            raise ValueError("maxsize deve ser positivo")
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores de acertos, falhas e despejos"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hit_rate': self._hits / lookups if lookups else 0.0
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Instância compartilhada por todo o processo (tamanho configurável via ambiente)
+PROBABILITY_CACHE = ProbabilityCache(maxsize=int(os.environ.get('FLUX_PROBABILITY_CACHE_SIZE', 4096)))
+
+
+class WarmStartCache:
+    """
+    Últimas soluções do otimizador correlacionado por partida (LRU limitado).
+    Fica fora do QuantumOptimizer, que é compartilhado entre sessões: cada
+    sessão (ou worker) mantém a sua instância.
+    """
+    def __init__(self, maxsize: int = 64):
+        if maxsize <= 0:
+            raise ValueError("maxsize deve ser positivo")
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, fixture_id: Hashable):
+        with self._lock:
+            entry = self._entries.get(fixture_id)
+            if entry is not None:
+                self._entries.move_to_end(fixture_id)
+            return entry
+
+    def put(self, fixture_id: Hashable, entry: Dict):
+        with self._lock:
+            self._entries[fixture_id] = entry
+            self._entries.move_to_end(fixture_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self, fixture_id: Hashable = None):
+        """Descarta as soluções guardadas (de uma partida ou de todas)"""
+        with self._lock:
+            if fixture_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(fixture_id, None)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,322 @@
+# flux_on/project/quantum/calibration.py
+
+import argparse
+import copy
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import numpy as np
+from config import BET_TYPES
+from quantum.simulator import settle_market, NEXT_GOAL_NONE, NEXT_GOAL_HOME, NEXT_GOAL_AWAY
+
+PARAMETERS_FORMAT_VERSION = 1
+
+# Arquivo padrão lido pelo otimizador (sobrescrito por FLUX_HISTORICAL_PARAMETERS)
+DEFAULT_PARAMETERS_PATH = os.environ.get(
+    'FLUX_HISTORICAL_PARAMETERS',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'historical_parameters.json')
+)
+
+# Colunas do arquivo de eventos: uma linha por gol e uma linha 'full_time' por partida
+# (garante que partidas 0-0 entrem na amostra). 'half' e 'favourite' são opcionais.
+REQUIRED_COLUMNS = ('match_id', 'league', 'event', 'minute', 'team')
+OPTIONAL_COLUMNS = ('half', 'favourite')
+
+# Minutos em que o estado ao vivo é amostrado para ajustar os parâmetros dependentes do tempo
+STATE_MINUTES = np.arange(0, 90, 5)
+
+
+def historical_data_fingerprint(historical_data: Dict[str, Dict]) -> str:
+    """Hash estável dos parâmetros históricos (detecta superfícies e caches desatualizados)"""
+    payload = json.dumps(historical_data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def read_match_events(path: str):
+    """Lê o histórico de eventos (CSV ou Parquet) e valida as colunas obrigatórias"""
+    import pandas as pd  # Importado só na calibração: o carregamento dos parâmetros não precisa do pandas
+
+    columns = REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+    if path.endswith(('.parquet', '.pq')):
+        events = pd.read_parquet(path)
+    else:
+        events = pd.read_csv(path, usecols=lambda c: c in columns)
+
+    missing = [c for c in REQUIRED_COLUMNS if c not in events.columns]
+    if missing:
+        raise ValueError(f"Colunas ausentes no histórico: {', '.join(missing)}")
+    return events
+
+
+def _empty_statistics(n_leagues: int) -> Dict[str, np.ndarray]:
+    """Estatísticas suficientes por liga (somáveis entre blocos de partidas)"""
+    return {
+        'matches': np.zeros(n_leagues),
+        'wins': np.zeros((n_leagues, len(BET_TYPES))),
+        # Under 2.5: y ≈ base * f(gols) - decay * minuto/90
+        'under_yx': np.zeros(n_leagues),
+        'under_fx': np.zeros(n_leagues),
+        'under_xx': np.zeros(n_leagues),
+        # Over 1.5 1º tempo: y ≈ base + growth * minuto/45
+        'fh_yx': np.zeros(n_leagues),
+        'fh_x': np.zeros(n_leagues),
+        'fh_xx': np.zeros(n_leagues),
+        # Ambas marcam com apenas um time tendo marcado: y ≈ base * momentum
+        'btts_one_n': np.zeros(n_leagues),
+        'btts_one_y': np.zeros(n_leagues)
+    }
+
+
+def _match_statistics(chunk: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Processa um bloco de partidas (roda em processo filho).
+    `chunk` traz arrays de eventos de gol (match, minute, home, first_half) e
+    arrays por partida (league, home_favourite).
+    """
+    n_leagues = chunk['n_leagues']
+    league = chunk['league']
+    n = league.shape[0]
+    match, minute, home = chunk['goal_match'], chunk['goal_minute'], chunk['goal_home']
+    away = ~home
+    first_half = chunk['goal_first_half']
+    stats = _empty_statistics(n_leagues)
+    stats['matches'] += np.bincount(league, minlength=n_leagues)
+
+    # Resultado final e do 1º tempo
+    home_ft = np.bincount(match[home], minlength=n)
+    away_ft = np.bincount(match[away], minlength=n)
+    home_fh = np.bincount(match[home & first_half], minlength=n)
+    away_fh = np.bincount(match[away & first_half], minlength=n)
+
+    # Primeiro gol da partida (estado inicial 0-0)
+    next_goal = np.full(n, NEXT_GOAL_NONE, dtype=np.int8)
+    if match.size:
+        order = np.lexsort((minute, match))
+        first_match, first_index = np.unique(match[order], return_index=True)
+        next_goal[first_match] = np.where(home[order][first_index], NEXT_GOAL_HOME, NEXT_GOAL_AWAY)
+    goal_next_5 = np.bincount(match[minute <= 5], minlength=n) > 0
+
+    zeros = np.zeros(n, dtype=np.int64)
+    outcome = {
+        'start_home': zeros,
+        'start_away': zeros,
+        'home_fh': home_fh,
+        'away_fh': away_fh,
+        'home_ft': home_ft,
+        'away_ft': away_ft,
+        'next_goal': next_goal,
+        'goal_next_5': goal_next_5,
+        'home_favourite': chunk['home_favourite']
+    }
+    for code, bet_type in enumerate(BET_TYPES):
+        stats['wins'][:, code] = np.bincount(league, weights=settle_market(bet_type, outcome), minlength=n_leagues)
+
+    # Placar acumulado em cada minuto da grade (gol no minuto m já conta no estado m)
+    grid = STATE_MINUTES
+    slot = np.searchsorted(grid, minute, side='left')
+    home_by_minute = np.zeros((n, grid.size + 1))
+    away_by_minute = np.zeros((n, grid.size + 1))
+    np.add.at(home_by_minute, (match[home], slot[home]), 1)
+    np.add.at(away_by_minute, (match[away], slot[away]), 1)
+    home_by_minute = np.cumsum(home_by_minute, axis=1)[:, :grid.size]
+    away_by_minute = np.cumsum(away_by_minute, axis=1)[:, :grid.size]
+    total_by_minute = home_by_minute + away_by_minute
+    league_grid = np.broadcast_to(league[:, None], total_by_minute.shape)
+
+    def add(name, mask, weights):
+        stats[name] += np.bincount(league_grid[mask], weights=np.broadcast_to(weights, mask.shape)[mask],
+                                   minlength=n_leagues)
+
+    # Under 2.5 (estados com 0 ou 1 gol, como no caminho escalar)
+    under = (home_ft + away_ft <= 2)[:, None].astype(np.float64)
+    x = grid[None, :] / 90
+    active = total_by_minute <= 1
+    f = np.where(total_by_minute == 0, 1.0, 0.6)
+    add('under_yx', active, under * x)
+    add('under_fx', active, f * x)
+    add('under_xx', active, x * x)
+
+    # Over 1.5 no 1º tempo (estados até o intervalo em que o mercado ainda está aberto)
+    fh_over = (home_fh + away_fh >= 2)[:, None].astype(np.float64)
+    x = grid[None, :] / 45
+    active = (grid[None, :] <= 45) & (total_by_minute < 2)
+    add('fh_yx', active, fh_over * x)
+    add('fh_x', active, x)
+    add('fh_xx', active, x * x)
+
+    # Ambas marcam quando só um time marcou (até os 75', antes do corte do caminho escalar)
+    btts = ((home_ft > 0) & (away_ft > 0))[:, None].astype(np.float64)
+    active = ((home_by_minute > 0) ^ (away_by_minute > 0)) & (grid[None, :] <= 75)
+    add('btts_one_n', active, 1.0)
+    add('btts_one_y', active, btts)
+    return stats
+
+
+def _split_chunks(events, n_chunks: int):
+    """Codifica partidas/ligas e divide os eventos em blocos de partidas inteiras"""
+    match_codes, match_ids = events['match_id'].factorize(sort=False)
+    n_matches = len(match_ids)
+    per_match = events.groupby(match_codes, sort=True).first()
+
+    league_codes, leagues = per_match['league'].astype(str).factorize(sort=True)
+    if 'favourite' in per_match.columns:
+        home_favourite = per_match['favourite'].fillna('home').astype(str).str.lower().to_numpy() != 'away'
+    else:
+        home_favourite = np.ones(n_matches, dtype=bool)
+
+    goals = events['event'].astype(str).str.lower().to_numpy() == 'goal'
+    goal_match = match_codes[goals]
+    goal_minute = events['minute'].to_numpy(dtype=np.float64)[goals]
+    goal_home = events['team'].astype(str).str.lower().to_numpy()[goals] == 'home'
+    if 'half' in events.columns:
+        goal_first_half = events['half'].to_numpy()[goals] == 1
+    else:
+        goal_first_half = goal_minute <= 45
+
+    order = np.argsort(goal_match, kind='stable')
+    goal_match, goal_minute, goal_home, goal_first_half = (
+        goal_match[order], goal_minute[order], goal_home[order], goal_first_half[order]
+    )
+
+    bounds = np.linspace(0, n_matches, max(1, n_chunks) + 1).astype(np.int64)
+    chunks = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if start == end:
+            continue
+        lo, hi = np.searchsorted(goal_match, [start, end])
+        chunks.append({
+            'n_leagues': len(leagues),
+            'league': league_codes[start:end],
+            'home_favourite': home_favourite[start:end],
+            'goal_match': goal_match[lo:hi] - start,
+            'goal_minute': goal_minute[lo:hi],
+            'goal_home': goal_home[lo:hi],
+            'goal_first_half': goal_first_half[lo:hi]
+        })
+    return chunks, [str(league) for league in leagues]
+
+
+def _fit_parameters(stats: Dict[str, np.ndarray]) -> Dict[str, Dict[str, float]]:
+    """Converte estatísticas suficientes (de uma liga ou do total) em parâmetros por mercado"""
+    matches = stats['matches']
+    base = stats['wins'] / matches
+    parameters = {bt.name.lower(): {'base_prob': round(float(base[i]), 6)} for i, bt in enumerate(BET_TYPES)}
+
+    under_base = parameters['under_25']['base_prob']
+    if stats['under_xx'] > 0:
+        # Mínimos quadrados com a base fixa: y - base * f = -decay * x
+        decay = -(stats['under_yx'] - under_base * stats['under_fx']) / stats['under_xx']
+        parameters['under_25']['decay_rate'] = round(float(decay), 6)
+
+    fh_base = parameters['over_15_fh']['base_prob']
+    if stats['fh_xx'] > 0:
+        growth = (stats['fh_yx'] - fh_base * stats['fh_x']) / stats['fh_xx']
+        parameters['over_15_fh']['growth_rate'] = round(float(growth), 6)
+
+    btts_base = parameters['both_to_score']['base_prob']
+    if stats['btts_one_n'] > 0 and btts_base > 0:
+        momentum = (stats['btts_one_y'] / stats['btts_one_n']) / btts_base
+        parameters['both_to_score']['momentum_factor'] = round(float(momentum), 6)
+
+    return parameters
+
+
+def fit_historical_parameters(events, workers: int = None, chunks_per_worker: int = 4,
+                              min_league_matches: int = 200, source: str = None) -> Dict:
+    """
+    Ajusta base_prob (todos os mercados, liquidados como no simulador), decay_rate,
+    growth_rate e momentum_factor, no total e por liga.
+    Cada bloco de partidas gera estatísticas suficientes num processo do pool;
+    a redução é uma soma, então o resultado não depende do número de workers.
+    Ligas com menos de `min_league_matches` partidas usam os parâmetros globais.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks, leagues = _split_chunks(events, workers * chunks_per_worker)
+    if not chunks:
+        raise ValueError("Histórico sem partidas")
+
+    if workers <= 1 or len(chunks) == 1:
+        partials = [_match_statistics(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            partials = list(executor.map(_match_statistics, chunks))
+
+    stats = _empty_statistics(len(leagues))
+    for partial in partials:
+        for name, value in partial.items():
+            stats[name] += value
+
+    markets = _fit_parameters({name: value.sum(axis=0) for name, value in stats.items()})
+    per_league = {}
+    for i, league in enumerate(leagues):
+        if stats['matches'][i] >= min_league_matches:
+            per_league[league] = {
+                'n_matches': int(stats['matches'][i]),
+                'markets': _fit_parameters({name: value[i] for name, value in stats.items()})
+            }
+
+    return {
+        'format_version': PARAMETERS_FORMAT_VERSION,
+        'version': historical_data_fingerprint({'markets': markets, 'leagues': per_league}),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'source': source,
+        'n_matches': int(stats['matches'].sum()),
+        'markets': markets,
+        'leagues': per_league
+    }
+
+
+def write_parameters(parameters: Dict, path: str = DEFAULT_PARAMETERS_PATH) -> str:
+    """Grava o arquivo de parâmetros de forma atômica (leitores nunca veem um arquivo parcial)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(parameters, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_historical_parameters(defaults: Dict[str, Dict], path: str = DEFAULT_PARAMETERS_PATH,
+                               league: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Combina os parâmetros padrão com o arquivo calibrado (global e, se houver, da liga).
+    Sem arquivo, retorna uma cópia dos padrões. Parâmetros não ajustados mantêm o padrão.
+    """
+    historical_data = copy.deepcopy(defaults)
+    if not path or not os.path.exists(path):
+        return historical_data
+
+    with open(path, encoding='utf-8') as f:
+        parameters = json.load(f)
+    if parameters.get('format_version') != PARAMETERS_FORMAT_VERSION:
+        raise ValueError(f"Versão do arquivo de parâmetros incompatível: {parameters.get('format_version')}")
+
+    layers = [parameters.get('markets', {})]
+    if league is not None and league in parameters.get('leagues', {}):
+        layers.append(parameters['leagues'][league]['markets'])
+    for layer in layers:
+        for market, values in layer.items():
+            historical_data.setdefault(market, {}).update(values)
+    return historical_data
+
+
+if __name__ == "__main__":
+    # Uso: python -m quantum.calibration eventos.parquet -o historical_parameters.json --workers 8
+    parser = argparse.ArgumentParser(description="Calibra os parâmetros históricos por mercado e por liga")
+    parser.add_argument("events", help="Histórico de eventos (.csv ou .parquet)")
+    parser.add_argument("-o", "--output", default=DEFAULT_PARAMETERS_PATH, help="Arquivo de parâmetros de saída")
+    parser.add_argument("--workers", type=int, default=None, help="Processos do pool (padrão: núcleos da CPU)")
+    parser.add_argument("--min-league-matches", type=int, default=200,
+                        help="Partidas mínimas para parâmetros próprios de uma liga")
+    args = parser.parse_args()
+
+    result = fit_historical_parameters(
+        read_match_events(args.events),
+        workers=args.workers,
+        min_league_matches=args.min_league_matches,
+        source=os.path.basename(args.events)
+    )
+    write_parameters(result, args.output)
+    print(f"{result['n_matches']} partidas, {len(result['leagues'])} ligas -> {args.output} (versão {result['version']})")
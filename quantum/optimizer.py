@@ -2,22 +2,58 @@
 
 import numpy as np
 import math
-from typing import Dict, List
-from scipy.optimize import minimize
+from typing import Dict, List, NamedTuple
 from collections import defaultdict
-from config import BetType, QuantumState, MatchCondition, HumanBiasProfile
+from config import BetType, QuantumState, MatchCondition, HumanBiasProfile, BET_TYPES, BET_TYPE_INDEX, market_codes
+from quantum.cache import ProbabilityCache, PROBABILITY_CACHE, WarmStartCache
+from quantum.calibration import DEFAULT_PARAMETERS_PATH, historical_data_fingerprint, load_historical_parameters
+from metrics import METRICS, timed
+
+# Colunas da matriz de odds usada por optimize_portfolio_batch (mesma ordem do caminho escalar)
+PORTFOLIO_MARKETS = (
+    BetType.OVER_15_MATCH,
+    BetType.UNDER_25,
+    BetType.BOTH_TO_SCORE,
+    BetType.DOUBLE_CHANCE_UNDERDOG,
+    BetType.OVER_15_FH,
+    BetType.WINNER
+)
+PORTFOLIO_DEFAULT_ODDS = (1.45, 1.52, 2.05, 1.75, 1.95, 2.15)
+
+# Fração de Kelly por estado: mais estável, mais confiança; mais caótico, menos.
+KELLY_RISK_FRACTION = {
+    QuantumState.ESTAVEL: 0.5,   # Meio Kelly
+    QuantumState.TRANSICAO: 0.3, # Um terço de Kelly
+    QuantumState.CAOTICO: 0.1,   # Apenas 10% do Kelly
+}
+
+METRICS.register_collector('probability_cache', PROBABILITY_CACHE.stats)
+
+class CorrelatedAllocation(NamedTuple):
+    """Resultado de optimize_portfolio_correlated: pesos e informações da otimização"""
+    weights: Dict[BetType, float]
+    info: Dict
+
 
 class QuantumOptimizer:
     """
     O motor que traduz o 'Fluxo Matemático' em estratégias de aposta.
     Ele não apenas calcula, mas interpreta os padrões subjacentes do jogo.
     """
-    def __init__(self):
-        self.historical_data = self._load_historical_data()
+    def __init__(self, probability_cache: ProbabilityCache = None,
+                 parameters_path: str = DEFAULT_PARAMETERS_PATH, league: str = None, surface=None):
+        # Parâmetros calibrados carregados sob demanda (primeiro acesso a historical_data)
+        self.parameters_path = parameters_path
+        self.league = league
+        self._historical_data = None
+        self._parameters_fingerprint = None
         self.quantum_factors = self._init_quantum_factors()
+        self.probability_cache = probability_cache if probability_cache is not None else PROBABILITY_CACHE
+        # Superfície pré-calculada (quantum.surface), usada só se gerada com os parâmetros atuais
+        self.surface = surface
 
     def _load_historical_data(self) -> Dict[str, Dict]:
-        """Dados históricos com parâmetros ajustados para todos os tipos de aposta"""
+        """Parâmetros padrão por mercado (sobrescritos pelo arquivo calibrado, quando existe)"""
         return {
             'under_25': {
                 'base_prob': 0.58, 
@@ -46,6 +82,57 @@ class QuantumOptimizer:
             }
         }
 
+    @property
+    def historical_data(self) -> Dict[str, Dict]:
+        """Parâmetros por mercado: padrões combinados com o arquivo calibrado (global e da liga)"""
+        if self._historical_data is None:
+            self._historical_data = load_historical_parameters(
+                self._load_historical_data(), self.parameters_path, self.league
+            )
+            self._parameters_fingerprint = historical_data_fingerprint(self._historical_data)
+        return self._historical_data
+
+    @property
+    def parameters_fingerprint(self) -> str:
+        """Identifica o conjunto de parâmetros em uso (faz parte da chave do cache compartilhado)"""
+        if self._parameters_fingerprint is None:
+            self.historical_data
+        return self._parameters_fingerprint
+
+    def set_historical_data(self, historical_data: Dict[str, Dict]):
+        """Substitui os parâmetros históricos e invalida o cache de probabilidades"""
+        self._historical_data = historical_data
+        self._parameters_fingerprint = historical_data_fingerprint(historical_data)
+        self.probability_cache.invalidate()
+
+    def reload_parameters(self, parameters_path: str = None, league: str = None):
+        """Relê o arquivo calibrado (ex.: após uma nova calibração ou troca de liga); mantém a liga se omitida"""
+        if parameters_path is not None:
+            self.parameters_path = parameters_path
+        if league is not None:
+            self.league = league
+        self._historical_data = None
+        self._parameters_fingerprint = None
+        self.probability_cache.invalidate()
+
+    def attach_surface(self, surface) -> bool:
+        """Passa a consultar a superfície pré-calculada; retorna False se ela não corresponde aos parâmetros"""
+        self.surface = surface
+        return self._active_surface() is not None
+
+    def _active_surface(self):
+        """Superfície anexada, se foi gerada com os parâmetros em uso (senão, cálculo exato)"""
+        surface = self.surface
+        if surface is None or surface.metadata.get('historical_data') != self.parameters_fingerprint:
+            return None
+        return surface
+
+    def update_market_parameters(self, market: str, **params):
+        """Atualiza os parâmetros de um mercado (ex.: 'under_25') e invalida o cache"""
+        self.historical_data.setdefault(market, {'base_prob': 0.5}).update(params)
+        self._parameters_fingerprint = historical_data_fingerprint(self.historical_data)
+        self.probability_cache.invalidate()
+
     def _init_quantum_factors(self) -> Dict[str, float]:
         """
         Fatores que representam constantes fundamentais do 'Fluxo Matemático'.
@@ -59,15 +146,24 @@ class QuantumOptimizer:
             'e': 2.718
         }
 
-    def estimate_contextual_probability(self, bet_type: BetType, condition: MatchCondition) -> float:
+    @timed()
+    def estimate_contextual_probability(self, bet_type: BetType, condition: MatchCondition,
+                                        exact: bool = False) -> float:
         """
         Estima a probabilidade de um evento, ajustando a 'leitura do campo' em tempo real.
         Agora com suporte para os novos tipos de aposta.
+        Com uma superfície compatível anexada, estados dentro da grade são consultados
+        nela (O(1)); exact=True força o cálculo direto.
         """
+        if not exact:
+            surface = self._active_surface()
+            if surface is not None and surface.covers(condition):
+                return surface.lookup(bet_type, condition)
+
         data = self.historical_data.get(bet_type.name.lower(), {'base_prob': 0.5})
         base_prob = data['base_prob']
         
-        home, away = map(int, condition.score.split('-'))
+        home, away = condition.home_goals, condition.away_goals
         total_goals = home + away
         
         prob = base_prob
@@ -97,6 +193,29 @@ class QuantumOptimizer:
 
         return min(0.99, max(0.01, prob))
 
+    @timed()
+    def cached_probability(self, bet_type: BetType, condition: MatchCondition) -> float:
+        """
+        Probabilidade contextual servida pelo cache compartilhado.
+        O estado é quantizado (pressões no passo do cache) antes do cálculo,
+        de forma que o valor armazenado corresponde exatamente à chave.
+        """
+        cache = self.probability_cache
+        key = cache.make_key(bet_type, condition.home_goals, condition.away_goals, condition.minute,
+                             condition.home_pressure, condition.away_pressure) + (self.parameters_fingerprint,)
+
+        def compute():
+            quantized = MatchCondition(
+                home_goals=condition.home_goals,
+                away_goals=condition.away_goals,
+                minute=key[3],
+                home_pressure=cache.dequantize_pressure(key[4]),
+                away_pressure=cache.dequantize_pressure(key[5])
+            )
+            return self.estimate_contextual_probability(bet_type, quantized)
+
+        return cache.get_or_compute(key, compute)
+
     def _calc_underdog_double_chance_prob(self, condition: MatchCondition, current_odd: float = 2.0) -> float:
         """
         Versão atualizada que considera:
@@ -108,7 +227,7 @@ class QuantumOptimizer:
         base_prob = 0.45 * (1.5 / current_odd)  # Fator de redução progressiva
         
         # Aplicação dos ajustes contextuais existentes
-        home, away = map(int, condition.score.split('-'))
+        home, away = condition.home_goals, condition.away_goals
         is_home_underdog = condition.home_pressure < condition.away_pressure
         underdog_winning = (home > away) if is_home_underdog else (away > home)
         is_draw = home == away
@@ -132,8 +251,7 @@ class QuantumOptimizer:
 
     def _calc_over_15_match_prob(self, condition: MatchCondition) -> float:
         """Calcula a probabilidade de mais de 1,5 gols na partida inteira"""
-        home, away = map(int, condition.score.split('-'))
-        total_goals = home + away
+        total_goals = condition.home_goals + condition.away_goals
         
         # Se já tem 2+ gols, probabilidade 100%
         if total_goals >= 2:
@@ -156,7 +274,154 @@ class QuantumOptimizer:
         final_prob = adjusted_prob * (1 - time_decay)
         
         return min(0.95, max(0.05, final_prob))
-    
+
+    @timed()
+    def estimate_contextual_probability_batch(self, bet_types, home_goals, away_goals, minutes,
+                                              home_pressures, away_pressures, exact: bool = False) -> np.ndarray:
+        """
+        Versão vetorizada de estimate_contextual_probability.
+        Recebe arrays (ou escalares, com broadcasting) de tipos de aposta, gols,
+        minutos e pressões e devolve um array de probabilidades idêntico ao caminho escalar.
+        Os tipos de aposta podem ser membros de BetType ou seus índices em BET_TYPES.
+        """
+        codes = market_codes(bet_types)
+        codes, home, away, minute, home_p, away_p = np.broadcast_arrays(
+            codes,
+            np.asarray(home_goals, dtype=np.int64),
+            np.asarray(away_goals, dtype=np.int64),
+            np.asarray(minutes, dtype=np.float64),
+            np.asarray(home_pressures, dtype=np.float64),
+            np.asarray(away_pressures, dtype=np.float64)
+        )
+        surface = None if exact else self._active_surface()
+        if surface is None:
+            return self._exact_probability_batch(codes, home, away, minute, home_p, away_p)
+
+        # Superfície para os estados dentro da grade, cálculo direto para o restante
+        inside = surface.covers_batch(home, away, minute, home_p, away_p)
+        result = np.empty(codes.shape)
+        result[inside] = surface.lookup_batch(codes[inside], home[inside], away[inside], minute[inside],
+                                              home_p[inside], away_p[inside])
+        outside = ~inside
+        if outside.any():
+            result[outside] = self._exact_probability_batch(codes[outside], home[outside], away[outside],
+                                                            minute[outside], home_p[outside], away_p[outside])
+        return result
+
+    def _exact_probability_batch(self, codes, home, away, minute, home_p, away_p) -> np.ndarray:
+        """Cálculo direto do caminho vetorizado (arrays já com broadcasting)"""
+        total_goals = home + away
+
+        # Probabilidade base por mercado (fallback 0.5, como no caminho escalar)
+        base_table = np.array([
+            self.historical_data.get(bt.name.lower(), {'base_prob': 0.5})['base_prob']
+            for bt in BET_TYPES
+        ])
+        base = base_table[codes]
+        result = np.array(np.clip(base, 0.01, 0.99), dtype=np.float64)
+
+        # Under 2.5
+        mask = codes == BET_TYPE_INDEX[BetType.UNDER_25]
+        if mask.any():
+            data = self.historical_data.get('under_25', {})
+            prob = np.where(total_goals == 1, base * 0.6, base)
+            prob = prob - data.get('decay_rate', 0.01) * (minute / 90)
+            prob = np.where(total_goals >= 2, 0.01, np.clip(prob, 0.01, 0.99))
+            result[mask] = prob[mask]
+
+        # Over 1.5 no 1º tempo
+        mask = codes == BET_TYPE_INDEX[BetType.OVER_15_FH]
+        if mask.any():
+            data = self.historical_data.get('over_15_fh', {})
+            prob = base + data.get('growth_rate', 0.02) * (minute / 45)
+            prob = prob * (1 + (home_p + away_p - 1.0) / 2)
+            settled = np.where(total_goals >= 2, 1.0, 0.0)
+            prob = np.where(minute > 45, settled, np.clip(prob, 0.01, 0.99))
+            result[mask] = prob[mask]
+
+        # Ambas Marcam
+        mask = codes == BET_TYPE_INDEX[BetType.BOTH_TO_SCORE]
+        if mask.any():
+            data = self.historical_data.get('both_to_score', {})
+            prob = np.where((minute > 75) & ((home == 0) | (away == 0)), base * 0.5, base)
+            prob = np.where((home > 0) | (away > 0), prob * data.get('momentum_factor', 1.1), prob)
+            prob = np.where((home > 0) & (away > 0), 0.99, np.clip(prob, 0.01, 0.99))
+            result[mask] = prob[mask]
+
+        mask = codes == BET_TYPE_INDEX[BetType.DOUBLE_CHANCE_UNDERDOG]
+        if mask.any():
+            result[mask] = self._calc_underdog_double_chance_prob_batch(
+                home[mask], away[mask], minute[mask], home_p[mask], away_p[mask]
+            )
+
+        mask = codes == BET_TYPE_INDEX[BetType.OVER_15_MATCH]
+        if mask.any():
+            result[mask] = self._calc_over_15_match_prob_batch(
+                total_goals[mask], minute[mask], home_p[mask], away_p[mask]
+            )
+
+        return result
+
+    def estimate_contextual_probability_packed(self, bet_types, packed: np.ndarray) -> np.ndarray:
+        """Atalho do caminho vetorizado para condições empacotadas (MatchCondition.pack)"""
+        return self.estimate_contextual_probability_batch(
+            bet_types, packed['home_goals'], packed['away_goals'], packed['minute'],
+            packed['home_pressure'], packed['away_pressure']
+        )
+
+    @timed()
+    def probability_trajectory(self, bet_types, condition: MatchCondition, end_minute: int = 90,
+                               step: int = 1):
+        """
+        Projeção das probabilidades do minuto atual até `end_minute` mantendo
+        placar e pressões: matriz (mercados x minutos) numa única chamada vetorizada.
+        As pressões são quantizadas como no cache, então cada célula é igual a
+        cached_probability(bet_type, condition.replace(minute=m)).
+        Retorna (minutos, matriz).
+        """
+        if step <= 0:
+            raise ValueError("step deve ser positivo")
+        start = int(condition.minute)
+        minutes = np.arange(start, max(start, end_minute) + 1, step)
+        cache = self.probability_cache
+        key = cache.make_key(None, 0, 0, 0, condition.home_pressure, condition.away_pressure)
+        codes = np.atleast_1d(market_codes(bet_types))
+        return minutes, self.estimate_contextual_probability_batch(
+            codes[:, None], condition.home_goals, condition.away_goals, minutes[None, :],
+            cache.dequantize_pressure(key[4]), cache.dequantize_pressure(key[5])
+        )
+
+    def _calc_underdog_double_chance_prob_batch(self, home, away, minute, home_p, away_p,
+                                                current_odd: float = 2.0) -> np.ndarray:
+        """Versão vetorizada de _calc_underdog_double_chance_prob (mesmas regras e limites)"""
+        base_prob = np.full(home.shape, 0.45 * (1.5 / current_odd))
+
+        is_home_underdog = home_p < away_p
+        underdog_winning = np.where(is_home_underdog, home > away, away > home)
+        favourable = underdog_winning | (home == away)
+
+        losing_by_one = (is_home_underdog & (home == away - 1)) | (~is_home_underdog & (away == home - 1))
+        losing_by_two = (is_home_underdog & (home <= away - 2)) | (~is_home_underdog & (away <= home - 2))
+        base_prob = np.where(losing_by_one, np.minimum(0.8, base_prob * 1.4),
+                             np.where(losing_by_two, np.maximum(0.1, base_prob * 0.5), base_prob))
+
+        base_prob = np.where(minute < 30, np.minimum(0.7, base_prob * 1.3),
+                             np.where(minute > 75, np.maximum(0.15, base_prob * 0.7), base_prob))
+
+        return np.where(favourable,
+                        np.minimum(0.99, 0.45 * (1.5 / current_odd) * 1.2),
+                        np.minimum(0.6, np.maximum(0.2, base_prob)))
+
+    def _calc_over_15_match_prob_batch(self, total_goals, minute, home_p, away_p) -> np.ndarray:
+        """Versão vetorizada de _calc_over_15_match_prob"""
+        pressure_factor = (home_p + away_p) / 2
+        adjusted_prob = 0.65 * (0.7 + pressure_factor * 0.6)
+        final_prob = adjusted_prob * (1 - (minute / 90) * 0.5)
+
+        return np.where(total_goals >= 2, 0.99,
+                        np.where(total_goals == 1, 0.75 - (minute / 120) * 0.4,
+                                 np.clip(final_prob, 0.05, 0.95)))
+
     def _check_profit_margin(self, odd: float, prob: float) -> float:
         """
         Novo método para verificação de margem de lucro
@@ -171,6 +436,7 @@ class QuantumOptimizer:
         else:
             return raw_margin * 0.5  # Margem mínima
 
+    @timed()
     def optimize_portfolio(self, available_bets: Dict[BetType, float], 
                         condition: MatchCondition,
                         quantum_state: QuantumState,
@@ -249,7 +515,7 @@ class QuantumOptimizer:
             for bet_type, data in secondary_bets.items():
                 prob = self.estimate_contextual_probability(bet_type, condition)
                 ev = (prob * data['odd']) - 1
-                ev_adj = ev ** 2
+                ev_adj = ev * ev  # produto explícito: mesmo arredondamento do caminho vetorizado
                 ev_data[bet_type] = ev_adj
                 total_ev += ev_adj
 
@@ -287,6 +553,188 @@ class QuantumOptimizer:
             return {bt: d['weight']/total_weights for bt, d in selected_bets.items()}
         return {bt: 1.0/len(selected_bets) for bt in selected_bets}
 
+    @timed()
+    def optimize_portfolio_batch(self, odds_matrix,
+                                 conditions,
+                                 quantum_state: QuantumState,
+                                 bias_profile: HumanBiasProfile = None) -> np.ndarray:
+        """
+        Versão multi-partida de optimize_portfolio para uma rodada inteira.
+        - odds_matrix: (partidas x mercados) nas colunas de PORTFOLIO_MARKETS; NaN usa a odd padrão
+        - conditions: um MatchCondition para todas as partidas ou uma sequência (uma por partida)
+        Retorna a matriz de pesos (partidas x mercados), com zero nos mercados excluídos.
+        As regras de exclusão são aplicadas com máscaras e o resultado é idêntico ao escalar.
+        """
+        odds = np.array(odds_matrix, dtype=np.float64, ndmin=2)
+        n_fixtures = odds.shape[0]
+        if odds.shape[1] != len(PORTFOLIO_MARKETS):
+            raise ValueError(f"odds_matrix deve ter {len(PORTFOLIO_MARKETS)} colunas (PORTFOLIO_MARKETS)")
+        odds = np.where(np.isnan(odds), np.array(PORTFOLIO_DEFAULT_ODDS), odds)
+
+        if isinstance(conditions, MatchCondition):
+            conditions = [conditions] * n_fixtures
+        if len(conditions) != n_fixtures:
+            raise ValueError("É necessário um MatchCondition por partida")
+
+        o15m, u25, btts, dc, fh, win = range(len(PORTFOLIO_MARKETS))
+
+        # Regras de exclusão (2: Under vs BTTS, 3: DC vs Vencedor, 4: gatilho Over 1.5 FH)
+        selected = np.zeros(odds.shape, dtype=bool)
+        selected[:, o15m] = True
+        selected[:, u25] = odds[:, u25] < odds[:, btts]
+        selected[:, btts] = ~selected[:, u25]
+        selected[:, dc] = odds[:, dc] < odds[:, win]
+        selected[:, win] = ~selected[:, dc]
+        selected[:, fh] = odds[:, fh] < 2.0
+        selected[:, u25] &= ~selected[:, fh]
+        secondary = selected.copy()
+        secondary[:, o15m] = False
+
+        # Probabilidades contextuais de todas as células em uma única chamada vetorizada
+        packed = MatchCondition.pack(conditions)[:, None]
+        codes = np.array([BET_TYPE_INDEX[bt] for bt in PORTFOLIO_MARKETS])[None, :]
+        probs = self.estimate_contextual_probability_packed(codes, packed)
+
+        # Pesos por EV² (soma na mesma ordem de inserção do dicionário escalar)
+        ev = (probs * odds) - 1
+        ev_adj = np.where(secondary, ev * ev, 0.0)
+        slot_a = ev_adj[:, u25] + ev_adj[:, btts]
+        slot_b = ev_adj[:, dc] + ev_adj[:, win]
+        total_ev = 0.0 + slot_a + slot_b + ev_adj[:, fh]
+
+        anchor_weight = 0.333
+        n_secondary = secondary.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ev_weights = (ev_adj / total_ev[:, None]) * (1.0 - anchor_weight)
+        equal_weights = ((1.0 - anchor_weight) / n_secondary)[:, None]
+        weights = np.where(total_ev[:, None] > 0, ev_weights, equal_weights)
+        weights = np.where(secondary, weights, 0.0)
+        weights[:, o15m] = anchor_weight
+
+        # Ajustes comportamentais
+        if bias_profile:
+            for col, bet_type in enumerate(PORTFOLIO_MARKETS):
+                if bet_type in bias_profile.market_weights:
+                    factor = bias_profile.market_weights[bet_type]
+                    weights[:, col] = np.where(secondary[:, col], weights[:, col] * factor, weights[:, col])
+
+            for context, factors in bias_profile.context_factors.items():
+                has_context = np.array([context in c.match_context for c in conditions])
+                if not has_context.any():
+                    continue
+                for bet_type, factor in factors.items():
+                    if bet_type not in PORTFOLIO_MARKETS:
+                        continue
+                    col = PORTFOLIO_MARKETS.index(bet_type)
+                    apply = has_context & selected[:, col]
+                    weights[:, col] = np.where(apply, weights[:, col] * factor, weights[:, col])
+
+        # Garantias e normalização
+        min_weight = 0.05
+        for col in (fh, dc, win):
+            floor = selected[:, col] & (weights[:, col] < min_weight)
+            weights[:, col] = np.where(floor, min_weight, weights[:, col])
+
+        total_weights = 0 + weights[:, o15m] + (weights[:, u25] + weights[:, btts]) + \
+            (weights[:, dc] + weights[:, win]) + weights[:, fh]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normalized = weights / total_weights[:, None]
+        uniform = np.where(selected, 1.0 / selected.sum(axis=1)[:, None], 0.0)
+        return np.where(total_weights[:, None] > 0, normalized, uniform)
+
+    @timed()
+    def optimize_portfolio_correlated(self, available_bets: Dict[BetType, float],
+                                      condition: MatchCondition,
+                                      quantum_state: QuantumState,
+                                      objective: str = 'log_growth',
+                                      risk_aversion: float = 1.0,
+                                      fixture_id=None,
+                                      bias_profile: HumanBiasProfile = None,
+                                      reuse_tolerance: float = 0.005,
+                                      warm_starts: WarmStartCache = None) -> CorrelatedAllocation:
+        """
+        Otimização sensível à correlação sobre os mercados selecionados pelas regras de exclusão.
+        - objective='log_growth': maximiza o crescimento logarítmico esperado (aprox. de 2ª ordem)
+        - objective='mean_variance': maximiza média - λ·variância
+        A covariância usa _get_correlation_matrix e a aversão ao risco é escalada pelo
+        estado quântico (mesmas frações do Kelly). Com fixture_id e warm_starts (um
+        WarmStartCache da sessão), a última solução da partida é o ponto inicial; ela só
+        é devolvida sem otimizar se objetivo, aversão, estado e mercados são os mesmos e
+        odds e probabilidades contextuais mal se moveram.
+        Retorna os pesos junto com as informações da otimização (iterações, reuso).
+        """
+        if objective not in ('log_growth', 'mean_variance'):
+            raise ValueError(f"Objetivo desconhecido: {objective}")
+
+        # Mercados selecionados e ponto inicial vindos do otimizador por regras
+        rule_weights = self.optimize_portfolio(available_bets, condition, quantum_state, bias_profile)
+        markets = list(rule_weights)
+        defaults = dict(zip(PORTFOLIO_MARKETS, PORTFOLIO_DEFAULT_ODDS))
+        odds = np.array([available_bets.get(bt, defaults[bt]) for bt in markets], dtype=np.float64)
+        probs = np.array([self.estimate_contextual_probability(bt, condition) for bt in markets])
+
+        cached = None
+        if fixture_id is not None and warm_starts is not None:
+            cached = warm_starts.get(fixture_id)
+            if cached is not None and cached['markets'] != markets:
+                cached = None
+
+        if (cached is not None
+                and cached['objective'] == objective
+                and cached['risk_aversion'] == risk_aversion
+                and cached['quantum_state'] == quantum_state
+                and np.max(np.abs(odds / cached['odds'] - 1)) <= reuse_tolerance
+                and np.max(np.abs(probs - cached['probs'])) <= reuse_tolerance):
+            info = {'fixture_id': fixture_id, 'reused': True, 'warm_start': True, 'iterations': 0}
+            return CorrelatedAllocation({bt: float(w) for bt, w in zip(markets, cached['weights'])}, info)
+
+        mean = probs * odds - 1
+        std = odds * np.sqrt(probs * (1 - probs))
+        cov = np.outer(std, std) * self._get_correlation_matrix(markets)
+        # A tabela de correlações não é garantidamente PSD: projeta no cone PSD
+        eigvals, eigvecs = np.linalg.eigh(cov)
+        cov = (eigvecs * np.clip(eigvals, 0.0, None)) @ eigvecs.T
+
+        risk = risk_aversion * KELLY_RISK_FRACTION[QuantumState.ESTAVEL] / KELLY_RISK_FRACTION[quantum_state]
+        if objective == 'log_growth':
+            # E[log(1+R)] ≈ E[R] - E[R²]/2, com E[R²] = w'(Σ + μμ')w
+            curvature = risk * (cov + np.outer(mean, mean))
+        else:
+            curvature = 2 * risk * cov
+
+        def negative_objective(w):
+            return -(mean @ w - 0.5 * w @ curvature @ w)
+
+        def negative_gradient(w):
+            return -(mean - curvature @ w)
+
+        from scipy.optimize import minimize  # Importado só aqui: o scipy pesa na partida do app
+
+        # A solução anterior serve apenas de ponto inicial quando o contexto mudou
+        x0 = cached['weights'] if cached is not None else np.array([rule_weights[bt] for bt in markets])
+        result = minimize(
+            negative_objective, x0, jac=negative_gradient, method='SLSQP',
+            bounds=[(0.0, 1.0)] * len(markets),
+            constraints=[{'type': 'eq', 'fun': lambda w: w.sum() - 1.0, 'jac': lambda w: np.ones_like(w)}]
+        )
+        weights = np.clip(result.x, 0.0, None)
+        weights = weights / weights.sum() if weights.sum() > 0 else np.full(len(markets), 1.0 / len(markets))
+
+        if fixture_id is not None and warm_starts is not None:
+            warm_starts.put(fixture_id, {
+                'markets': markets, 'odds': odds, 'probs': probs, 'weights': weights,
+                'objective': objective, 'risk_aversion': risk_aversion, 'quantum_state': quantum_state
+            })
+        info = {
+            'fixture_id': fixture_id,
+            'reused': False,
+            'warm_start': cached is not None,
+            'iterations': int(result.nit),
+            'success': bool(result.success)
+        }
+        return CorrelatedAllocation({bt: float(w) for bt, w in zip(markets, weights)}, info)
+
+    @timed()
     def calculate_kelly_stake(self, prob: float, odd: float, bankroll: float, quantum_state: QuantumState) -> float:
         """
         Critério de Kelly Fracionado e Dinâmico.
@@ -296,11 +744,7 @@ class QuantumOptimizer:
             return 0.0
 
         # Fator de risco baseado no estado: mais estável, mais confiança; mais caótico, menos.
-        risk_fraction = {
-            QuantumState.ESTAVEL: 0.5,   # Meio Kelly
-            QuantumState.TRANSICAO: 0.3, # Um terço de Kelly
-            QuantumState.CAOTICO: 0.1,   # Apenas 10% do Kelly
-        }[quantum_state]
+        risk_fraction = KELLY_RISK_FRACTION[quantum_state]
 
         kelly_fraction = (prob * (odd - 1) - (1 - prob)) / (odd - 1)
         
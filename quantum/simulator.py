@@ -0,0 +1,255 @@
+# flux_on/project/quantum/simulator.py
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Sequence, Tuple
+from config import BetType, MatchCondition, BetPortfolio, BET_TYPES, BET_TYPE_INDEX
+
+# Campos de um lote simulado (todos com shape (partidas, caminhos))
+OUTCOME_FIELDS = (
+    'start_home', 'start_away', 'home_fh', 'away_fh', 'home_ft', 'away_ft',
+    'next_goal', 'goal_next_5', 'home_favourite'
+)
+
+NEXT_GOAL_NONE, NEXT_GOAL_HOME, NEXT_GOAL_AWAY = 0, 1, 2
+
+
+def settle_market(bet_type: BetType, outcome: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Liquida um mercado contra resultados (simulados ou reais).
+    Retorna um array booleano com o shape dos campos de `outcome`.
+    Convenções: o favorito é o time com maior pressão (casa no empate, como no otimizador),
+    o Handicap Visitante é +1.5 e o 1º tempo já encerrado mantém o placar do momento.
+    """
+    home, away = outcome['home_ft'], outcome['away_ft']
+    total = home + away
+    home_fav = outcome['home_favourite']
+
+    if bet_type == BetType.UNDER_25:
+        return total <= 2
+    if bet_type == BetType.OVER_15_FH:
+        return (outcome['home_fh'] + outcome['away_fh']) >= 2
+    if bet_type == BetType.BOTH_TO_SCORE:
+        return (home > 0) & (away > 0)
+    if bet_type == BetType.BOTH_TO_SCORE_NO:
+        return (home == 0) | (away == 0)
+    if bet_type == BetType.WINNER:
+        return np.where(home_fav, home > away, away > home)
+    if bet_type == BetType.HOME_WIN:
+        return home > away
+    if bet_type == BetType.AWAY_WIN:
+        return away > home
+    if bet_type == BetType.DRAW:
+        return home == away
+    if bet_type == BetType.OVER_25:
+        return total >= 3
+    if bet_type == BetType.UNDER_35:
+        return total <= 3
+    if bet_type == BetType.NO_GOAL:
+        return total == 0
+    if bet_type == BetType.NEXT_GOAL_HOME:
+        return outcome['next_goal'] == NEXT_GOAL_HOME
+    if bet_type == BetType.NEXT_GOAL_AWAY:
+        return outcome['next_goal'] == NEXT_GOAL_AWAY
+    if bet_type == BetType.GOAL_NEXT_5_MIN:
+        return outcome['goal_next_5']
+    if bet_type == BetType.DOUBLE_CHANCE_UNDERDOG:
+        return np.where(home_fav, away >= home, home >= away)
+    if bet_type == BetType.OVER_15_MATCH:
+        return total >= 2
+    if bet_type == BetType.AWAY_HANDICAP:
+        return (away + 1.5) > home
+    if bet_type == BetType.NO_MORE_GOALS:
+        return total == (outcome['start_home'] + outcome['start_away'])
+    if bet_type == BetType.NEXT_GOAL_LOSING_TEAM:
+        start_home, start_away = outcome['start_home'], outcome['start_away']
+        return ((start_home < start_away) & (outcome['next_goal'] == NEXT_GOAL_HOME)) | \
+               ((start_away < start_home) & (outcome['next_goal'] == NEXT_GOAL_AWAY))
+    raise ValueError(f"Mercado sem regra de liquidação: {bet_type}")
+
+
+def compile_portfolio(portfolio: BetPortfolio, match_index: int = 0,
+                      multi_amounts: Sequence[float] = None) -> List[Tuple[Tuple[int, ...], int, float, float]]:
+    """
+    Converte um BetPortfolio em posições (pernas, partida, stake, odd) prontas para liquidação.
+    As múltiplas usam 'amount' do próprio combo ou, na falta dele, `multi_amounts`
+    (os valores calculados na Fase 2).
+    """
+    positions = []
+    for bets in (portfolio.initial_bets, portfolio.in_play_bets):
+        for bet_type, bet in bets.items():
+            if bet.amount > 0:
+                positions.append(((BET_TYPE_INDEX[bet_type],), match_index, float(bet.amount), float(bet.odd)))
+
+    for i, combo in enumerate(portfolio.multi_bets or []):
+        amount = combo.get('amount')
+        if amount is None and multi_amounts is not None and i < len(multi_amounts):
+            amount = multi_amounts[i]
+        if not amount or amount <= 0:
+            continue
+        legs = tuple(BET_TYPE_INDEX[bt] for bt in combo['bets'])
+        odd = float(np.prod(combo['odds']))
+        positions.append((legs, match_index, float(amount), odd))
+    return positions
+
+
+def _simulate_chunk(match_params: Dict[str, np.ndarray], positions, n_paths: int,
+                    seed_sequence: np.random.SeedSequence) -> np.ndarray:
+    """Executa um bloco de caminhos e devolve o P&L total por caminho (roda em processo filho)"""
+    rng = np.random.default_rng(seed_sequence)
+    outcome = simulate_outcomes(match_params, n_paths, rng)
+
+    settled = {}
+    pnl = np.zeros(n_paths)
+    for legs, match_index, stake, odd in positions:
+        won = np.ones(n_paths, dtype=bool)
+        for code in legs:
+            if code not in settled:
+                settled[code] = settle_market(BET_TYPES[code], outcome)
+            won &= settled[code][match_index]
+        pnl += np.where(won, stake * (odd - 1), -stake)
+    return pnl
+
+
+def simulate_outcomes(match_params: Dict[str, np.ndarray], n_paths: int,
+                      rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """
+    Sorteia a linha do tempo de gols de N partidas x M caminhos.
+    O tempo restante é dividido em segmentos (janela de 5 min no 1º/2º tempo,
+    restante do 1º tempo, restante do 2º tempo) com gols Poisson por time em cada um;
+    a ordem dos gols dentro de um segmento é uniforme, o que define o próximo gol.
+    """
+    minute = match_params['minute'][:, None]
+    rate_home = match_params['rate_home'][:, None]
+    rate_away = match_params['rate_away'][:, None]
+    shape = (minute.shape[0], n_paths)
+
+    fh_left = np.clip(45 - minute, 0, 45)
+    sh_left = 90 - np.maximum(minute, 45)
+    window_fh = np.minimum(5, fh_left)
+    window_sh = np.minimum(5 - window_fh, sh_left)
+    # Ordem temporal: janela 1ºT, janela 2ºT, resto 1ºT, resto 2ºT
+    # (a janela só invade o 2º tempo quando o 1º tempo termina dentro dela)
+    segments = (window_fh, window_sh, fh_left - window_fh, sh_left - window_sh)
+    in_first_half = (True, False, True, False)
+
+    start_home = np.broadcast_to(match_params['home_goals'][:, None], shape)
+    start_away = np.broadcast_to(match_params['away_goals'][:, None], shape)
+    home_fh, away_fh = start_home.copy(), start_away.copy()
+    home_ft, away_ft = start_home.copy(), start_away.copy()
+    next_goal = np.zeros(shape, dtype=np.int8)
+    goal_next_5 = np.zeros(shape, dtype=bool)
+
+    for idx, (length, first_half) in enumerate(zip(segments, in_first_half)):
+        goals_home = rng.poisson(np.broadcast_to(rate_home * length, shape))
+        goals_away = rng.poisson(np.broadcast_to(rate_away * length, shape))
+        scored = (goals_home + goals_away) > 0
+
+        # Primeiro gol do segmento é da casa com prob. gols_casa / gols_totais
+        pending = (next_goal == NEXT_GOAL_NONE) & scored
+        if pending.any():
+            draw = rng.random(shape) * (goals_home + goals_away)
+            next_goal = np.where(pending, np.where(draw < goals_home, NEXT_GOAL_HOME, NEXT_GOAL_AWAY), next_goal)
+
+        if idx < 2:
+            goal_next_5 |= scored
+        if first_half:
+            home_fh = home_fh + goals_home
+            away_fh = away_fh + goals_away
+        home_ft = home_ft + goals_home
+        away_ft = away_ft + goals_away
+
+    return {
+        'start_home': start_home,
+        'start_away': start_away,
+        'home_fh': home_fh,
+        'away_fh': away_fh,
+        'home_ft': home_ft,
+        'away_ft': away_ft,
+        'next_goal': next_goal,
+        'goal_next_5': goal_next_5,
+        'home_favourite': np.broadcast_to(match_params['home_favourite'][:, None], shape)
+    }
+
+
+class MatchSimulator:
+    """
+    Simulador Monte Carlo de partidas para obter a distribuição de P&L do portfólio.
+    A taxa de gols por minuto vem da média de gols por partida e é dividida
+    entre os times proporcionalmente à pressão de cada um.
+    """
+    def __init__(self, goals_per_match: float = 2.6, chunk_size: int = 100_000, workers: int = 1):
+        self.goals_per_match = goals_per_match
+        self.chunk_size = chunk_size
+        self.workers = workers
+
+    def match_params(self, conditions: Sequence[MatchCondition], goals_per_match=None) -> Dict[str, np.ndarray]:
+        """Parâmetros vetorizados das partidas (placar, minuto, taxas de gol, favorito)"""
+        goals_per_match = self.goals_per_match if goals_per_match is None else goals_per_match
+        packed = MatchCondition.pack(conditions)
+        home_p = packed['home_pressure']
+        away_p = packed['away_pressure']
+        pressure_total = home_p + away_p
+        home_share = np.divide(home_p, pressure_total, out=np.full_like(home_p, 0.5), where=pressure_total > 0)
+        rate = np.broadcast_to(np.asarray(goals_per_match, dtype=np.float64), home_p.shape) / 90
+
+        return {
+            'home_goals': packed['home_goals'].astype(np.int64),
+            'away_goals': packed['away_goals'].astype(np.int64),
+            'minute': np.minimum(packed['minute'], 90).astype(np.float64),
+            'rate_home': rate * home_share,
+            'rate_away': rate * (1 - home_share),
+            'home_favourite': home_p >= away_p
+        }
+
+    def simulate(self, conditions: Sequence[MatchCondition], n_paths: int, seed=None) -> Dict[str, np.ndarray]:
+        """Sorteia os resultados (partidas x caminhos) em um único processo"""
+        rng = np.random.default_rng(seed)
+        return simulate_outcomes(self.match_params(conditions), n_paths, rng)
+
+    def simulate_pnl(self, portfolios: Sequence[BetPortfolio], conditions: Sequence[MatchCondition],
+                     n_paths: int, seed=None, multi_amounts: Sequence[Sequence[float]] = None,
+                     workers: int = None) -> np.ndarray:
+        """
+        Distribuição do P&L total (um valor por caminho) de um portfólio por partida.
+        Os caminhos são divididos em blocos com fluxos RNG independentes
+        (SeedSequence.spawn); o número de blocos depende só de n_paths e chunk_size,
+        então o resultado é reproduzível para a mesma semente com qualquer número de workers.
+        """
+        if len(portfolios) != len(conditions):
+            raise ValueError("É necessário um MatchCondition por portfólio")
+
+        positions = []
+        for i, portfolio in enumerate(portfolios):
+            amounts = multi_amounts[i] if multi_amounts is not None else None
+            positions.extend(compile_portfolio(portfolio, i, amounts))
+        params = self.match_params(conditions)
+
+        sizes = [self.chunk_size] * (n_paths // self.chunk_size)
+        if n_paths % self.chunk_size:
+            sizes.append(n_paths % self.chunk_size)
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+        workers = self.workers if workers is None else workers
+        if workers <= 1 or len(sizes) == 1:
+            chunks = [_simulate_chunk(params, positions, size, s) for size, s in zip(sizes, seeds)]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunks = list(executor.map(
+                    _simulate_chunk,
+                    [params] * len(sizes), [positions] * len(sizes), sizes, seeds
+                ))
+        return np.concatenate(chunks) if chunks else np.zeros(0)
+
+    @staticmethod
+    def summarize(pnl: np.ndarray) -> Dict[str, float]:
+        """Resumo da distribuição de P&L (média, desvio, quantis e prob. de prejuízo)"""
+        p5, p50, p95 = np.percentile(pnl, [5, 50, 95])
+        return {
+            'mean': float(pnl.mean()),
+            'std': float(pnl.std()),
+            'p5': float(p5),
+            'median': float(p50),
+            'p95': float(p95),
+            'prob_loss': float((pnl < 0).mean())
+        }
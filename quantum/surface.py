@@ -0,0 +1,190 @@
+# flux_on/project/quantum/surface.py
+
+import argparse
+import json
+import os
+import numpy as np
+from typing import Dict
+from config import BetType, MatchCondition, BET_TYPES, BET_TYPE_INDEX, market_codes
+from quantum.calibration import historical_data_fingerprint
+
+SURFACE_FORMAT_VERSION = 1
+
+# Arquivo padrão carregado pelo app (sobrescrito por FLUX_PROBABILITY_SURFACE)
+DEFAULT_SURFACE_PATH = os.environ.get(
+    'FLUX_PROBABILITY_SURFACE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'probability_surface.npy')
+)
+
+# Eixos da grade: placares até 5-5, minutos 0-120 e pressões em passos de 0.05
+MAX_GOALS = 5
+MAX_MINUTE = 120
+PRESSURE_STEP = 0.05
+PRESSURE_POINTS = int(round(1 / PRESSURE_STEP)) + 1
+
+# Dupla chance do azarão: depende das pressões só pelo lado da diagonal (quem é o azarão),
+# com salto em home_pressure == away_pressure. A consulta lê um ponto da grade do mesmo
+# lado em vez de interpolar através do salto: (0.00, 0.05) casa azarão, (0.00, 0.00) não.
+UNDERDOG_CODE = BET_TYPE_INDEX[BetType.DOUBLE_CHANCE_UNDERDOG]
+
+
+def build_probability_surface(optimizer, path: str) -> str:
+    """
+    Etapa offline: avalia estimate_contextual_probability em toda a grade
+    (mercado x gols casa x gols visitante x minuto x pressão casa x pressão visitante)
+    e salva em `path` (.npy, float32) com um arquivo .json de metadados ao lado.
+    """
+    goals = np.arange(MAX_GOALS + 1)
+    minutes = np.arange(MAX_MINUTE + 1)
+    pressures = np.round(np.arange(PRESSURE_POINTS) * PRESSURE_STEP, 10)
+    home, away, minute, home_p, away_p = np.meshgrid(goals, goals, minutes, pressures, pressures, indexing='ij')
+
+    surface = np.lib.format.open_memmap(
+        path, mode='w+', dtype=np.float32,
+        shape=(len(BET_TYPES),) + home.shape
+    )
+    for code in range(len(BET_TYPES)):
+        surface[code] = optimizer.estimate_contextual_probability_batch(code, home, away, minute, home_p, away_p,
+                                                                         exact=True)
+    surface.flush()
+    del surface
+
+    metadata = {
+        'format_version': SURFACE_FORMAT_VERSION,
+        'bet_types': [bt.name for bt in BET_TYPES],
+        'max_goals': MAX_GOALS,
+        'max_minute': MAX_MINUTE,
+        'pressure_step': PRESSURE_STEP,
+        'historical_data': historical_data_fingerprint(optimizer.historical_data)
+    }
+    with open(_metadata_path(path), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+    return path
+
+
+def _metadata_path(path: str) -> str:
+    return os.path.splitext(path)[0] + '.json'
+
+
+class ProbabilitySurface:
+    """
+    Superfície de probabilidades pré-calculada, carregada com mmap (sem custo de startup;
+    processos diferentes compartilham as mesmas páginas via cache do SO).
+    A consulta é O(1): placar exato e interpolação linear em minuto e pressões
+    (a dupla chance do azarão interpola só no minuto, do lado certo da diagonal).
+    Placares fora da grade usam o otimizador de fallback, se fornecido.
+    """
+    def __init__(self, surface: np.ndarray, metadata: Dict, fallback=None):
+        if metadata.get('format_version') != SURFACE_FORMAT_VERSION:
+            raise ValueError(f"Versão de superfície incompatível: {metadata.get('format_version')}")
+        if metadata['bet_types'] != [bt.name for bt in BET_TYPES]:
+            raise ValueError("A superfície foi gerada com outra lista de mercados")
+        self.surface = surface
+        self.metadata = metadata
+        self.fallback = fallback
+
+    @classmethod
+    def load(cls, path: str, fallback=None) -> 'ProbabilitySurface':
+        """Abre a superfície em modo somente leitura com mmap"""
+        with open(_metadata_path(path), encoding='utf-8') as f:
+            metadata = json.load(f)
+        return cls(np.load(path, mmap_mode='r'), metadata, fallback)
+
+    def is_compatible(self, optimizer) -> bool:
+        """Verifica se a superfície foi gerada com os parâmetros históricos atuais"""
+        return self.metadata['historical_data'] == historical_data_fingerprint(optimizer.historical_data)
+
+    def covers(self, condition: MatchCondition) -> bool:
+        """Estado dentro da grade (placar, minuto inteiro e pressões em [0, 1])"""
+        return (condition.home_goals <= MAX_GOALS and condition.away_goals <= MAX_GOALS
+                and 0 <= condition.minute <= MAX_MINUTE and condition.minute == int(condition.minute)
+                and 0.0 <= condition.home_pressure <= 1.0 and 0.0 <= condition.away_pressure <= 1.0)
+
+    @staticmethod
+    def covers_batch(home_goals, away_goals, minutes, home_pressures, away_pressures) -> np.ndarray:
+        """Versão vetorizada de covers (máscara dos estados dentro da grade)"""
+        return ((home_goals <= MAX_GOALS) & (away_goals <= MAX_GOALS)
+                & (minutes >= 0) & (minutes <= MAX_MINUTE) & (minutes == np.floor(minutes))
+                & (home_pressures >= 0.0) & (home_pressures <= 1.0)
+                & (away_pressures >= 0.0) & (away_pressures <= 1.0))
+
+    def lookup(self, bet_type: BetType, condition: MatchCondition) -> float:
+        """Probabilidade para um único estado"""
+        home, away = condition.home_goals, condition.away_goals
+        if home > MAX_GOALS or away > MAX_GOALS:
+            if self.fallback is None:
+                raise KeyError(f"Placar fora da grade: {condition.score}")
+            return self.fallback.estimate_contextual_probability(bet_type, condition)
+
+        # Caminho escalar sem alocação de arrays: 8 leituras e interpolação trilinear
+        minute = min(max(float(condition.minute), 0.0), MAX_MINUTE)
+        home_p = min(max(condition.home_pressure, 0.0), 1.0) / PRESSURE_STEP
+        away_p = min(max(condition.away_pressure, 0.0), 1.0) / PRESSURE_STEP
+        m0 = min(int(minute), MAX_MINUTE - 1)
+        h0 = min(int(home_p), PRESSURE_POINTS - 2)
+        a0 = min(int(away_p), PRESSURE_POINTS - 2)
+        m_frac, h_frac, a_frac = minute - m0, home_p - h0, away_p - a0
+        code = BET_TYPE_INDEX[bet_type]
+        if code == UNDERDOG_CODE:
+            h0, a0 = 0, int(condition.home_pressure < condition.away_pressure)
+            h_frac = a_frac = 0.0
+
+        cube = self.surface[code, home, away, m0:m0 + 2, h0:h0 + 2, a0:a0 + 2]
+        result = 0.0
+        for dm, wm in ((0, 1 - m_frac), (1, m_frac)):
+            for dh, wh in ((0, 1 - h_frac), (1, h_frac)):
+                for da, wa in ((0, 1 - a_frac), (1, a_frac)):
+                    result += wm * wh * wa * float(cube[dm, dh, da])
+        return result
+
+    def lookup_batch(self, bet_types, home_goals, away_goals, minutes,
+                     home_pressures, away_pressures) -> np.ndarray:
+        """Versão vetorizada (índices de BET_TYPES ou membros de BetType); placares devem estar na grade"""
+        codes, home, away, minute, home_p, away_p = np.broadcast_arrays(
+            market_codes(bet_types),
+            np.asarray(home_goals, dtype=np.int64),
+            np.asarray(away_goals, dtype=np.int64),
+            np.clip(np.asarray(minutes, dtype=np.float64), 0, MAX_MINUTE),
+            np.asarray(home_pressures, dtype=np.float64),
+            np.asarray(away_pressures, dtype=np.float64)
+        )
+        if (home > MAX_GOALS).any() or (away > MAX_GOALS).any():
+            raise KeyError("Placar fora da grade da superfície")
+
+        m0, m_frac = self._split(minute, MAX_MINUTE)
+        h0, h_frac = self._split(np.clip(home_p, 0.0, 1.0) / PRESSURE_STEP, PRESSURE_POINTS - 1)
+        a0, a_frac = self._split(np.clip(away_p, 0.0, 1.0) / PRESSURE_STEP, PRESSURE_POINTS - 1)
+
+        # Azarão: ponto da grade do mesmo lado da diagonal, sem interpolar nas pressões
+        underdog = codes == UNDERDOG_CODE
+        if underdog.any():
+            h0 = np.where(underdog, 0, h0)
+            a0 = np.where(underdog, (home_p < away_p).astype(np.int64), a0)
+            h_frac = np.where(underdog, 0.0, h_frac)
+            a_frac = np.where(underdog, 0.0, a_frac)
+
+        # Interpolação trilinear (minuto, pressão casa, pressão visitante)
+        result = np.zeros(codes.shape)
+        for dm, wm in ((0, 1 - m_frac), (1, m_frac)):
+            for dh, wh in ((0, 1 - h_frac), (1, h_frac)):
+                for da, wa in ((0, 1 - a_frac), (1, a_frac)):
+                    values = self.surface[codes, home, away, m0 + dm, h0 + dh, a0 + da]
+                    result += wm * wh * wa * values
+        return result
+
+    @staticmethod
+    def _split(position: np.ndarray, last_index: int):
+        """Índice inferior e fração para interpolação, sem ultrapassar a borda da grade"""
+        lower = np.minimum(np.floor(position).astype(np.int64), last_index - 1)
+        return lower, position - lower
+
+
+if __name__ == "__main__":
+    # Uso: python -m quantum.surface probability_surface.npy
+    from quantum.optimizer import QuantumOptimizer
+
+    parser = argparse.ArgumentParser(description="Gera a superfície de probabilidades pré-calculada")
+    parser.add_argument("path", help="Arquivo .npy de saída")
+    args = parser.parse_args()
+    build_probability_surface(QuantumOptimizer(), args.path)
+    print(f"Superfície salva em {args.path}")
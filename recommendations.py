@@ -0,0 +1,269 @@
+# project/recommendations.py
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence
+from config import (
+    BetType, MatchCondition, QuantumState, QuantumBet, BetPortfolio, get_hedge_market
+)
+from metrics import timed
+from scenarios import ScenarioIndex, SCENARIO_INDEX
+
+
+def detect_scenarios(optimizer, condition: MatchCondition, quantum_state: QuantumState,
+                     multi_bets: Sequence[Dict] = (), red_card_event: Optional[Dict] = None,
+                     last_volatility: Optional[str] = None, index: ScenarioIndex = None) -> List[Dict]:
+    """
+    Cenários ao vivo ativos para o estado da partida (sem valores de stake).
+    Função pura: recebe as múltiplas confirmadas e o evento de cartão vermelho
+    explicitamente, sem ler o st.session_state. As regras vêm do ScenarioIndex
+    (SCENARIO_INDEX por padrão).
+    """
+    return (index or SCENARIO_INDEX).detect_state(
+        optimizer, condition, quantum_state.value, multi_bets, red_card_event, last_volatility
+    )
+
+
+def price_recommendations(optimizer, recommendations: List[Dict], condition: MatchCondition,
+                          capital: float, initial_bets: Dict[BetType, QuantumBet]) -> List[Dict]:
+    """Distribui o capital da fase entre as recomendações (stake, odd ao vivo, probabilidade e EV)"""
+    if not recommendations:
+        return recommendations
+    total_weight = sum(r["weight"] for r in recommendations)
+
+    for rec in recommendations:
+        # Calcula a probabilidade contextual
+        prob = optimizer.cached_probability(rec["bet_type"], condition)
+
+        # Calcula o valor proporcional
+        proportion = rec["weight"] / total_weight
+        stake = capital * proportion
+
+        # Obtém a odd atual (com fallback para odd mínima)
+        initial_bet = initial_bets.get(rec["bet_type"])
+        odd_live = (initial_bet.odd * (1 + (0.5 - prob))) if initial_bet else rec["min_odd"]
+
+        rec.update({
+            "odd": odd_live,
+            "prob": prob,
+            "stake": stake,
+            "proportion": proportion,
+            "ev": (prob * odd_live - 1) * 100
+        })
+    return recommendations
+
+
+def in_play_capital(capital: float, initial_invested: float, num_combos: int, minute: float) -> float:
+    """Capital seguro para a Fase 3: 9% (até 12% no fim do jogo), limitado ao saldo após as fases 1 e 2"""
+    # Valor total alocado para combinações (31%), se houver alguma
+    multi_invested = capital * 0.31 if num_combos > 0 else 0
+
+    # Capital disponível (9% do total ou saldo restante)
+    available_capital = capital - (initial_invested + multi_invested)
+    in_play = min(capital * 0.09, available_capital)
+
+    # Aumenta a alocação para proteção no final do jogo (últimos 25%, até 1.5x)
+    minute_factor = min(1.0, minute / 90)
+    if minute_factor > 0.75:
+        protection_boost = 1.0 + (minute_factor - 0.75) * 2
+        in_play = min(in_play * protection_boost, capital * 0.12)
+
+    # Garante que não ultrapasse 12% do capital total
+    return min(max(0, in_play), capital * 0.12)
+
+# Fator numérico de cada estado de volatilidade (usado nas proporções proteção/ataque)
+VOLATILITY_FACTORS = {
+    "Estável": 0.3,
+    "Transição": 0.6,
+    "Caótico": 0.9
+}
+
+# Estratégias base por mercado, volatilidade e fase do jogo (texto, descrição)
+BASE_STRATEGIES = {
+    BetType.UNDER_25: {
+        "Estável": {
+            "early": ("Proteção 30% + Ataque 70%", "Aposta preventiva com foco em under"),
+            "mid": ("Proteção 50% + Ataque 50%", "Ajuste balanceado"),
+            "late": ("Proteção 70% + Ataque 30%", "Bloqueio defensivo")
+        },
+        "Caótico": {
+            "early": ("Proteção 50% + Ataque 50%", "Aposta cautelosa em under"),
+            "mid": ("Proteção 60% + Ataque 40%", "Defesa contra virada"),
+            "late": ("Proteção 80% + Ataque 20%", "Proteção máxima")
+        }
+    },
+    BetType.OVER_25: {
+        "Transição": {
+            "early": ("Ataque 70% + Proteção 30%", "Explorar início ofensivo"),
+            "mid": ("Ataque 50% + Proteção 50%", "Ajuste tático"),
+            "late": ("Proteção 70% + Ataque 30%", "Travar lucros")
+        }
+    },
+    BetType.HOME_WIN: {
+        "Estável": {
+            "early": ("Ataque 60% + Proteção 40%", "Valor na casa"),
+            "mid": ("Ataque 40% + Proteção 60%", "Consolidação"),
+            "late": ("Proteção 80% + Ataque 20%", "Manter vantagem")
+        }
+    },
+    BetType.AWAY_WIN: {
+        "Caótico": {
+            "early": ("Ataque 30% + Proteção 70%", "Especulação cautelosa"),
+            "mid": ("Ataque 50% + Proteção 50%", "Virada potencial"),
+            "late": ("Ataque 70% + Proteção 30%", "Pressão final")
+        }
+    }
+}
+
+
+def dynamic_ratios(bet_type: BetType, condition: MatchCondition, volatility: str) -> tuple:
+    """Proporções de proteção/ataque com fallback seguro (70/30)"""
+    try:
+        time_factor = min(1.0, condition.minute / 90)
+        volatility_factor = VOLATILITY_FACTORS.get(volatility, 0.5)
+        pressure_factor = abs(condition.home_pressure - condition.away_pressure)
+
+        base = 0.5  # Valor padrão seguro
+        if bet_type in (BetType.UNDER_25, BetType.BOTH_TO_SCORE_NO):
+            base = 0.6 + (0.2 * volatility_factor) - (0.1 * pressure_factor)
+        elif bet_type in (BetType.OVER_25, BetType.BOTH_TO_SCORE):
+            base = 0.4 - (0.1 * volatility_factor) + (0.2 * time_factor)
+
+        # Garantir limites seguros
+        protection_ratio = max(0.1, min(0.9, base))
+        return protection_ratio, 1 - protection_ratio
+
+    except Exception:
+        return 0.7, 0.3
+
+
+def strategy_info(bet_type: BetType, condition: MatchCondition, volatility: str, protection_ratio: float = None):
+    """Texto da estratégia para o mercado (tabela base ou cálculo dinâmico pelo contexto)"""
+    minute = condition.minute
+    if minute < 30:
+        game_phase = "early"
+    elif minute < 60:
+        game_phase = "mid"
+    else:
+        game_phase = "late"
+
+    strategy = BASE_STRATEGIES.get(bet_type, {}).get(volatility, {}).get(game_phase)
+    if strategy:
+        return f"{strategy[0]} - {strategy[1]}"
+
+    # Estratégia padrão com cálculo dinâmico
+    volatility_factor = VOLATILITY_FACTORS.get(volatility, 0.5)
+    pressure_factor = abs(condition.home_pressure - condition.away_pressure)
+    time_factor = min(1.0, minute / 90)
+    protection_ratio = 0.5 + (0.4 * volatility_factor) - (0.2 * pressure_factor) + (0.3 * time_factor)
+    protection_ratio = max(0.2, min(0.8, protection_ratio))  # Limitar entre 20% e 80%
+    attack_ratio = 1 - protection_ratio
+    return (
+        f"Proteção {int(protection_ratio * 100)}% + Ataque {int(attack_ratio * 100)}%",
+        "Estratégia dinâmica baseada no contexto"
+    )
+
+
+def strategy(bet_type: BetType, condition: MatchCondition, volatility: str, protection_ratio: float = None) -> Dict:
+    """Estratégia unificada do mercado (texto, detalhe e proporções)"""
+    if protection_ratio is None:
+        protection_ratio, _ = dynamic_ratios(bet_type, condition, volatility)
+    return {
+        "strategy": f"Estratégia para {bet_type.value}",
+        "detail": strategy_info(bet_type, condition, volatility, protection_ratio),
+        "protection_ratio": protection_ratio,
+        "attack_ratio": 1 - protection_ratio
+    }
+
+
+def hedge_info(optimizer, bet_type: BetType, condition: MatchCondition, initial_amount: float) -> str:
+    """Proteção dinâmica sugerida (30%-70% do valor inicial) pelo mercado oposto"""
+    hedge_bet = get_hedge_market(bet_type)
+    if hedge_bet is not None:
+        prob_main = optimizer.cached_probability(bet_type, condition)
+        prob_hedge = optimizer.cached_probability(hedge_bet, condition)
+
+        if prob_main + prob_hedge > 0:
+            hedge_ratio = min(0.7, max(0.3, prob_hedge / (prob_main + prob_hedge)))
+            return (
+                f"Proteção dinâmica recomendada: R$ {initial_amount * hedge_ratio:.2f} "
+                f"({hedge_ratio*100:.0f}% do valor inicial)\n"
+                f"Probabilidade de proteção: {prob_hedge:.1%}"
+            )
+
+    return "Proteção não calculada (analisar manualmente)"
+
+
+class PortfolioSnapshot(NamedTuple):
+    """Cópia imutável do que o motor lê do portfólio (segura para outras threads)"""
+    capital: float
+    initial_bets: Mapping[BetType, QuantumBet]
+    multi_bets: tuple = ()
+
+    @classmethod
+    def from_portfolio(cls, portfolio: Optional[BetPortfolio]) -> 'PortfolioSnapshot':
+        if portfolio is None:
+            return cls(0.0, {}, ())
+        return cls(
+            float(portfolio.capital),
+            dict(getattr(portfolio, 'initial_bets', None) or {}),
+            tuple(getattr(portfolio, 'multi_bets', None) or ())
+        )
+
+    def fingerprint(self) -> tuple:
+        """
+        Versão do portfólio como chave hashable: muda sempre que capital,
+        valores/odds das apostas iniciais ou combinações confirmadas mudam.
+        """
+        return (
+            self.capital,
+            tuple((bet_type, bet.amount, bet.odd) for bet_type, bet in self.initial_bets.items()),
+            tuple((combo.get('name'), tuple(combo.get('bets', ())), tuple(combo.get('odds', ())))
+                  for combo in self.multi_bets)
+        )
+
+
+class RecommendationEngine:
+    """
+    Motor de recomendações ao vivo sem dependência do Streamlit.
+    Recebe um PortfolioSnapshot, o estado da partida, a volatilidade e o capital
+    da fase e devolve os registros de recomendação consumidos pelo InPlayModule.
+    Pode ser chamado de threads, jobs em lote e benchmarks.
+    """
+    def __init__(self, optimizer, scenario_index: ScenarioIndex = None):
+        self.optimizer = optimizer
+        self.scenario_index = scenario_index or SCENARIO_INDEX
+
+    @timed()
+    def recommend(self, portfolio: PortfolioSnapshot, condition: MatchCondition, quantum_state: QuantumState,
+                  capital: float, red_card_event: Optional[Dict] = None,
+                  last_volatility: Optional[str] = None) -> List[Dict]:
+        """
+        Cenários ativos com stake, odd ao vivo, probabilidade, EV,
+        proporções proteção/ataque, estratégia e proteção sugerida.
+        """
+        recommendations = detect_scenarios(
+            self.optimizer, condition, quantum_state,
+            multi_bets=portfolio.multi_bets,
+            red_card_event=red_card_event,
+            last_volatility=last_volatility,
+            index=self.scenario_index
+        )
+        if not recommendations:
+            return recommendations
+
+        price_recommendations(self.optimizer, recommendations, condition, capital, portfolio.initial_bets)
+
+        volatility = quantum_state.value
+        for rec in recommendations:
+            protection_ratio, _ = dynamic_ratios(rec["bet_type"], condition, volatility)
+            attack_ratio = 1 - protection_ratio
+            initial_bet = portfolio.initial_bets.get(rec["bet_type"])
+
+            rec.update({
+                "protection_ratio": protection_ratio,
+                "attack_ratio": attack_ratio,
+                "protection_stake": rec["stake"] * protection_ratio,
+                "attack_stake": rec["stake"] * attack_ratio,
+                "strategy": strategy(rec["bet_type"], condition, volatility, protection_ratio),
+                "hedge": hedge_info(self.optimizer, rec["bet_type"], condition,
+                                    initial_bet.amount if initial_bet else 0)
+            })
+        return recommendations
@@ -0,0 +1,128 @@
+# project/resources.py
+import os
+import threading
+from typing import Callable, Dict, Hashable, Optional, Tuple
+from metrics import METRICS
+from quantum.calibration import DEFAULT_PARAMETERS_PATH
+from quantum.optimizer import QuantumOptimizer
+from quantum.surface import DEFAULT_SURFACE_PATH, ProbabilitySurface
+
+# Incrementar quando a forma dos recursos compartilhados mudar (força a reconstrução em todos os processos)
+RESOURCE_VERSION = 1
+
+
+class ResourceCache:
+    """
+    Objetos caros e sem estado de sessão (otimizador, tabelas de parâmetros,
+    superfície de probabilidades) criados uma vez por processo e compartilhados
+    por todas as sessões. Cada recurso tem uma versão explícita: `get` com
+    outra versão reconstrói o recurso; sessões simultâneas pedindo o mesmo
+    recurso esperam uma única construção.
+    """
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Hashable, object]] = {}
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._builds = 0
+        self._invalidations = 0
+
+    def get(self, name: str, factory: Callable[[], object], version: Hashable = None):
+        """Recurso `name` na versão pedida (construído com `factory` na primeira vez ou ao mudar de versão)"""
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == version:
+            with self._lock:
+                self._hits += 1
+            return entry[1]
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+        with build_lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == version:
+                with self._lock:
+                    self._hits += 1
+                return entry[1]
+            value = factory()
+            with self._lock:
+                self._entries[name] = (version, value)
+                self._builds += 1
+            return value
+
+    def version(self, name: str):
+        entry = self._entries.get(name)
+        return entry[0] if entry is not None else None
+
+    def invalidate(self, name: str = None):
+        """Descarta um recurso (ou todos); o próximo `get` reconstrói"""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+            self._invalidations += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'resources': len(self._entries),
+                'hits': self._hits,
+                'builds': self._builds,
+                'invalidations': self._invalidations
+            }
+
+    def __contains__(self, name: str):
+        return name in self._entries
+
+
+def _file_version(path: str):
+    """Versão de um arquivo de dados (mtime e tamanho; None se não existe)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def shared_surface(path: str = DEFAULT_SURFACE_PATH) -> Optional[ProbabilitySurface]:
+    """
+    Superfície de probabilidades única por processo, aberta com mmap (None se o
+    arquivo não existe). Um novo build (mtime ou tamanho do .npy alterados) gera
+    outra versão e reabre o arquivo.
+    """
+    def build():
+        return ProbabilitySurface.load(path) if os.path.exists(path) else None
+
+    return RESOURCES.get(f"surface:{path}", build, version=(RESOURCE_VERSION, _file_version(path)))
+
+
+def shared_optimizer(parameters_path: str = DEFAULT_PARAMETERS_PATH, league: str = None,
+                     surface_path: str = DEFAULT_SURFACE_PATH) -> QuantumOptimizer:
+    """
+    QuantumOptimizer único por processo para o arquivo de parâmetros e a liga.
+    Os parâmetros são carregados na construção; uma nova calibração (arquivo
+    alterado) gera outra versão e um novo otimizador. O cache de probabilidades
+    já é o PROBABILITY_CACHE compartilhado e a superfície (shared_surface) é
+    anexada quando corresponde aos parâmetros; um novo build dela também gera
+    outra versão. O otimizador não guarda estado de sessão (warm starts ficam
+    num WarmStartCache da sessão). Não altere os parâmetros do objeto devolvido
+    por uma sessão: use um QuantumOptimizer próprio para isso.
+    """
+    surface = shared_surface(surface_path)
+
+    def build():
+        optimizer = QuantumOptimizer(parameters_path=parameters_path, league=league)
+        optimizer.historical_data  # carrega as tabelas uma única vez, fora das sessões
+        if surface is not None:
+            optimizer.attach_surface(surface)
+        return optimizer
+
+    return RESOURCES.get(
+        f"optimizer:{parameters_path}:{league}:{surface_path}", build,
+        version=(RESOURCE_VERSION, _file_version(parameters_path), RESOURCES.version(f"surface:{surface_path}"))
+    )
+
+
+# Cache compartilhado por todo o processo (todas as sessões do Streamlit)
+RESOURCES = ResourceCache()
+METRICS.register_collector('resources', RESOURCES.stats)
@@ -0,0 +1,467 @@
+# project/scenarios.py
+from string import Formatter
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional, Sequence
+from config import BetType, MatchCondition, get_hedge_market
+
+# Minutos indexados em tabela (acréscimos incluídos); acima disso a máscara é calculada na hora
+INDEXED_MINUTES = 131
+
+# Limites dos caches de candidatos (por contexto, minuto e placar) e de textos formatados por regra
+CANDIDATE_CACHE_SIZE = 65536
+RENDERED_TEXTS_PER_RULE = 4096
+
+# Mercados já ganhos pelo placar atual (funcionam com escalares ou arrays de gols)
+BET_WON_RULES = {
+    BetType.HOME_WIN: lambda home, away: home > away,
+    BetType.AWAY_WIN: lambda home, away: away > home,
+    BetType.DRAW: lambda home, away: home == away,
+    BetType.OVER_15_MATCH: lambda home, away: (home + away) > 1.5,
+    BetType.OVER_25: lambda home, away: (home + away) > 2.5,
+    BetType.BOTH_TO_SCORE: lambda home, away: (home >= 1) & (away >= 1)
+}
+
+
+def is_bet_won(bet_type: BetType, condition: MatchCondition) -> bool:
+    """Verifica se o mercado já está ganho pelo placar atual"""
+    rule = BET_WON_RULES.get(bet_type)
+    return bool(rule(condition.home_goals, condition.away_goals)) if rule else False
+
+
+class ScenarioContext(NamedTuple):
+    """Entradas dos cenários além do estado da partida"""
+    volatility: str
+    multi_bets: Sequence[Dict] = ()
+    red_card_event: Optional[Dict] = None
+    last_volatility: Optional[str] = None
+
+
+class ScenarioRule(NamedTuple):
+    """
+    Cenário ao vivo declarado como dados. A janela de minutos e o predicado
+    de placar entram no índice; os limites de pressão, volatilidade e os
+    requisitos de contexto são verificados só para os candidatos.
+    O registro gerado vem de `build` ou, sem ele, dos campos de template
+    (`name`/`reason` formatados com os campos de `_template_fields`).
+    """
+    key: str
+    market: Optional[BetType] = None
+    name: str = ''
+    reason: str = ''
+    weight: float = 1.0
+    min_odd: float = 1.0
+    extra: Optional[Dict] = None
+    min_minute: Optional[int] = None  # inclusivo
+    max_minute: Optional[int] = None  # inclusivo
+    score: Optional[Callable[[int, int], bool]] = None
+    home_pressure_above: Optional[float] = None
+    away_pressure_above: Optional[float] = None
+    losing_pressure_above: Optional[float] = None
+    pressures_below: Optional[float] = None
+    volatilities: Optional[FrozenSet[str]] = None
+    from_volatility: Optional[str] = None
+    red_card_team: Optional[str] = None
+    requires_multi_bets: bool = False
+    build: Optional[Callable] = None
+
+    def in_window(self, minute) -> bool:
+        return ((self.min_minute is None or minute >= self.min_minute) and
+                (self.max_minute is None or minute <= self.max_minute))
+
+    def score_matches(self, home_goals: int, away_goals: int) -> bool:
+        return self.score is None or bool(self.score(home_goals, away_goals))
+
+    def context_matches(self, volatility: str, last_volatility: Optional[str], red_card_team: Optional[str],
+                        has_multi_bets: bool) -> bool:
+        """Requisitos de contexto (volatilidade, cartão vermelho, múltiplas), indexados por estado de contexto"""
+        if self.volatilities is not None and volatility not in self.volatilities:
+            return False
+        if self.from_volatility is not None and not (
+                last_volatility == self.from_volatility and volatility != self.from_volatility):
+            return False
+        if self.red_card_team is not None and red_card_team != self.red_card_team:
+            return False
+        if self.requires_multi_bets and not has_multi_bets:
+            return False
+        return True
+
+    def accepts(self, condition: MatchCondition, context: ScenarioContext) -> bool:
+        """Todas as verificações da regra para o estado e o contexto (sem o índice)"""
+        if not (self.in_window(condition.minute) and self.score_matches(condition.home_goals, condition.away_goals)):
+            return False
+        if not self.context_matches(*_context_key(context)):
+            return False
+        check = _compile_pressure_filter(self)
+        return check is None or check(condition)
+
+    def emit(self, optimizer, condition: MatchCondition, context: ScenarioContext) -> List[Dict]:
+        """Registros gerados pela regra ativa"""
+        return _compile_emitter(self)(optimizer, condition, context)
+
+
+def _context_key(context: ScenarioContext) -> tuple:
+    red_card = context.red_card_event
+    return (context.volatility, context.last_volatility, red_card['team'] if red_card else None,
+            bool(context.multi_bets))
+
+
+def _compile_pressure_filter(rule: ScenarioRule) -> Optional[Callable[[MatchCondition], bool]]:
+    """Combina em uma função só os limites de pressão da regra (None se não houver)"""
+    checks = []
+    if rule.home_pressure_above is not None:
+        threshold = rule.home_pressure_above
+        checks.append(lambda c: c.home_pressure > threshold)
+    if rule.away_pressure_above is not None:
+        threshold_away = rule.away_pressure_above
+        checks.append(lambda c: c.away_pressure > threshold_away)
+    if rule.losing_pressure_above is not None:
+        threshold_losing = rule.losing_pressure_above
+        checks.append(lambda c: (c.home_pressure > threshold_losing) if c.home_goals < c.away_goals else
+                      (c.away_pressure > threshold_losing) if c.away_goals < c.home_goals else False)
+    if rule.pressures_below is not None:
+        ceiling = rule.pressures_below
+        checks.append(lambda c: c.home_pressure < ceiling and c.away_pressure < ceiling)
+
+    if not checks:
+        return None
+    combined = checks[0]
+    for check in checks[1:]:
+        combined = (lambda first, second: lambda c: first(c) and second(c))(combined, check)
+    return combined
+
+
+def _compile_emitter(rule: ScenarioRule) -> Callable[[object, MatchCondition, ScenarioContext], List[Dict]]:
+    """
+    Gerador de registros da regra: `build` quando declarado; senão o template
+    (textos sem campos são copiados prontos, os demais formatados só quando a regra dispara).
+    """
+    if rule.build is not None:
+        return lambda optimizer, condition, context: rule.build(rule, optimizer, condition, context)
+
+    template = {
+        "bet_type": rule.market,
+        "name": rule.name,
+        "reason": rule.reason,
+        "weight": rule.weight,
+        "min_odd": rule.min_odd
+    }
+    if rule.extra:
+        template.update(rule.extra)
+    templates = tuple(
+        (field, _parse_template(template[field])) for field in ("name", "reason") if '{' in template[field]
+    )
+    if not templates:
+        return lambda optimizer, condition, context: [template.copy()]
+
+    # Textos já formatados por estado (os campos dependem só de quem perde, pressões e minuto)
+    names = tuple(field for field, _ in templates)
+    rendered = {}
+
+    def emit(optimizer, condition, context):
+        key = (condition.home_goals < condition.away_goals, condition.home_pressure,
+               condition.away_pressure, condition.minute)
+        texts = rendered.get(key)
+        if texts is None:
+            fields = _template_fields(condition)
+            texts = tuple(_render_template(parts, fields) for _, parts in templates)
+            if len(rendered) >= RENDERED_TEXTS_PER_RULE:
+                rendered.clear()
+            rendered[key] = texts
+        record = template.copy()
+        record.update(zip(names, texts))
+        return [record]
+    return emit
+
+
+def _parse_template(text: str) -> tuple:
+    """Pré-processa um template str.format em (literal, campo, formato)"""
+    return tuple((literal, name, spec) for literal, name, spec, _ in Formatter().parse(text))
+
+
+def _render_template(parts: tuple, fields: Dict) -> str:
+    out = []
+    for literal, name, spec in parts:
+        out.append(literal)
+        if name is not None:
+            out.append(format(fields[name], spec))
+    return ''.join(out)
+
+
+def _template_fields(condition: MatchCondition) -> Dict:
+    home, away = condition.home_goals, condition.away_goals
+    losing_team = "Casa" if home < away else "Visitante"
+    return {
+        'home_pressure': condition.home_pressure,
+        'away_pressure': condition.away_pressure,
+        'minute': condition.minute,
+        'losing_team': losing_team,
+        'losing_pressure': condition.home_pressure if losing_team == "Casa" else condition.away_pressure
+    }
+
+
+class ScenarioIndex:
+    """
+    Índice dos cenários por máscaras de bits: uma por minuto (índice de
+    intervalos), uma por placar e uma por estado de contexto (volatilidade
+    atual/anterior, cartão vermelho, múltiplas), as duas últimas preenchidas
+    sob demanda. Os candidatos são a interseção das três, guardados por
+    (contexto, minuto, placar); só eles passam pelos limites de pressão,
+    sempre na ordem de declaração das regras.
+    """
+    def __init__(self, rules: Sequence[ScenarioRule] = ()):
+        self.rules: List[ScenarioRule] = []
+        self._compiled: List[tuple] = []
+        self._minute_masks: List[int] = [0] * INDEXED_MINUTES
+        self._score_masks: Dict[tuple, int] = {}
+        self._context_masks: Dict[tuple, int] = {}
+        self._candidates: Dict[tuple, tuple] = {}
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule: ScenarioRule):
+        """Acrescenta uma regra (avaliada depois das já registradas)"""
+        if any(r.key == rule.key for r in self.rules):
+            raise ValueError(f"Cenário duplicado: {rule.key}")
+        bit = 1 << len(self.rules)
+        self.rules.append(rule)
+        self._compiled.append((rule, _compile_pressure_filter(rule), _compile_emitter(rule), rule.build is not None))
+        for minute in range(INDEXED_MINUTES):
+            if rule.in_window(minute):
+                self._minute_masks[minute] |= bit
+        for key in self._score_masks:
+            if rule.score_matches(*key):
+                self._score_masks[key] |= bit
+        for key in self._context_masks:
+            if rule.context_matches(*key):
+                self._context_masks[key] |= bit
+        self._candidates.clear()
+
+    def _mask(self, cache: Optional[Dict], key: tuple, matches: Callable) -> int:
+        mask = cache.get(key) if cache is not None else None
+        if mask is None:
+            mask = 0
+            for i, rule in enumerate(self.rules):
+                if matches(rule, *key):
+                    mask |= 1 << i
+            if cache is not None:
+                cache[key] = mask
+        return mask
+
+    def _compiled_candidates(self, condition: MatchCondition, volatility: str, last_volatility: Optional[str],
+                             red_card_team: Optional[str], has_multi_bets: bool) -> tuple:
+        minute = condition.minute
+        home, away = condition.home_goals, condition.away_goals
+        key = (volatility, last_volatility, red_card_team, has_multi_bets, minute, home, away)
+        found = self._candidates.get(key)
+        if found is None:
+            indexed = type(minute) is int and 0 <= minute < INDEXED_MINUTES
+            minute_mask = self._minute_masks[minute] if indexed else \
+                self._mask(None, (minute,), ScenarioRule.in_window)
+            mask = (minute_mask &
+                    self._mask(self._score_masks, (home, away), ScenarioRule.score_matches) &
+                    self._mask(self._context_masks, key[:4], ScenarioRule.context_matches))
+            found = []
+            while mask:
+                low = mask & -mask
+                found.append(self._compiled[low.bit_length() - 1])
+                mask ^= low
+            found = tuple(found)
+            # Só minutos da tabela entram no cache
+            if indexed:
+                if len(self._candidates) >= CANDIDATE_CACHE_SIZE:
+                    self._candidates.clear()
+                self._candidates[key] = found
+        return found
+
+    def candidates(self, condition: MatchCondition, context: ScenarioContext) -> List[ScenarioRule]:
+        """Regras aceitas pelo índice (minuto, placar e contexto), antes dos limites de pressão"""
+        return [compiled[0] for compiled in self._compiled_candidates(condition, *_context_key(context))]
+
+    def match(self, condition: MatchCondition, context: ScenarioContext) -> List[ScenarioRule]:
+        """Regras ativas para o estado e o contexto"""
+        return [
+            rule for rule, check, _, _ in self._compiled_candidates(condition, *_context_key(context))
+            if check is None or check(condition)
+        ]
+
+    def detect(self, optimizer, condition: MatchCondition, context: ScenarioContext) -> List[Dict]:
+        """Registros de recomendação (sem stake) dos cenários ativos"""
+        return self.detect_state(optimizer, condition, context.volatility, context.multi_bets,
+                                 context.red_card_event, context.last_volatility)
+
+    def detect_state(self, optimizer, condition: MatchCondition, volatility: str, multi_bets: Sequence[Dict] = (),
+                     red_card_event: Optional[Dict] = None, last_volatility: Optional[str] = None) -> List[Dict]:
+        """
+        Igual a detect, com o contexto em argumentos: o ScenarioContext só é
+        montado quando um cenário ativo com `build` precisa dele.
+        """
+        red_card_team = red_card_event['team'] if red_card_event else None
+        has_multi_bets = not not multi_bets
+        candidates = self._candidates.get((volatility, last_volatility, red_card_team, has_multi_bets,
+                                           condition.minute, condition.home_goals, condition.away_goals))
+        if candidates is None:
+            candidates = self._compiled_candidates(condition, volatility, last_volatility,
+                                                   red_card_team, has_multi_bets)
+        if not candidates:
+            return []
+
+        recommendations = []
+        context = None
+        for rule, check, emit, needs_context in candidates:
+            if check is None or check(condition):
+                if needs_context and context is None:
+                    context = ScenarioContext(volatility, multi_bets or (), red_card_event or None, last_volatility)
+                recommendations.extend(emit(optimizer, condition, context))
+        return recommendations
+
+
+# --- Cenários com registro dinâmico ---
+def _build_comeback(rule: ScenarioRule, optimizer, condition: MatchCondition, context: ScenarioContext) -> List[Dict]:
+    """Virada Quântica: favorito (70%) + proteção no empate (30%)"""
+    is_home_favorite = condition.home_pressure > condition.away_pressure
+    main_bet = BetType.HOME_WIN if is_home_favorite else BetType.AWAY_WIN
+    hedge_bet = BetType.DRAW
+    prob_main = optimizer.cached_probability(main_bet, condition)
+    prob_hedge = optimizer.cached_probability(hedge_bet, condition)
+    return [
+        {
+            "bet_type": main_bet,
+            "name": f"Virada Quântica - {'Casa' if is_home_favorite else 'Visitante'} (70%)",
+            "reason": f"Time favorito pressionando para virada (Prob: {prob_main:.1%})",
+            "weight": 0.7 * 1.5,  # 70% do peso original
+            "min_odd": 2.50,
+            "priority": "Alta",
+            "quantum_moment": True
+        },
+        {
+            "bet_type": hedge_bet,
+            "name": "Proteção Empate (30%)",
+            "reason": f"Proteção contra empate (Prob: {prob_hedge:.1%})",
+            "weight": 0.3 * 1.5,  # 30% do peso original
+            "min_odd": 3.50,
+            "priority": "Média",
+            "hedge_protection": True
+        }
+    ]
+
+
+def _build_safety_hedge(rule: ScenarioRule, optimizer, condition: MatchCondition, context: ScenarioContext) -> List[Dict]:
+    """Hedge de Segurança: múltiplas de 3+ pernas com apenas um mercado pendente"""
+    recommendations = []
+    for multi_bet in context.multi_bets:
+        if len(multi_bet['bets']) < 3:
+            continue
+        remaining_legs = [leg for leg in multi_bet['bets'] if not is_bet_won(leg, condition)]
+        if len(remaining_legs) != 1:
+            continue
+        hedge_bet = get_hedge_market(remaining_legs[0])
+        if hedge_bet:
+            recommendations.append({
+                "bet_type": hedge_bet,
+                "name": f"Hedge de Segurança para {multi_bet['name']}",
+                "reason": (
+                    f"Aposta múltipla prestes a ser ganha com apenas 1 mercado pendente. "
+                    f"Proteja seu lucro apostando no oposto: {hedge_bet.value}."
+                ),
+                "weight": 1.3,
+                "min_odd": 1.80,
+                "priority": "Crítica",
+                "hedge_required": True
+            })
+    return recommendations
+
+
+# Cenários ao vivo na ordem de avaliação (a ordem define a ordem das recomendações)
+SCENARIO_RULES = (
+    # 1️⃣ Virada Quântica: time perdendo com pressão > 75% entre 60' e 75'
+    ScenarioRule(
+        key='quantum_comeback', min_minute=60, max_minute=75,
+        score=lambda home, away: home != away, losing_pressure_above=0.75,
+        build=_build_comeback
+    ),
+    # 2️⃣ Hedge de Segurança para múltiplas
+    ScenarioRule(
+        key='safety_hedge', min_minute=80,
+        score=lambda home, away: home + away <= 2, requires_multi_bets=True,
+        build=_build_safety_hedge
+    ),
+    # 3️⃣ Efeito Cartão Vermelho (evento simulado)
+    ScenarioRule(
+        key='red_card_home', market=BetType.UNDER_25,
+        name="Efeito Cartão Vermelho - Menos Gols (Casa com 1 a menos)",
+        reason="Cartão vermelho para o time da casa. Expectativa de jogo mais fechado.",
+        weight=1.4, min_odd=1.60,
+        extra={'stake': 100.00, 'odd': 1.85, 'prob': 0.55, 'strategy': "Estratégia descritiva", "priority": "Alta"},
+        score=lambda home, away: abs(home - away) <= 1, red_card_team='HOME'
+    ),
+    ScenarioRule(
+        key='red_card_away', market=BetType.AWAY_HANDICAP,
+        name="Efeito Cartão Vermelho - Handicap Visitante",
+        reason="Cartão vermelho para o visitante. Favorito deve ampliar vantagem.",
+        weight=1.2, min_odd=1.80, extra={"priority": "Média"},
+        score=lambda home, away: abs(home - away) <= 1, red_card_team='AWAY'
+    ),
+    # 4️⃣ Jogo com 1 gol e estável no intervalo
+    ScenarioRule(
+        key='halftime_one_goal', market=BetType.UNDER_25,
+        name="Menos de 2.5 Gols (Total)",
+        reason="Mercado estável e apenas 1 gol no 1º tempo. A tendência defensiva deve se manter.",
+        weight=1.1, min_odd=1.50,
+        min_minute=40, max_minute=50, score=lambda home, away: home + away == 1,
+        volatilities=frozenset({"Estável"})
+    ),
+    # 5️⃣ Pressão forte do favorito no início
+    ScenarioRule(
+        key='early_favourite_pressure', market=BetType.BOTH_TO_SCORE_NO,
+        name="Ambas as Equipes Marcam - Não",
+        reason=("Pressão massiva do favorito ({home_pressure:.0%}) em mercado volátil. "
+                "Aposta protege contra um gol unilateral."),
+        weight=0.9, min_odd=1.60,
+        max_minute=25, home_pressure_above=0.70, volatilities=frozenset({"Caótico"})
+    ),
+    # 6️⃣ Pressão forte do azarão no início
+    ScenarioRule(
+        key='early_underdog_pressure', market=BetType.NEXT_GOAL_AWAY,
+        name="Próximo Gol - Visitante (Azarão)",
+        reason="Pressão surpreendente do azarão ({away_pressure:.0%}). Valor na odd do próximo gol.",
+        weight=0.8, min_odd=2.00,
+        max_minute=25, away_pressure_above=0.70, volatilities=frozenset({"Caótico"})
+    ),
+    # 7️⃣ Empate equilibrado no intervalo
+    ScenarioRule(
+        key='halftime_draw', market=BetType.DRAW,
+        name="Resultado Final - Empate",
+        reason=("Jogo empatado e equilibrado no intervalo. "
+                "A probabilidade de o resultado se manter é significativa."),
+        weight=0.7, min_odd=3.50,
+        min_minute=40, max_minute=50, score=lambda home, away: home == 1 and away == 1,
+        volatilities=frozenset({"Estável", "Transição"})
+    ),
+    # 8️⃣ Pressão inversa ao placar (time perdendo pressionando)
+    ScenarioRule(
+        key='losing_team_pressure', market=BetType.NEXT_GOAL_LOSING_TEAM,
+        name="Próximo Gol - {losing_team} (Time Perdendo)",
+        reason=("Time perdendo ({losing_team}) com pressão alta ({losing_pressure:.0%}). "
+                "Boa oportunidade para contra-ataque."),
+        weight=0.9, min_odd=2.20,
+        score=lambda home, away: home != away, losing_pressure_above=0.6
+    ),
+    # 9️⃣ Mudança brusca de volatilidade (Estável -> Caótico, a partir do 2º minuto)
+    ScenarioRule(
+        key='volatility_shift', market=BetType.GOAL_NEXT_5_MIN,
+        name="Gol nos próximos 5 minutos",
+        reason="Mudança brusca para mercado Caótico. Alta probabilidade de gol em curto prazo.",
+        weight=1.4, min_odd=2.50,  # Peso alto para eventos iminentes
+        min_minute=2, volatilities=frozenset({"Caótico"}), from_volatility="Estável"
+    ),
+    # 🔟 Partida morna (sem chances claras)
+    ScenarioRule(
+        key='quiet_match', market=BetType.NO_MORE_GOALS,
+        name="Sem mais gols na partida",
+        reason="Jogo com baixa intensidade e poucas finalizações nos últimos 15 minutos.",
+        weight=1.2, min_odd=2.00,
+        min_minute=60, score=lambda home, away: home + away <= 1, pressures_below=0.4
+    ),
+)
+
+# Índice padrão usado pelo RecommendationEngine
+SCENARIO_INDEX = ScenarioIndex(SCENARIO_RULES)
@@ -0,0 +1,168 @@
+# project/startup.py
+import argparse
+import builtins
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+# Meta de tempo até a primeira renderização da tela de capital (processo novo, ms)
+FIRST_RENDER_BUDGET_MS = 600.0
+
+# Modo de perfil da inicialização: FLUX_PROFILE_STARTUP=1 streamlit run main.py
+PROFILE_ENV = 'FLUX_PROFILE_STARTUP'
+
+# Momento em que o script começou a carregar (referência da primeira renderização)
+STARTED_AT = time.perf_counter()
+
+
+class ImportProfiler:
+    """
+    Mede o tempo de cada módulo importado pela primeira vez (próprio e acumulado,
+    como `python -X importtime`) envolvendo builtins.__import__. Serve para o
+    processo do Streamlit, onde o app é importado já com o servidor rodando.
+    """
+    def __init__(self):
+        self.records: Dict[str, Tuple[int, int]] = {}
+        self._original = None
+        self._local = threading.local()
+
+    @property
+    def installed(self) -> bool:
+        return self._original is not None
+
+    def install(self):
+        if self._original is None:
+            self._original = builtins.__import__
+            builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original
+        if level or name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0)
+        start = time.perf_counter_ns()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.records.setdefault(name, (elapsed - children, elapsed))
+
+    def report(self, top: int = 20) -> List[Tuple[str, float, float]]:
+        """(módulo, próprio ms, acumulado ms) dos `top` imports mais caros"""
+        rows = sorted(self.records.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        return [(name, own / 1e6, total / 1e6) for name, (own, total) in rows]
+
+
+IMPORT_PROFILER = ImportProfiler()
+_first_render_logged = False
+
+
+def profiling_enabled() -> bool:
+    return os.environ.get(PROFILE_ENV, '0') not in ('', '0', 'false')
+
+
+def mark_first_render(screen: str = 'capital_input'):
+    """Registra o tempo até a primeira renderização (uma vez por processo) e, no modo de perfil, o detalhamento"""
+    global _first_render_logged
+    if _first_render_logged:
+        return
+    _first_render_logged = True
+    elapsed_ms = (time.perf_counter() - STARTED_AT) * 1000
+
+    from metrics import METRICS
+    if METRICS.enabled:
+        METRICS.observe(f'startup.first_render.{screen}', int(elapsed_ms * 1e6))
+    if not profiling_enabled():
+        return
+
+    status = 'dentro' if elapsed_ms <= FIRST_RENDER_BUDGET_MS else 'ACIMA'
+    lines = [f"Primeira renderização ({screen}): {elapsed_ms:.0f} ms ({status} da meta de {FIRST_RENDER_BUDGET_MS:.0f} ms)"]
+    lines.extend(_format_rows(IMPORT_PROFILER.report()))
+    print('\n'.join(lines), file=sys.stderr, flush=True)
+
+
+def _format_rows(rows) -> List[str]:
+    lines = [f"{'Acumulado (ms)':>15}{'Próprio (ms)':>14}  Módulo"]
+    for name, own, total in rows:
+        lines.append(f"{total:>15.1f}{own:>14.1f}  {name}")
+    return lines
+
+
+def import_times(module: str = 'main') -> List[Tuple[str, float, float]]:
+    """Detalhamento de `python -X importtime -c 'import <module>'` num processo novo"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, total, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(own) / 1e3, int(total) / 1e3))
+    return rows
+
+
+_FIRST_RENDER_SCRIPT = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file({path!r}, default_timeout=60).run()
+elapsed = (time.perf_counter() - start) * 1000
+ok = not at.exception and any(w.key == 'capital_input' for w in at.number_input)
+print(f"{{elapsed:.3f}} {{int(ok)}}")
+"""
+
+
+def measure_first_render(runs: int = 3) -> List[float]:
+    """
+    Tempo (ms) da primeira execução do main.py até a tela de capital, cada
+    medição num processo novo (imports a frio, exceto o próprio Streamlit).
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', _FIRST_RENDER_SCRIPT.format(path=path)],
+                                capture_output=True, text=True)
+        try:
+            elapsed, ok = result.stdout.split()[-2:]
+        except ValueError:
+            raise RuntimeError(f"Falha ao medir a primeira renderização:\n{result.stderr[-2000:]}") from None
+        if ok != '1':
+            raise RuntimeError("A tela de capital não foi renderizada")
+        samples.append(float(elapsed))
+    return samples
+
+
+if __name__ == "__main__":
+    # Uso: python -m startup [--module main] [--top 20] [--runs 3] [--budget-ms 600]
+    parser = argparse.ArgumentParser(description="Perfil de inicialização: imports e tempo até a primeira renderização")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=FIRST_RENDER_BUDGET_MS)
+    args = parser.parse_args()
+
+    rows = sorted(import_times(args.module), key=lambda r: r[2], reverse=True)[:args.top]
+    print('\n'.join(_format_rows(rows)))
+
+    samples = measure_first_render(args.runs)
+    best = min(samples)
+    print(f"Primeira renderização da tela de capital: {', '.join(f'{s:.0f}' for s in samples)} ms "
+          f"(melhor {best:.0f} ms, meta {args.budget_ms:.0f} ms)")
+    sys.exit(0 if best <= args.budget_ms else 1)
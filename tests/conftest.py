@@ -0,0 +1,7 @@
+# project/tests/conftest.py
+
+import os
+import sys
+
+# Os módulos do projeto são importados pelo nome (config, quantum, ...), como no app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
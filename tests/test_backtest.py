@@ -0,0 +1,32 @@
+# project/tests/test_backtest.py
+
+import pandas as pd
+from backtest import _settle, read_fixtures
+from config import BetType
+
+
+def _events(tmp_path, half=True):
+    rows = [
+        {'match_id': 1, 'event': 'goal', 'minute': 30, 'team': 'home', 'half': 1},
+        {'match_id': 1, 'event': 'goal', 'minute': 47, 'team': 'away', 'half': 1},  # 45+2
+        {'match_id': 1, 'event': 'goal', 'minute': 60, 'team': 'home', 'half': 2},
+        {'match_id': 1, 'event': 'full_time', 'minute': 94, 'team': None, 'half': 2}
+    ]
+    frame = pd.DataFrame(rows)
+    if not half:
+        frame = frame.drop(columns='half')
+    path = tmp_path / 'events.csv'
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def test_first_half_goals_use_half_column(tmp_path):
+    (fixture,) = read_fixtures(_events(tmp_path))
+    assert fixture['first_half_goals'] == (1, 1)
+    assert _settle(fixture, [BetType.OVER_15_FH], 0, True)
+
+
+def test_first_half_goals_by_minute_without_half_column(tmp_path):
+    (fixture,) = read_fixtures(_events(tmp_path, half=False))
+    assert fixture['first_half_goals'] == (1, 0)
+    assert not _settle(fixture, [BetType.OVER_15_FH], 0, True)
@@ -0,0 +1,156 @@
+# project/tests/test_bridge.py
+
+import threading
+import numpy as np
+import pytest
+from bridge import RecommendationWorker, SharedBridge, unpack_recommendations
+from config import BetPortfolio, BetType, MatchCondition, QuantumBet
+from monitor import MatchBoard
+from portfolio import PortfolioStore
+from quantum.cache import ProbabilityCache
+from quantum.optimizer import QuantumOptimizer
+from recommendations import PortfolioSnapshot, RecommendationEngine
+
+# Campos comparados entre o worker e o cálculo local
+CHECK_FIELDS = ('bet_type', 'name', 'stake', 'odd', 'prob', 'ev', 'protection_ratio')
+
+# Estados (placar, minuto, pressão da casa, volatilidade) que geram recomendações em
+# mercados do portfólio, cuja odd depende da aposta inicial da partida
+MATCHES = (
+    ('1-0', 10, 0.3, 'Estável'),
+    ('1-0', 40, 0.3, 'Estável'),
+    ('0-1', 70, 0.8, 'Estável'),
+    ('0-0', 10, 0.8, 'Caótico'),
+    ('1-1', 55, 0.5, 'Transição')
+)
+
+PORTFOLIO = BetPortfolio(100.0, {
+    BetType.UNDER_25: QuantumBet(BetType.UNDER_25, 12.0, 1.9, 0.5),
+    BetType.HOME_WIN: QuantumBet(BetType.HOME_WIN, 8.0, 2.1, 0.45),
+    BetType.DRAW: QuantumBet(BetType.DRAW, 6.0, 3.2, 0.3)
+})
+
+
+@pytest.fixture
+def engine():
+    return RecommendationEngine(QuantumOptimizer(probability_cache=ProbabilityCache()))
+
+
+@pytest.fixture
+def bridge():
+    with SharedBridge(capacity=(64, 64, 16, 512)) as bridge:
+        yield bridge
+
+
+def _board(order):
+    board = MatchBoard(PortfolioSnapshot.from_portfolio(PORTFOLIO))
+    for i in order:
+        score, minute, home_pressure, volatility = MATCHES[i]
+        home, away = map(int, score.split('-'))
+        board.add(f"m{i}", board.default_portfolio,
+                  MatchCondition(home_goals=home, away_goals=away, minute=minute,
+                                 home_pressure=home_pressure, away_pressure=1 - home_pressure),
+                  volatility=volatility)
+    return board
+
+
+def _assert_worker_matches_local(bridge, board, engine):
+    board.refresh(engine)
+    _, packed = bridge.read_recommendations()
+    remote = unpack_recommendations(packed, len(board))
+    local = [[{field: rec[field] for field in CHECK_FIELDS} for rec in recs] for recs in board.recommendations]
+    assert remote == local
+    assert any(local)
+
+
+def _worker(bridge, engine):
+    """Worker conectado ao segmento por outra visão, como num processo separado"""
+    return RecommendationWorker(SharedBridge.attach(bridge.name), engine)
+
+
+def test_worker_matches_local_board(bridge, engine):
+    board = _board(range(len(MATCHES)))
+    bridge.publish_portfolio(PortfolioStore.from_portfolio(PORTFOLIO), PORTFOLIO.capital)
+    bridge.publish_matches(board)
+
+    worker = _worker(bridge, engine)
+    try:
+        assert worker.step() == len(MATCHES)
+        _assert_worker_matches_local(bridge, board, engine)
+        assert worker.step() == 0  # nada mudou
+    finally:
+        worker.bridge.close()
+
+
+def test_worker_after_matches_removed_and_reordered(bridge, engine):
+    bridge.publish_portfolio(PortfolioStore.from_portfolio(PORTFOLIO), PORTFOLIO.capital)
+    bridge.publish_matches(_board(range(len(MATCHES))))
+    worker = _worker(bridge, engine)
+    try:
+        worker.step()
+
+        board = _board([4, 2, 0, 3])
+        bridge.publish_matches(board)
+        worker.step()
+        assert sorted(worker.board.match_ids) == ['m0', 'm2', 'm3', 'm4']
+        _assert_worker_matches_local(bridge, board, engine)
+    finally:
+        worker.bridge.close()
+
+
+def test_capacity_overflow_is_rejected():
+    with pytest.raises(ValueError):
+        SharedBridge(capacity=(1, 1, 1))
+
+    with SharedBridge(capacity=(2, 2, 2, 2)) as bridge:
+        store = PortfolioStore.from_portfolio(PORTFOLIO)
+        with pytest.raises(ValueError, match='Posições'):
+            bridge.publish_portfolio(store)
+        with pytest.raises(ValueError, match='Partidas'):
+            bridge.publish_matches(_board(range(3)))
+        recommendation = {'bet_type': BetType.UNDER_25, 'name': 'Cenário'}
+        with pytest.raises(ValueError, match='Recomendações'):
+            bridge.publish_recommendations([[recommendation] * 3])
+        with pytest.raises(ValueError, match='match_id'):
+            board = MatchBoard()
+            board.add('x' * 40, PortfolioSnapshot(10.0, {}, ()))
+            bridge.publish_matches(board)
+        # Publicações recusadas não tocam nas regiões
+        assert bridge.version('portfolio') == bridge.version('matches') == bridge.version('recommendations') == 0
+
+
+def test_seqlock_reader_never_sees_partial_write(bridge):
+    """Cada publicação grava o mesmo minuto e versão em todas as linhas: uma leitura nunca mistura duas"""
+    board = MatchBoard(PortfolioSnapshot(10.0, {}, ()))
+    for i in range(16):
+        board.add(f"m{i}", board.default_portfolio)
+    stop = threading.Event()
+
+    def writer():
+        generation = 0
+        while not stop.is_set():
+            generation += 1
+            board.version[:len(board)] = generation
+            board.conditions['minute'][:len(board)] = generation % 120
+            board.probabilities[:len(board)] = generation
+            bridge.publish_matches(board)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    reader = SharedBridge.attach(bridge.name)
+    try:
+        reads = 0
+        while reads < 2000:
+            _, state = reader.read_matches()
+            if len(state) == 0:
+                continue
+            generation = int(state['version'][0])
+            assert (state['version'] == generation).all()
+            assert (state['condition']['minute'] == generation % 120).all()
+            assert (state['probabilities'] == generation).all()
+            reads += 1
+    finally:
+        stop.set()
+        thread.join()
+        reader.close()
+    assert bridge.version('matches') > 1
@@ -0,0 +1,141 @@
+# project/tests/test_journal.py
+
+import asyncio
+import json
+import random
+import pytest
+import journal
+from config import BetType, QuantumBet
+from event_manager import EventManager
+from journal import JournalReader, JournalWriter, replay_match_day
+from live_feed import LiveFeed, replay_lines
+from quantum.cache import ProbabilityCache
+from quantum.optimizer import QuantumOptimizer
+from recommendations import PortfolioSnapshot, RecommendationEngine
+
+PORTFOLIO = PortfolioSnapshot(100.0, {
+    BetType.UNDER_25: QuantumBet(BetType.UNDER_25, 20.0, 1.85, 0.58, 17.0),
+    BetType.WINNER: QuantumBet(BetType.WINNER, 15.0, 2.1, 0.65, 16.5)
+}, ())
+
+
+@pytest.fixture
+def bus():
+    EventManager._instance = None
+    bus = EventManager()
+    yield bus
+    bus.shutdown()
+    EventManager._instance = None
+
+
+def _write(path, events, **options):
+    with JournalWriter(path, fsync=False, **options) as writer:
+        for topic, data in events:
+            writer.record(topic, data)
+
+
+def _read(path):
+    with JournalReader(path) as reader:
+        return [(record.topic, record.data) for record in reader], dict(reader.topics), reader.valid_end
+
+
+def test_reopen_truncates_torn_record_and_keeps_topic_ids(tmp_path):
+    path = str(tmp_path / 'dia.flux')
+    _write(path, [('goal', {'minute': 10}), ('odds_tick', 1.85), ('goal', {'minute': 20})])
+    _, topics, valid_end = _read(path)
+
+    # Gravação interrompida: cabeçalho e parte do payload de um registro
+    with open(path, 'ab') as f:
+        f.write(journal._RECORD.pack(100, 0, 0, 0) + b'\x80\x05')
+
+    _write(path, [('odds_tick', 1.9), ('red_card', {'team': 'away'})])
+    events, reopened_topics, end = _read(path)
+
+    assert events == [('goal', {'minute': 10}), ('odds_tick', 1.85), ('goal', {'minute': 20}),
+                      ('odds_tick', 1.9), ('red_card', {'team': 'away'})]
+    # Tópicos existentes mantêm o id (sem nova definição); só o novo ganha id
+    assert {name: topic_id for topic_id, name in reopened_topics.items()} == {'goal': 0, 'odds_tick': 1, 'red_card': 2}
+    assert {k: v for k, v in reopened_topics.items() if k in topics} == topics
+    assert end > valid_end and end == (tmp_path / 'dia.flux').stat().st_size
+
+
+def test_reader_stops_at_crc_mismatch(tmp_path):
+    path = str(tmp_path / 'dia.flux')
+    _write(path, [('pressure', {'minute': minute}) for minute in range(5)])
+    ends = []
+    with JournalReader(path) as reader:
+        for _ in reader:
+            ends.append(reader.valid_end)
+
+    # Corrompe o primeiro byte do payload do terceiro evento
+    with open(path, 'r+b') as f:
+        offset = ends[1] + journal._RECORD.size
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    events, _, valid_end = _read(path)
+    assert events == [('pressure', {'minute': 0}), ('pressure', {'minute': 1})]
+    assert valid_end == ends[1]
+
+
+def _match_day(matches: int, seed: int = 0):
+    """Eventos de um dia de jogos, intercalados por minuto entre as partidas"""
+    rng = random.Random(seed)
+    events = []
+    for minute in range(0, 91, 3):
+        for match in range(matches):
+            match_id = f"m{match}"
+            events.append({'match_id': match_id, 'event': 'minute', 'minute': minute})
+            roll = rng.random()
+            if roll < 0.08:
+                events.append({'match_id': match_id, 'event': 'goal', 'minute': minute,
+                               'team': rng.choice(('home', 'away'))})
+            elif roll < 0.3:
+                events.append({'match_id': match_id, 'event': 'pressure', 'minute': minute,
+                               'home_pressure': round(rng.random(), 2), 'away_pressure': round(rng.random(), 2)})
+            elif roll < 0.35:
+                events.append({'match_id': match_id, 'event': 'volatility', 'minute': minute,
+                               'volatility': rng.choice(('Estável', 'Transição', 'Caótico'))})
+            elif roll < 0.37:
+                events.append({'match_id': match_id, 'event': 'red_card', 'minute': minute,
+                               'team': rng.choice(('home', 'away'))})
+    events += [{'match_id': f"m{match}", 'event': 'full_time', 'minute': 90} for match in range(matches)]
+    return events
+
+
+def test_replay_match_day_rebuilds_live_board(tmp_path, bus):
+    path = str(tmp_path / 'dia.flux')
+    engine = RecommendationEngine(QuantumOptimizer(probability_cache=ProbabilityCache()))
+    events = _match_day(20)
+    latest = {}
+
+    async def run_live():
+        feed = LiveFeed(engine, bus=bus)
+        for match in range(20):
+            feed.track(f"m{match}", PORTFOLIO)
+        feed.subscribe(lambda update: latest.__setitem__(update.match_id, update))
+        await feed.consume(replay_lines(json.dumps(event) for event in events))
+        await feed.join()
+        await feed.close()
+        return feed
+
+    with JournalWriter(path, fsync=False).attach(bus):
+        feed = asyncio.run(run_live())
+
+    from monitor import MatchBoard
+    board = replay_match_day(path, MatchBoard(PORTFOLIO), engine)
+    assert len(board) == 20
+    for match_id, match in feed.matches.items():
+        row = board.row(match_id)
+        summary = board.summary(row)
+        condition = match.condition
+        assert summary['score'] == condition.score and summary['minute'] == condition.minute
+        assert summary['home_pressure'] == pytest.approx(condition.home_pressure)
+        assert summary['away_pressure'] == pytest.approx(condition.away_pressure)
+        assert summary['volatility'] == match.volatility
+        assert summary['finished'] == match.finished
+        assert summary['red_card'] == (match.red_card_event or {}).get('team')
+        live = {(rec['bet_type'], rec['name']) for rec in latest[match_id].recommendations} if match_id in latest else set()
+        assert {(rec['bet_type'], rec['name']) for rec in board.recommendations[row]} == live
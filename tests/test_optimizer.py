@@ -0,0 +1,62 @@
+# project/tests/test_optimizer.py
+
+import pytest
+from config import BetType, MatchCondition, QuantumState
+from quantum.cache import WarmStartCache
+from quantum.optimizer import QuantumOptimizer
+
+ODDS = {
+    BetType.UNDER_25: 1.9,
+    BetType.OVER_15_MATCH: 1.4,
+    BetType.BOTH_TO_SCORE: 2.0,
+    BetType.DOUBLE_CHANCE_UNDERDOG: 1.8,
+    BetType.OVER_15_FH: 2.0,
+    BetType.WINNER: 2.1
+}
+
+
+@pytest.fixture
+def optimizer():
+    return QuantumOptimizer()
+
+
+def test_warm_start_not_reused_when_context_changes(optimizer):
+    """Mesmas odds, mas placar, minuto, estado e objetivo diferentes: a solução é recalculada"""
+    warm_starts = WarmStartCache()
+    optimizer.optimize_portfolio_correlated(ODDS, MatchCondition(score='0-0', minute=10), QuantumState.ESTAVEL,
+                                            fixture_id=1, warm_starts=warm_starts)
+    late = dict(condition=MatchCondition(score='2-1', minute=80), quantum_state=QuantumState.CAOTICO,
+                objective='mean_variance', risk_aversion=10.0)
+
+    warm = optimizer.optimize_portfolio_correlated(ODDS, fixture_id=1, warm_starts=warm_starts, **late)
+    cold = optimizer.optimize_portfolio_correlated(ODDS, **late)
+
+    assert not warm.info['reused'] and warm.info['warm_start']
+    for bet_type, weight in cold.weights.items():
+        assert warm.weights[bet_type] == pytest.approx(weight, abs=1e-4)
+
+
+def test_warm_start_reused_for_small_odds_tick(optimizer):
+    warm_starts = WarmStartCache()
+    condition = MatchCondition(score='1-0', minute=30)
+    first = optimizer.optimize_portfolio_correlated(ODDS, condition, QuantumState.ESTAVEL,
+                                                    fixture_id='a', warm_starts=warm_starts)
+    ticked = {bt: odd * 1.001 for bt, odd in ODDS.items()}
+    second = optimizer.optimize_portfolio_correlated(ticked, condition, QuantumState.ESTAVEL,
+                                                     fixture_id='a', warm_starts=warm_starts)
+    assert second.info['reused'] and second.weights == first.weights
+
+
+def test_warm_start_cache_is_bounded():
+    warm_starts = WarmStartCache(maxsize=2)
+    for fixture_id in range(5):
+        warm_starts.put(fixture_id, {})
+    assert len(warm_starts) == 2 and warm_starts.get(0) is None and warm_starts.get(4) == {}
+
+
+def test_reload_parameters_keeps_league():
+    optimizer = QuantumOptimizer(league='brasileirao')
+    optimizer.reload_parameters()
+    assert optimizer.league == 'brasileirao'
+    optimizer.reload_parameters(league='premier')
+    assert optimizer.league == 'premier'
@@ -0,0 +1,158 @@
+# project/tests/test_persistence.py
+
+import struct
+import threading
+import time
+import numpy as np
+import pytest
+import persistence
+from config import BetPortfolio, BetType, QuantumBet, QuantumState
+from persistence import AutoSaver, SNAPSHOT_VERSION, dumps, loads, restore, write_snapshot
+
+
+def _session_state():
+    """Estado como o do app depois das três fases"""
+    initial = {
+        BetType.UNDER_25: QuantumBet(BetType.UNDER_25, 18.0, 1.85, 0.58, 15.3),
+        BetType.WINNER: QuantumBet(BetType.WINNER, 12.5, 2.15, 0.65, 14.375)
+    }
+    combo = (BetType.UNDER_25, BetType.WINNER)
+    return {
+        'portfolio': BetPortfolio(
+            capital=100.0,
+            initial_bets=initial,
+            multi_bets=[{'combo': combo, 'amount': 9.3, 'odd': 3.98}],
+            in_play_bets={BetType.DOUBLE_CHANCE_UNDERDOG: QuantumBet(BetType.DOUBLE_CHANCE_UNDERDOG, 4.5, 1.75, 0.2)}
+        ),
+        'current_phase': 'in_play',
+        'initial_odds_state': {
+            'odds': {BetType.UNDER_25: np.float64(1.85), BetType.WINNER: 2.15},
+            'allocations': {BetType.UNDER_25: np.float32(0.6), BetType.WINNER: 0.4},
+            'confirmed': True
+        },
+        'initial_odds_confirmed': np.bool_(True),
+        'multi_bets_state': {
+            'selected_combos': [combo],
+            'manual_odds': {combo: 3.98},
+            'calculated_amounts': np.array([9.3, 0.0, -1.5]),
+            'counts': np.arange(6, dtype=np.int16).reshape(2, 3),
+            'index': np.int64(-3)
+        },
+        'multi_bets_confirmed': True,
+        'in_play_confirmed': False,
+        'in_play_state': {'score': '1-0', 'minute': 67, 'volatility': QuantumState.CAOTICO.value,
+                          'state': QuantumState.CAOTICO, 'big': 2**40, 'negative': -12},
+        'red_card_event': {'team': 'away', 'minute': 55},
+        'widget_key': 'não faz parte do snapshot'
+    }
+
+
+def test_round_trip_session_state():
+    state = _session_state()
+    restored = loads(dumps(state))
+
+    assert set(restored) == set(persistence.SNAPSHOT_KEYS)
+    assert restored['portfolio'] == state['portfolio']
+    assert restored['in_play_state'] == state['in_play_state']
+    assert restored['red_card_event'] == state['red_card_event']
+    assert restored['initial_odds_confirmed'] is True
+    assert restored['initial_odds_state']['odds'] == {BetType.UNDER_25: 1.85, BetType.WINNER: 2.15}
+    assert restored['initial_odds_state']['allocations'][BetType.UNDER_25] == pytest.approx(0.6)
+
+    multi = restored['multi_bets_state']
+    assert multi['selected_combos'] == [(BetType.UNDER_25, BetType.WINNER)]
+    assert isinstance(multi['selected_combos'][0], tuple)
+    assert multi['manual_odds'] == {(BetType.UNDER_25, BetType.WINNER): 3.98}
+    assert multi['index'] == -3
+    for key in ('calculated_amounts', 'counts'):
+        assert multi[key].dtype == state['multi_bets_state'][key].dtype
+        np.testing.assert_array_equal(multi[key], state['multi_bets_state'][key])
+
+
+def test_unsupported_type_is_rejected():
+    with pytest.raises(ValueError):
+        dumps({'in_play_state': {'callback': object()}})
+
+
+def test_truncated_snapshot_is_rejected():
+    data = dumps(_session_state())
+    for size in (0, 10, len(data) - 1):
+        with pytest.raises(ValueError):
+            loads(data[:size])
+
+
+def test_corrupted_snapshot_is_rejected():
+    data = bytearray(dumps(_session_state()))
+    data[-5] ^= 0xFF
+    with pytest.raises(ValueError, match='crc32'):
+        loads(bytes(data))
+
+    with pytest.raises(ValueError):
+        loads(b'NOTASNAP' + bytes(data[8:]))
+
+
+def test_invalid_body_with_valid_crc_is_rejected():
+    """Corpo cortado no meio de um valor (crc recalculado) vira ValueError, não IndexError"""
+    data = dumps(_session_state())
+    header = persistence._HEADER
+    magic, version, _, _ = header.unpack_from(data, 0)
+    body = data[header.size:header.size + 40]
+    with pytest.raises(ValueError):
+        loads(header.pack(magic, version, persistence.zlib.crc32(body), len(body)) + body)
+
+
+def test_other_version_is_rejected():
+    data = dumps(_session_state())
+    header = persistence._HEADER
+    magic, _, crc, size = header.unpack_from(data, 0)
+    with pytest.raises(ValueError, match='Versão'):
+        loads(header.pack(magic, SNAPSHOT_VERSION + 1, crc, size) + data[header.size:])
+
+
+def test_restore_ignores_unreadable_snapshot(tmp_path):
+    path = str(tmp_path / 'sessao.flux')
+    assert restore(path) is None
+    write_snapshot(path, dumps(_session_state())[:-3])
+    assert restore(path) is None
+
+
+def test_autosaver_coalesces_writes(tmp_path):
+    saver = AutoSaver(delay=0.05, max_delay=1.0)
+    path = str(tmp_path / 'sessao.flux')
+    snapshots = [dumps({'in_play_state': {'minute': minute}}) for minute in range(10)]
+    for data in snapshots:
+        assert saver.schedule(path, data)
+
+    deadline = time.monotonic() + 5
+    while saver.writes == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    assert saver.writes == 1
+    assert restore(path) == {'in_play_state': {'minute': 9}}
+    # Mesmo conteúdo do último gravado: nada a fazer
+    assert saver.schedule(path, snapshots[-1]) is False
+
+
+def test_flush_never_overwrites_newer_snapshot(tmp_path, monkeypatch):
+    """A thread grava um snapshot antigo devagar; flush com um mais novo deve terminar por último"""
+    path = str(tmp_path / 'sessao.flux')
+    old, new = dumps({'current_phase': 'multi_bets'}), dumps({'current_phase': 'in_play'})
+    writing = threading.Event()
+    original = persistence.write_snapshot
+
+    def slow_write(target, data):
+        if data == old:
+            writing.set()
+            time.sleep(0.2)
+        original(target, data)
+
+    monkeypatch.setattr(persistence, 'write_snapshot', slow_write)
+    saver = AutoSaver(delay=0.0, max_delay=0.0)
+    saver.schedule(path, old)
+    assert writing.wait(5)
+    saver.schedule(path, new)
+    saver.flush()
+
+    time.sleep(0.05)
+    assert restore(path) == {'current_phase': 'in_play'}
+    assert saver.writes == 2
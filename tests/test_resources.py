@@ -0,0 +1,43 @@
+# project/tests/test_resources.py
+
+import json
+import os
+import numpy as np
+from config import BET_TYPES
+from quantum.surface import SURFACE_FORMAT_VERSION
+from resources import RESOURCES, shared_optimizer, shared_surface
+
+
+def _write_surface(path, fingerprint='sem-parametros'):
+    np.save(path, np.zeros((len(BET_TYPES), 1, 1, 1, 1, 1), dtype=np.float32))
+    metadata = {'format_version': SURFACE_FORMAT_VERSION, 'bet_types': [bt.name for bt in BET_TYPES],
+                'historical_data': fingerprint}
+    with open(os.path.splitext(path)[0] + '.json', 'w', encoding='utf-8') as f:
+        json.dump(metadata, f)
+
+
+def test_shared_surface_is_versioned_by_file(tmp_path):
+    path = str(tmp_path / 'probability_surface.npy')
+    assert shared_surface(path) is None
+
+    _write_surface(path)
+    first = shared_surface(path)
+    assert first is not None and shared_surface(path) is first
+
+    # Novo build (tamanho e mtime diferentes) reabre o arquivo
+    np.save(path, np.zeros((len(BET_TYPES), 1, 1, 1, 1, 2), dtype=np.float32))
+    os.utime(path, ns=(0, 0))
+    assert shared_surface(path) is not first
+    RESOURCES.invalidate(f"surface:{path}")
+
+
+def test_shared_optimizer_rebuilt_when_surface_changes(tmp_path):
+    parameters = str(tmp_path / 'parameters.json')
+    path = str(tmp_path / 'probability_surface.npy')
+    optimizer = shared_optimizer(parameters, surface_path=path)
+    assert optimizer.surface is None and shared_optimizer(parameters, surface_path=path) is optimizer
+
+    _write_surface(path, fingerprint=optimizer.parameters_fingerprint)
+    rebuilt = shared_optimizer(parameters, surface_path=path)
+    assert rebuilt is not optimizer and rebuilt._active_surface() is shared_surface(path)
+    RESOURCES.invalidate()
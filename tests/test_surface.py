@@ -0,0 +1,64 @@
+# project/tests/test_surface.py
+
+import numpy as np
+import pytest
+from config import BET_TYPES, BetType, MatchCondition
+from quantum.optimizer import QuantumOptimizer
+from quantum.surface import ProbabilitySurface, build_probability_surface
+
+
+@pytest.fixture(scope='module')
+def optimizer():
+    return QuantumOptimizer()
+
+
+@pytest.fixture(scope='module')
+def surface(optimizer, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('surface') / 'probability_surface.npy')
+    return ProbabilitySurface.load(build_probability_surface(optimizer, path), fallback=optimizer)
+
+
+def test_underdog_lookup_does_not_interpolate_across_diagonal(optimizer, surface):
+    """Pressões quase iguais (0.10 x 0.104) ficam na mesma célula da grade que a diagonal"""
+    condition = MatchCondition(home_goals=1, away_goals=5, minute=102, home_pressure=0.10, away_pressure=0.104)
+    exact = optimizer.estimate_contextual_probability(BetType.DOUBLE_CHANCE_UNDERDOG, condition)
+    assert surface.lookup(BetType.DOUBLE_CHANCE_UNDERDOG, condition) == pytest.approx(exact, abs=1e-6)
+
+
+def test_lookup_batch_matches_exact_function(optimizer, surface):
+    rng = np.random.default_rng(0)
+    n = 20_000
+    codes = rng.integers(0, len(BET_TYPES), n)
+    home, away = rng.integers(0, 6, n), rng.integers(0, 6, n)
+    minutes = rng.integers(0, 121, n)
+    home_p, away_p = rng.random(n), rng.random(n)
+
+    exact = optimizer.estimate_contextual_probability_batch(codes, home, away, minutes, home_p, away_p)
+    assert np.abs(surface.lookup_batch(codes, home, away, minutes, home_p, away_p) - exact).max() < 1e-6
+
+    for i in range(500):
+        condition = MatchCondition(home_goals=int(home[i]), away_goals=int(away[i]), minute=int(minutes[i]),
+                                   home_pressure=float(home_p[i]), away_pressure=float(away_p[i]))
+        assert surface.lookup(BET_TYPES[codes[i]], condition) == pytest.approx(exact[i], abs=1e-6)
+
+
+def test_attached_surface_answers_estimates(surface):
+    optimizer = QuantumOptimizer()
+    assert optimizer.attach_surface(surface)
+    condition = MatchCondition(home_goals=1, away_goals=0, minute=30, home_pressure=0.62, away_pressure=0.41)
+    for bet_type in BET_TYPES:
+        exact = optimizer.estimate_contextual_probability(bet_type, condition, exact=True)
+        assert optimizer.estimate_contextual_probability(bet_type, condition) == pytest.approx(exact, abs=1e-6)
+
+    # Placar fora da grade cai no cálculo direto, inclusive no caminho vetorizado
+    codes = np.arange(len(BET_TYPES))[:, None]
+    batch = optimizer.estimate_contextual_probability_batch(codes, [6, 1], 0, 30, 0.5, 0.5)
+    exact = optimizer.estimate_contextual_probability_batch(codes, [6, 1], 0, 30, 0.5, 0.5, exact=True)
+    assert np.abs(batch - exact).max() < 1e-6
+
+
+def test_incompatible_surface_is_ignored(surface):
+    optimizer = QuantumOptimizer()
+    optimizer.set_historical_data({'under_25': {'base_prob': 0.7, 'decay_rate': 0.015}})
+    assert not optimizer.attach_surface(surface)
+    assert optimizer._active_surface() is None